@@ -0,0 +1,291 @@
+"""
+
+Bounded-suboptimal searches for the roles: weighted A* and anytime repairing A* (ARA*), within a time or expansion
+budget
+
+Weighted A* orders the nodes by g(n) + epsilon x h(n): the bigger epsilon, the more the search trusts the heuristic
+and goes straight for a goal, expanding far fewer nodes for a path that can cost more. ARA* runs weighted A* with an
+epsilon going down to final_epsilon, every run reusing the g(n) of the one before: only the queued nodes and the
+ones whose g(n) got better after they were expanded (kept aside during a run) are queued again, so every run improves
+the path of the one before for much less than a new search. When the budget runs out, the best path found so far
+is returned.
+
+The bound of a path holds whatever the heuristic (the heuristics of the roles can overestimate, so epsilon itself
+is no bound): every node on the cheapest path is either expanded with its cheapest g(n), or queued / kept aside
+with a g(n) no worse, so the cheapest cost is at least the lowest g(n) + lower_bound(n) of the queued and kept aside
+nodes (or the cost of the goal reached). The path costs at most bound = cost / that times the cheapest one.
+
+"""
+from __future__ import annotations
+import sys
+from heapq import heappush, heappop
+from itertools import chain, count
+from math import isinf
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from mapper.core.node import Node
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.reachability import Reachability
+from mapper.algos.stats import QUEUE_ENTRY_BYTES, SearchResult
+
+INF = float('inf')
+
+
+class Solution(NamedTuple):
+    """ A path found by a run of the search """
+    epsilon: float
+    cost: float
+    bound: float
+    # nodes expanded and time since the search started, when it was found
+    expanded: int
+    seconds: float
+
+
+class AnytimeSearch:
+    """
+
+    ARA* of a role, or weighted A* when final_epsilon is epsilon (see weighted), with an optional budget of time
+    (max_seconds, since find_path was called) and / or of nodes expanded (max_expansions, over all the runs)
+
+    The epsilon of the next run is epsilon_step lower, or the bound of the path found when that is lower already
+
+    The stats of the search are collected, over all the runs, when the role has a SearchStats (see
+    mapper.algos.stats), like HeuristicAStar does
+
+    """
+    def __init__(self,
+                 role: HeuristicAStar,
+                 epsilon: float = 3.0,
+                 final_epsilon: float = 1.0,
+                 epsilon_step: float = 0.5,
+                 max_seconds: Optional[float] = None,
+                 max_expansions: Optional[int] = None):
+        if not 1 <= final_epsilon <= epsilon or epsilon_step <= 0:
+            raise RuntimeError(f'Invalid epsilons {epsilon} down to {final_epsilon} by {epsilon_step}')
+        self.role: HeuristicAStar = role
+        self.epsilon: float = epsilon
+        self.final_epsilon: float = final_epsilon
+        self.epsilon_step: float = epsilon_step
+        self.max_seconds: Optional[float] = max_seconds
+        self.max_expansions: Optional[int] = max_expansions
+        # nodes expanded by the last search, over all its runs
+        self.num_expanded: int = 0
+        # paths found by the last search, cheaper and cheaper
+        self.solutions: List[Solution] = []
+        # cost of the path returned <= bound x cost of the cheapest path (None without a path)
+        self.bound: Optional[float] = None
+        # the budget ran out before the run with final_epsilon was done
+        self.out_of_budget: bool = False
+        # state of the search: best path to every node reached, h(n), queued nodes --> key, expanded nodes with a
+        # better g(n) since (INCONS), and the heap of (key, seq, node), an entry is stale if the node has a new key
+        self.infos: Dict[Node, InfoContainer] = {}
+        self.h_values: Dict[Node, float] = {}
+        self.queued: Dict[Node, float] = {}
+        self.kept_aside: Set[Node] = set()
+        self.heap: List[Tuple[float, int, Node]] = []
+        self.seq = count()
+        self.started: float = 0.0
+        # counters of the last search, over all its runs, copied to the stats of the role at the end
+        self.counts: Dict[str, int] = {}
+        self.reachability: Optional[Reachability] = None
+
+    @staticmethod
+    def weighted(role: HeuristicAStar,
+                 epsilon: float,
+                 max_seconds: Optional[float] = None,
+                 max_expansions: Optional[int] = None) -> AnytimeSearch:
+        """
+        Weighted A* of the role: one run with epsilon
+        """
+        return AnytimeSearch(role, epsilon, epsilon, 1.0, max_seconds, max_expansions)
+
+    def search(self) -> SearchResult:
+        """
+        Runs the search and prints the path, its cost and its bound, like HeuristicAStar.search
+        """
+        result = self.run()
+        HeuristicAStar.print_path(result.goal_info, self.role.graph)
+        if result.found:
+            budget = ', out of budget' if self.out_of_budget else ''
+            print(f' Bound: at most {self.bound:.3f} x the cheapest cost '
+                  f'(epsilon {self.solutions[-1].epsilon:g}, {self.num_expanded} nodes expanded{budget})')
+        if result.stats is not None:
+            print(f'\n SEARCH STATS:\n{result.stats.summary()}')
+        return result
+
+    def run(self) -> SearchResult:
+        """
+        Runs the search, returns the goal reached, the path, its cost and bound, and the stats if they are collected
+        """
+        goal_info = self.find_path()
+        path_start = perf_counter()
+        path = [] if goal_info is None else goal_info.path()
+        if self.role.stats is not None:
+            self.role.stats.path_seconds = perf_counter() - path_start
+        return SearchResult(goal_info, path, self.role.stats, self.bound)
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        Runs the search with smaller and smaller epsilons until final_epsilon or the end of the budget,
+        returns the info of the goal node of the best path found (None if there is none)
+        """
+        role = self.role
+        self.started = perf_counter()
+        self.num_expanded = 0
+        self.solutions = []
+        self.bound = None
+        self.out_of_budget = False
+        self.infos, self.h_values, self.queued, self.kept_aside, self.heap = {}, {}, {}, set(), []
+        self.counts = dict.fromkeys(['generated', 'queued', 'duplicates', 'stale_pops', 'peak_queue'], 0)
+        self.reachability = role.reachability()
+        if self.reachability is not None and not self.reachability.goal_reachable(
+                role.start_node, role.graph, role.is_goal):
+            # no goal in the component of the start
+            self.__collect_stats(perf_counter())
+            return None
+        role.before_search()
+        search_start = perf_counter()
+        self.infos[role.start_node] = InfoContainer(role.start_node)
+        epsilon = self.epsilon
+        self.__queue(role.start_node, epsilon)
+        best, first = None, True
+        while True:
+            goal_info = self.__improve(epsilon, first)
+            first = False
+            if goal_info is not None and (best is None or goal_info.cost < best.cost):
+                # the heuristic of the goals is not always 0, a run can end on a goal that costs more
+                best = goal_info
+            if best is None or self.out_of_budget:
+                break
+            bound = self.__bound(best)
+            self.solutions.append(
+                Solution(epsilon, best.cost, bound, self.num_expanded, perf_counter() - self.started)
+            )
+            if epsilon <= self.final_epsilon or bound <= self.final_epsilon:
+                break
+            epsilon = max(min(epsilon - self.epsilon_step, bound), self.final_epsilon)
+            # the next run: the kept aside nodes are queued again, all with the new epsilon, and so is the goal
+            # reached, that run ends when nothing queued is better than it
+            nodes = dict.fromkeys(chain(self.queued, self.kept_aside, [best.node]))
+            self.queued, self.kept_aside, self.heap = {}, set(), []
+            for node in nodes:
+                self.__queue(node, epsilon)
+        self.bound = None if best is None else self.__bound(best)
+        self.__collect_stats(search_start)
+        return best
+
+    def __improve(self, epsilon: float, first: bool) -> Optional[InfoContainer]:
+        """
+        One weighted A* run, returns the info of the first goal node taken off the queue
+        (None if the queue ran dry or the budget ran out)
+        """
+        role, infos, queued, heap = self.role, self.infos, self.queued, self.heap
+        expanded: Set[Node] = set()
+        # counted as plain locals, only added to the counts of the search when the run is over
+        stale_pops, generated, num_queued, duplicates, peak_queue = 0, 0, 0, 0, len(heap)
+        goal_info = None
+        while heap:
+            key, _, node = heappop(heap)
+            if queued.get(node) != key:
+                # stale entry
+                stale_pops += 1
+                continue
+            node_info = infos[node]
+            if role.is_goal(node):
+                del queued[node]
+                goal_info = node_info
+                break
+            if self.__over_budget():
+                # still queued, for the bound
+                heappush(heap, (key, next(self.seq), node))
+                self.out_of_budget = True
+                break
+            del queued[node]
+            expanded.add(node)
+            self.num_expanded += 1
+            # out of a user point the search can go to several components, see HeuristicAStar.find_path
+            prune = self.reachability is not None and not (
+                isinstance(node.row_idx, int) and isinstance(node.col_idx, int)
+            )
+            for other_node, step_cost, label in role.successors(node_info):
+                generated += 1
+                cost = node_info.cost + step_cost
+                other_info = infos.get(other_node)
+                if other_info is not None and cost >= other_info.cost:
+                    # reached already with a path that is at least as cheap
+                    duplicates += 1
+                    continue
+                if isinf(cost + self.__heuristic(other_node)):
+                    if first:
+                        # the warnings of the role, once
+                        role.blocked(node_info, other_node, label)
+                    continue
+                if prune and not self.reachability.goal_reachable(other_node, role.graph, role.is_goal):
+                    continue
+                infos[other_node] = InfoContainer(other_node, node_info, cost, label)
+                if other_node in expanded:
+                    # expanded with a worse g(n) in this run, queued again by the next one
+                    self.kept_aside.add(other_node)
+                else:
+                    self.__queue(other_node, epsilon)
+                    num_queued += 1
+            if len(heap) > peak_queue:
+                peak_queue = len(heap)
+        counts = self.counts
+        counts['stale_pops'] += stale_pops
+        counts['generated'] += generated
+        counts['queued'] += num_queued
+        counts['duplicates'] += duplicates
+        counts['peak_queue'] = max(counts['peak_queue'], peak_queue)
+        return goal_info
+
+    def __collect_stats(self, search_start: float):
+        """
+        Copies the counters and timings of the search to the stats of the role, if it has some
+        """
+        stats = self.role.stats
+        if stats is None:
+            return
+        stats.d_map_seconds = search_start - self.started
+        stats.search_seconds = perf_counter() - search_start
+        stats.expanded = self.num_expanded
+        for name, value in self.counts.items():
+            setattr(stats, name, value)
+        # every node reached keeps its info and h(n) until the end of the search
+        stats.peak_bytes = (
+            stats.peak_queue * QUEUE_ENTRY_BYTES +
+            len(self.infos) * sys.getsizeof(InfoContainer(self.role.start_node)) +
+            sys.getsizeof(self.infos) + sys.getsizeof(self.h_values) + sys.getsizeof(self.queued) +
+            sys.getsizeof(self.kept_aside)
+        )
+        # until the path is rebuilt (see run)
+        stats.path_seconds = None
+
+    def __queue(self, node: Node, epsilon: float):
+        key = self.infos[node].cost + epsilon * self.__heuristic(node)
+        self.queued[node] = key
+        heappush(self.heap, (key, next(self.seq), node))
+
+    def __heuristic(self, node: Node) -> float:
+        h_value = self.h_values.get(node)
+        if h_value is None:
+            h_value = self.h_values[node] = self.role.heuristic(node)
+        return h_value
+
+    def __over_budget(self) -> bool:
+        return (
+            (self.max_expansions is not None and self.num_expanded >= self.max_expansions) or
+            (self.max_seconds is not None and perf_counter() - self.started >= self.max_seconds)
+        )
+
+    def __bound(self, best: InfoContainer) -> float:
+        """
+        How many times the cheapest cost the cost of the best path can be (see the module)
+        """
+        cheapest = best.cost
+        for node in chain(self.queued, self.kept_aside):
+            cheapest = min(cheapest, self.infos[node].cost + self.role.lower_bound(node))
+        if best.cost <= cheapest:
+            return 1.0
+        return INF if cheapest <= 0 else best.cost / cheapest
@@ -1,11 +1,60 @@
+from __future__ import annotations
+import sys
+from math import isinf
+from time import perf_counter
+from typing import Any, Dict, Generator, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
 from mapper.core.map import Map
 from mapper.core.node import Node
+from mapper.core.edge import Edge
+from mapper.core.points import VirtualPoints
+from mapper.core.pqueue import create_queue
+from mapper.algos.cost import CostModel
+from mapper.algos.reachability import Reachability
+from mapper.algos.stats import QUEUE_ENTRY_BYTES, SearchProgress, SearchResult, SearchStats
 
 
 class HeuristicAStar:
-    def __init__(self, cov_map: Map):
+    """
+
+    Generic A* search shared by all the roles
+
+    A role plugs into the search by implementing:
+        edge_allowed  -- can the search go down this edge
+        edge_cost     -- g(n) cost of going down this edge
+        heuristic     -- h(n) of a node
+        is_goal       -- is the node a goal node (by default, borders a tile of accepted_tile_type())
+
+    The closed list is a set, the best g(n) found for every node is tracked so worse duplicates are never queued,
+    and every queued node only points to its parent, the path is rebuilt once the goal is found.
+    A role with a cost_model gets the components of the grid under its rules (see reachability()), a start with
+    no goal in its component is answered without a search
+
+    """
+    # costs of the tiles for the role, None for a search that doesn't follow the rules of a role
+    cost_model: Optional[CostModel] = None
+    # priority queue backend used when the search is not given one, see mapper.core.pqueue.QUEUE_TYPES
+    default_queue_type: str = 'heap'
+
+    def __init__(self, cov_map: Map, queue_type: Optional[str] = None, graph: VirtualPoints = None):
         self.map: Map = cov_map
-        self.start_node: Node = self.map.lookup_node('START')
+        # where the search gets the START node and the edges of the nodes from,
+        # the map itself or virtual points laid over it (see Map.route)
+        self.graph: Union[Map, VirtualPoints] = cov_map if graph is None else graph
+        # priority queue backend used by the search, see mapper.core.pqueue.QUEUE_TYPES
+        self.queue_type: str = self.default_queue_type if queue_type is None else queue_type
+        self.queue = create_queue(self.queue_type)
+        # nodes expanded by the last search
+        self.num_expanded: int = 0
+        # counters and timings of the last search, only collected when set (see mapper.algos.stats)
+        self.stats: Optional[SearchStats] = None
+        self.start_node: Node = self.graph.lookup_node('START')
+        # number of goal tiles around every grid node, kept up to date by the map (None for chunked maps)
+        self.goal_corners: Optional[np.ndarray] = (
+            None if cov_map.chunked else cov_map.tile_index().goal_corners(self.accepted_tile_type())
+        )
         self.__update_start()
 
     def __update_start(self):
@@ -13,17 +62,241 @@ class HeuristicAStar:
         # it just needs to implement this algorithm
         pass
 
-    def search(self):
-        # each role needs to implement a different search algorithm
+    def search(self) -> SearchResult:
+        """
+        Runs the search and prints the path and its cost (and the stats of the search if they are collected)
+        """
+        result = self.run()
+        self.print_path(result.goal_info, self.graph)
+        if result.stats is not None:
+            print(f'\n SEARCH STATS:\n{result.stats.summary()}')
+        return result
+
+    def run(self) -> SearchResult:
+        """
+        Runs the search, returns the goal reached, the path and its cost, and the stats if they are collected
+        """
+        goal_info = self.find_path()
+        path_start = perf_counter()
+        path = [] if goal_info is None else goal_info.path()
+        if self.stats is not None:
+            self.stats.path_seconds = perf_counter() - path_start
+        return SearchResult(goal_info, path, self.stats)
+
+    @staticmethod
+    def print_path(success_info: Optional[InfoContainer], graph: Union[Map, VirtualPoints] = None):
+        """
+        Prints the path to the goal node and its cost (or that there is none), with the node names of graph
+        """
+        if success_info is None:
+            print('\n NO PATH FOUND')
+        else:
+            nodes = [
+                (elem.get_name() if graph is None else graph.node_name(elem)) if isinstance(elem, Node) else elem
+                for elem in success_info.path()
+            ]
+            print(f'\n PATH FOUND:\n   Path: {" --> ".join(nodes)}\n   Cost: {success_info.cost}')
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        A* search from the start node, returns the info of the goal node that was reached (None if no path)
+        """
+        return _run_to_end(self.steps())
+
+    def steps(self, every: Optional[int] = None) -> Generator[SearchProgress, None, Optional[InfoContainer]]:
+        """
+        The A* search as a generator: yields the progress of the search after every `every` nodes expanded (never
+        if None), and returns what find_path returns. The search only goes on when the generator is resumed, and
+        closing it cancels the search (see mapper.algos.stepwise)
+        """
+        stats = self.stats
+        # d_map_seconds covers everything before the loop, the reachability check included
+        steps_start = perf_counter()
+        reachability = self.reachability()
+        # no goal in the component of the start, there is no path and nothing to build or search
+        reachable = reachability is None or reachability.goal_reachable(self.start_node, self.graph, self.is_goal)
+        if reachable:
+            self.before_search()
+        search_start = perf_counter() if stats is not None else 0.0
+        self.queue = create_queue(self.queue_type)
+        if reachable:
+            self.queue.queue(0, InfoContainer(self.start_node))
+        self.num_expanded = 0
+        closed_set: Set[Node] = set()
+        best_g: Dict[Node, Union[int, float]] = {self.start_node: 0}
+        # counted as plain locals, only copied to the stats at the end
+        popped, generated, queued, blocked, peak_queue = 0, 0, 0, 0, 1 if reachable else 0
+        goal_info = None
+        # expansions left before the next progress
+        countdown = every
+        while not self.queue.empty():
+            node_info = self.queue.dequeue()
+            popped += 1
+            if node_info.node in closed_set:
+                # stale entry, the node was already expanded through a cheaper path
+                continue
+            # add the node to the closed set, so that we avoid cycles
+            closed_set.add(node_info.node)
+            self.num_expanded += 1
+            if self.is_goal(node_info.node):
+                goal_info = node_info
+                break
+            # a search stays in the component of a grid node, out of a user point it can go to several
+            prune = reachability is not None and not (
+                isinstance(node_info.node.row_idx, int) and isinstance(node_info.node.col_idx, int)
+            )
+            for other_node, step_cost, label in self.successors(node_info):
+                generated += 1
+                if other_node in closed_set:
+                    continue
+                if prune and not reachability.goal_reachable(other_node, self.graph, self.is_goal):
+                    # no goal that way
+                    blocked += 1
+                    continue
+                cost = node_info.cost + step_cost
+                priority = cost + self.heuristic(other_node)
+                if isinf(priority):
+                    self.blocked(node_info, other_node, label)
+                    blocked += 1
+                    continue
+                if cost >= best_g.get(other_node, float('inf')):
+                    # already queued with a path that is at least as cheap
+                    continue
+                best_g[other_node] = cost
+                self.queue.queue(priority, InfoContainer(other_node, node_info, cost, label))
+                queued += 1
+            if queued + 1 - popped > peak_queue:
+                peak_queue = queued + 1 - popped
+            if countdown is not None:
+                countdown -= 1
+                if countdown <= 0:
+                    countdown = every
+                    yield SearchProgress(
+                        self.num_expanded,
+                        queued + 1 - popped,
+                        len(closed_set),
+                        node_info.cost + self.heuristic(node_info.node),
+                        perf_counter() - steps_start
+                    )
+        if stats is not None:
+            stats.d_map_seconds = search_start - steps_start
+            stats.search_seconds = perf_counter() - search_start
+            stats.expanded = self.num_expanded
+            stats.generated, stats.queued, stats.peak_queue = generated, queued, peak_queue
+            stats.stale_pops = popped - self.num_expanded
+            # the successors that were neither queued nor cut off by an infinite cost
+            stats.duplicates = generated - queued - blocked
+            stats.peak_bytes = (
+                peak_queue * (QUEUE_ENTRY_BYTES + sys.getsizeof(InfoContainer(self.start_node))) +
+                sys.getsizeof(closed_set) + sys.getsizeof(best_g)
+            )
+            # until the path is rebuilt (see run)
+            stats.path_seconds = None
+        # None if all paths were exhausted
+        return self.after_search(goal_info)
+
+    def successors(self, node_info: InfoContainer) -> Iterator[Tuple[Node, float, Optional[str]]]:
+        """
+        Yields (next node, cost of the move, label to display before the next node in the path)
+        """
+        for edge in self.graph.edges(node_info.node):
+            other_node = edge.get_other_node(node_info.node)
+            if self.edge_allowed(node_info, edge, other_node):
+                yield other_node, self.edge_cost(node_info, edge), None
+
+    def before_search(self):
+        # hook to build whatever the heuristic needs before the search starts
+        pass
+
+    def lower_bound(self, node: Node) -> float:
+        """
+        Cost to a goal the node can't do better than (unlike the heuristic, it never overestimates),
+        for the suboptimality bound of the bounded searches (see mapper.algos.anytime)
+        """
+        return 0
+
+    def after_search(self, goal_info: Optional[InfoContainer]) -> Optional[InfoContainer]:
+        # hook to finish the path of the goal reached (i.e. put back the moves the search skipped)
+        return goal_info
+
+    def reachability(self) -> Optional[Reachability]:
+        """
+        Components of the grid under the rules of the role, kept up to date by the map
+        (None without a cost_model, or on a chunked map)
+        """
+        if self.cost_model is None or self.map.chunked:
+            return None
+        return Reachability.for_map(self.map, self.cost_model, self.accepted_tile_type())
+
+    def edge_allowed(self, node_info: InfoContainer, edge: Edge, other_node: Node) -> bool:
+        return True
+
+    def edge_cost(self, node_info: InfoContainer, edge: Edge) -> float:
+        # each role needs to implement its own edge cost
         ...
 
-    def accepted_tile_type(self):
+    def heuristic(self, node: Node) -> float:
+        return 0
+
+    def is_goal(self, node: Node) -> bool:
+        if isinstance(node.row_idx, int) and isinstance(node.col_idx, int):
+            # a grid node keeps the tiles around it whatever user points split its edges
+            if self.goal_corners is not None:
+                return self.goal_corners.item(node.row_idx, node.col_idx) > 0
+            if self.map.chunked:
+                return self.__borders_goal_tile(node.row_idx, node.col_idx)
+        return node.borders_tile_of_type(self.accepted_tile_type(), self.graph.edges(node))
+
+    def __borders_goal_tile(self, row_idx: int, col_idx: int) -> bool:
+        # the tiles around the grid node, straight from the type grid (the edges of a compact node are created
+        # every time they are asked for)
+        code, type_codes = self.accepted_tile_type().code, self.map.type_codes
+        for tile_row in range(max(row_idx - 1, 0), min(row_idx + 1, self.map.num_rows)):
+            for tile_col in range(max(col_idx - 1, 0), min(col_idx + 1, self.map.num_columns)):
+                if type_codes[tile_row, tile_col] == code:
+                    return True
+        return False
+
+    def blocked(self, node_info: InfoContainer, other_node: Node, label: Optional[str]):
+        # called when the next node can't be reached (infinite cost)
+        pass
+
+    @staticmethod
+    def accepted_tile_type():
         ...
 
 
 class InfoContainer:
-    """ Helper data class for search """
-    def __init__(self, node: Node, path_to: list, cost: int = 0):
+    """ Helper data class for search, points back to the node it was reached from """
+    __slots__ = ['node', 'parent', 'cost', 'label']
+
+    def __init__(self, node: Node, parent: InfoContainer = None, cost: Union[int, float] = 0, label: str = None):
         self.node: Node = node
-        self.path: list = path_to
-        self.cost: int = cost
+        self.parent: Optional[InfoContainer] = parent
+        self.cost: Union[int, float] = cost
+        self.label: Optional[str] = label
+
+    def path(self) -> List[Union[Node, str]]:
+        """
+        Follows the parents back to the start, returns the nodes (and labels) from the start to this node
+        """
+        path = []
+        node_info = self
+        while node_info is not None:
+            path.append(node_info.node)
+            if node_info.label is not None:
+                path.append(node_info.label)
+            node_info = node_info.parent
+        path.reverse()
+        return path
+
+
+def _run_to_end(steps: Generator[Any, None, Any]) -> Any:
+    """
+    Resumes the generator until it is done, returns what it returned
+    """
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
@@ -0,0 +1,237 @@
+"""
+
+Point to point search for the roles, from START to END instead of to the closest goal tile, as a bidirectional A*
+
+One search goes forward from START, the other one backward from END, both with the moves and costs of the role
+(the edges cost the same both ways, and END is treated like the role treats START: moved to a tile corner for
+roles C and V, left through a corner of its tile for role P). They meet in the middle, so a long route expands
+about half the nodes of a search from one end.
+
+Both searches are guided by the same balanced potential, half the difference of the lower bounds to END and to
+START (distance times the cheapest tile cost on the map), so the first meeting that can't be beaten is the
+cheapest route and the search stops there.
+
+Both searches keep their own heap (among equal keys the deepest node comes first), not one of the queues of
+mapper.core.pqueue.
+
+"""
+from __future__ import annotations
+import sys
+from heapq import heappush, heappop
+from itertools import count
+from math import isinf, sqrt
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.edge import Edge
+from mapper.core.points import VirtualPoints
+from mapper.core.tile import TILE_CODES
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.stats import SearchStats
+
+INF = float('inf')
+# an entry of the heap of a side, without the node
+ENTRY_BYTES = sys.getsizeof((0.0, 0.0, 0, None))
+# directions of the moves inside the tile of a point, reversed for the backward search
+OPPOSITE = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
+
+
+class BidirectionalSearch:
+    """
+
+    START --> END search of one role, on the map or on virtual points laid over it (see Map.route)
+
+    """
+    def __init__(self, cov_map: Map, role_char: str, graph: VirtualPoints = None):
+        self.map: Map = cov_map
+        self.role_char: str = role_char
+        self.graph: Union[Map, VirtualPoints] = cov_map if graph is None else graph
+        # nodes expanded by the last search, forward and backward
+        self.num_expanded: int = 0
+        self.num_forward: int = 0
+        self.num_backward: int = 0
+        # counters and timings of the last search, both sides together, only collected when set (see
+        # mapper.algos.stats, d_map_seconds is the time to build the distance fields / cost tables of both sides)
+        self.stats: Optional[SearchStats] = None
+
+    def search(self):
+        """
+        Runs the search and prints the path and its cost (and the stats of the search if they are collected),
+        like HeuristicAStar.search
+        """
+        HeuristicAStar.print_path(self.find_path(), self.graph)
+        if self.stats is not None:
+            print(f'\n SEARCH STATS:\n{self.stats.summary()}')
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        Cheapest path from START to END, returns the info of the END node (None if there is no path)
+        """
+        d_map_start = perf_counter()
+        forward = RoleAlgoFactory(self.map).create(self.role_char, graph=self.graph)
+        backward = RoleAlgoFactory(self.map).create(self.role_char, graph=_EndAsStart(self.graph))
+        forward.before_search()
+        backward.before_search()
+        search_start = perf_counter()
+        source, target = forward.start_node, backward.start_node
+        self.num_expanded = self.num_forward = self.num_backward = 0
+        if source is target:
+            self.__collect_stats([], 0, d_map_start, search_start)
+            return InfoContainer(source)
+        scale = self.__cheapest_move(forward)
+        diagonal = forward.cost_model.diagonal_moves
+
+        def potential(node: Node) -> float:
+            # balanced: the backward search uses minus this, so both see the same reduced edge costs
+            return scale * (_distance(node, target, diagonal) - _distance(node, source, diagonal)) / 2
+
+        sides = [_Side(forward, source, potential, 1), _Side(backward, target, potential, -1)]
+        best_cost, meeting, peak_queue = INF, None, 2
+        while True:
+            forward_key, backward_key = sides[0].top_key(), sides[1].top_key()
+            if isinf(forward_key) or isinf(backward_key) or forward_key + backward_key >= best_cost:
+                break
+            side, other_side = (sides[0], sides[1]) if forward_key <= backward_key else (sides[1], sides[0])
+            for node, cost in side.expand():
+                other_cost = other_side.g.get(node)
+                if other_cost is not None and cost + other_cost < best_cost:
+                    best_cost, meeting = cost + other_cost, node
+            if len(sides[0].heap) + len(sides[1].heap) > peak_queue:
+                peak_queue = len(sides[0].heap) + len(sides[1].heap)
+        self.num_forward, self.num_backward = sides[0].num_expanded, sides[1].num_expanded
+        self.num_expanded = self.num_forward + self.num_backward
+        self.__collect_stats(sides, peak_queue, d_map_start, search_start)
+        if meeting is None:
+            return None
+        return self.__join(sides[0].infos[meeting], sides[1].infos[meeting], best_cost)
+
+    def __collect_stats(self, sides: List[_Side], peak_queue: int, d_map_start: float, search_start: float):
+        stats = self.stats
+        if stats is None:
+            return
+        stats.d_map_seconds = search_start - d_map_start
+        stats.search_seconds = perf_counter() - search_start
+        stats.expanded = self.num_expanded
+        stats.generated = sum(side.generated for side in sides)
+        stats.queued = sum(side.queued for side in sides)
+        stats.stale_pops = sum(side.stale_pops for side in sides)
+        # the successors that were neither queued nor cut off by an infinite cost
+        stats.duplicates = stats.generated - stats.queued - sum(side.blocked for side in sides)
+        stats.peak_queue = peak_queue
+        stats.peak_bytes = peak_queue * ENTRY_BYTES + sum(
+            sys.getsizeof(side.closed) + sys.getsizeof(side.g) + sys.getsizeof(side.infos) +
+            len(side.infos) * sys.getsizeof(side.infos[side.origin])
+            for side in sides
+        )
+        # until the path is rebuilt
+        stats.path_seconds = None
+
+    def __cheapest_move(self, role: HeuristicAStar) -> float:
+        # every move costs at least the cheapest tile type on the map per unit of distance
+        costs = [float(role.cost_model.tile_costs[TILE_CODES[key]]) for key, num in self.map.counts.items() if num > 0]
+        return max(min(costs, default=0.0), 0.0)
+
+    @staticmethod
+    def __join(forward_info: InfoContainer, backward_info: InfoContainer, total: float) -> InfoContainer:
+        """
+        The forward path to the meeting node, followed by the backward path from it walked the other way
+        """
+        node_info = forward_info
+        # the label of a backward move is on the node it reached, i.e. on the node before it on the way to END
+        label = _reversed_label(backward_info.label)
+        backward_info = backward_info.parent
+        while backward_info is not None:
+            node_info = InfoContainer(backward_info.node, node_info, total - backward_info.cost, label)
+            label = _reversed_label(backward_info.label)
+            backward_info = backward_info.parent
+        return node_info
+
+
+class _Side:
+    """ One of the two searches: g(n), best info of every node reached, open heap and closed set """
+
+    def __init__(self, role: HeuristicAStar, origin: Node, potential, sign: int):
+        self.role: HeuristicAStar = role
+        self.origin: Node = origin
+        self.potential = potential
+        self.sign: int = sign
+        self.g: Dict[Node, float] = {origin: 0}
+        self.infos: Dict[Node, InfoContainer] = {origin: InfoContainer(origin)}
+        self.closed: Set[Node] = set()
+        self.seq = count()
+        # (key, -g(n), seq, node), among equal keys the deepest node first, to cross the plateaus of equal keys
+        # (i.e. every node between the ends on a uniform map) straight instead of expanding all of them
+        self.heap: List[Tuple[float, float, int, Node]] = [(sign * potential(origin), 0, next(self.seq), origin)]
+        self.num_expanded: int = 0
+        # successors looked at, queued, and cut off by an infinite cost, stale entries dropped (see SearchStats)
+        self.generated, self.queued, self.blocked, self.stale_pops = 0, 0, 0, 0
+
+    def top_key(self) -> float:
+        # drop the stale entries first, the key of the next node to expand (inf when there is none)
+        while len(self.heap) > 0 and self.heap[0][3] in self.closed:
+            heappop(self.heap)
+            self.stale_pops += 1
+        return self.heap[0][0] if len(self.heap) > 0 else INF
+
+    def expand(self) -> List[Tuple[Node, float]]:
+        """
+        Expands the next node, returns the nodes that got a cheaper g(n) and their new g(n)
+        """
+        node = heappop(self.heap)[3]
+        self.closed.add(node)
+        self.num_expanded += 1
+        node_info = self.infos[node]
+        improved = []
+        for other_node, step_cost, label in self.role.successors(node_info):
+            self.generated += 1
+            cost = node_info.cost + step_cost
+            if other_node in self.closed:
+                continue
+            if isinf(cost):
+                self.blocked += 1
+                continue
+            if cost >= self.g.get(other_node, INF):
+                continue
+            self.g[other_node] = cost
+            self.infos[other_node] = InfoContainer(other_node, node_info, cost, label)
+            heappush(self.heap, (cost + self.sign * self.potential(other_node), -cost, next(self.seq), other_node))
+            self.queued += 1
+            improved.append((other_node, cost))
+        return improved
+
+
+class _EndAsStart:
+    """ The graph of the backward search: the same nodes and edges, with END looked up as START """
+
+    def __init__(self, graph: Union[Map, VirtualPoints]):
+        self.graph: Union[Map, VirtualPoints] = graph
+
+    def lookup_node(self, name: str) -> Node:
+        return self.graph.lookup_node({'START': 'END', 'END': 'START'}.get(name, name))
+
+    def node_name(self, node: Node) -> str:
+        return self.graph.node_name(node)
+
+    def edges(self, node: Node) -> List[Edge]:
+        return self.graph.edges(node)
+
+    def user_edited(self, node: Node) -> bool:
+        return self.graph.user_edited(node)
+
+    def user_nodes(self) -> List[Node]:
+        return self.graph.user_nodes()
+
+
+def _distance(node: Node, other_node: Node, diagonal: bool) -> float:
+    row_dist, col_dist = abs(node.row_idx - other_node.row_idx), abs(node.col_idx - other_node.col_idx)
+    return sqrt(row_dist ** 2 + col_dist ** 2) if diagonal else row_dist + col_dist
+
+
+def _reversed_label(label: Optional[str]) -> Optional[str]:
+    # 'left --> up' out of END is 'down --> right' into it
+    if label is None:
+        return None
+    return ' --> '.join(OPPOSITE.get(step, step) for step in reversed(label.split(' --> ')))
@@ -0,0 +1,297 @@
+"""
+
+Per role cost model, and the edge costs / heuristic terms of a whole map precomputed from it
+
+The tables are attached to the map, so they stay warm across searches (and roles objects), and are told by
+Map.update_tile about every tile change so only the edges and nodes around the changed tile get recomputed
+
+Chunked maps (see Map.create_chunked) are too big for whole map tables, their costs are computed from the tiles
+around an edge every time they are asked for
+
+"""
+from __future__ import annotations
+from math import sqrt
+from typing import Dict, List, Optional, Type, Union
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
+from mapper.core.edge import Edge, DiagonalEdge
+from mapper.core.tile import Tile, TileTypeFactory, TILE_CODES
+
+AVG = 'avg'
+MIN = 'min'
+CROSSING = 'crossing'
+CORNERS = 'corners'
+
+
+class CostModel:
+    """
+
+    Cost of each tile type for a role, the cost of an edge is:
+        straight edge          -- average cost of the tiles on both sides (or the one tile if on the border)
+        diagonal edge          -- CROSSING: cost of the tile it crosses
+                                  CORNERS: max of the two ways around the corner of the tile,
+                                           sqrt(side one ^ 2 + side two ^ 2) (i.e. role V)
+
+    blocked_type    -- straight edges with a tile of this type on both sides can't be used (i.e. PlayGround for role C)
+    node_term       -- per node term of the heuristic, average (AVG) or minimum (MIN) cost of the node's edges
+    diagonal_moves  -- the role goes down diagonal edges anywhere, not only out of a start inside a tile (i.e. role V)
+
+    """
+    def __init__(self,
+                 name: str,
+                 tile_costs: Dict[str, float],
+                 blocked_type: str = None,
+                 node_term: str = None,
+                 diagonal: str = CROSSING,
+                 diagonal_moves: bool = False):
+        self.name: str = name
+        self.diagonal: str = diagonal
+        self.diagonal_moves: bool = diagonal_moves
+        # code in the type grid --> cost
+        self.tile_costs: np.ndarray = np.zeros(len(TILE_CODES))
+        for key, cost in tile_costs.items():
+            self.tile_costs[TileTypeFactory.code(key)] = cost
+        self.blocked_code: Optional[int] = None if blocked_type is None else TileTypeFactory.code(blocked_type)
+        self.node_term: Optional[str] = node_term
+
+    def tile_cost(self, tile: Tile) -> float:
+        return float(self.tile_costs[0 if tile.tile_type is None else tile.tile_type.code])
+
+    def min_move_cost(self, goal_type: Type) -> float:
+        """
+        Lowest cost of a move on the way to a goal node of the type: the moves before it never touch a tile of
+        that type (its corners are goal nodes), so no move costs less than the cheapest of the other tile types
+        """
+        return float(min(cost for code, cost in enumerate(self.tile_costs) if code != goal_type.code))
+
+
+class CostTables:
+    """
+
+    Edge costs and heuristic terms of every grid edge / node of a map for one CostModel
+
+    The arrays are padded with one row and column of nan on every side, so the border edges and nodes are
+    computed by the same vectorized code as the inner ones (nan = no tile / no edge there)
+
+    """
+    def __init__(self, cov_map: Map, model: CostModel):
+        self.map: Map = cov_map
+        self.model: CostModel = model
+        # no tables, costs straight from the tiles
+        self.direct: bool = cov_map.chunked
+        if self.direct:
+            return
+        num_rows, num_cols = cov_map.num_rows, cov_map.num_columns
+        # (rows + 2) x (columns + 2), tile costs, tile (i, j) is at [i + 1, j + 1]
+        self.tiles: np.ndarray = np.full((num_rows + 2, num_cols + 2), np.nan)
+        # (rows + 2) x (columns + 2), True for tiles of the blocked type
+        self.blocked_tiles: np.ndarray = np.zeros((num_rows + 2, num_cols + 2), dtype=bool)
+        # (rows + 2) x (columns + 2), diagonal edges crossing tile (i, j) at [i + 1, j + 1]
+        # down: top left --> bottom right, up: bottom left --> top right
+        if model.diagonal == CORNERS:
+            self.diagonal_down: np.ndarray = np.full((num_rows + 2, num_cols + 2), np.nan)
+            self.diagonal_up: np.ndarray = np.full((num_rows + 2, num_cols + 2), np.nan)
+        else:
+            # the cost of the tile, both ways
+            self.diagonal_down = self.diagonal_up = self.tiles
+        # (rows + 1) x (columns + 2), horizontal edge (i, j) --> (i, j + 1) is at [i, j + 1]
+        self.horizontal: np.ndarray = np.full((num_rows + 1, num_cols + 2), np.nan)
+        # (rows + 2) x (columns + 1), vertical edge (i, j) --> (i + 1, j) is at [i + 1, j]
+        self.vertical: np.ndarray = np.full((num_rows + 2, num_cols + 1), np.nan)
+        # (rows + 1) x (columns + 1), heuristic term of node (i, j)
+        self.node_terms: np.ndarray = np.full((num_rows + 1, num_cols + 1), np.nan)
+        self.__update(0, num_rows, 0, num_cols)
+
+    @staticmethod
+    def for_map(cov_map: Map, model: CostModel) -> CostTables:
+        """
+        Tables of the model for the map, created the first time and then kept up to date by the map
+        """
+        return cov_map.attached(('cost_tables', model.name), lambda: CostTables(cov_map, model))
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        if self.direct:
+            return
+        self.__update(row_idx, row_idx + 1, col_idx, col_idx + 1)
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        if self.direct:
+            return
+        self.__update(row_start, row_end, col_start, col_end)
+
+    def nodes_changed(self, nodes: List[Node]):
+        # nothing to do, the edges and nodes changed by user points are computed from the tiles when asked for
+        pass
+
+    def tile_cost(self, tile: Tile) -> float:
+        return self.model.tile_cost(tile)
+
+    def edge_cost(self, edge: Edge) -> float:
+        """
+        Cost of the edge, straight from the tables for the edges of the grid
+        """
+        one, two = edge.node_one, edge.node_two
+        if isinstance(edge, DiagonalEdge):
+            return self.__diagonal_cost(edge)
+        if self.direct or not self.__on_grid(one) or not self.__on_grid(two):
+            # edge created for a user point, it has the tiles of the edge it was split from
+            return self.__tile_edge_cost(edge)
+        elif one.row_idx == two.row_idx:
+            return self.horizontal.item(one.row_idx, min(one.col_idx, two.col_idx) + 1)
+        return self.vertical.item(min(one.row_idx, two.row_idx) + 1, one.col_idx)
+
+    def straight_allowed(self, edge: Edge) -> bool:
+        """
+        False if the straight edge has a tile of the blocked type on both sides
+        """
+        if self.model.blocked_code is None:
+            return True
+        one, two = edge.node_one, edge.node_two
+        if not self.direct and self.__on_grid(one) and self.__on_grid(two):
+            if one.row_idx == two.row_idx:
+                col_idx = min(one.col_idx, two.col_idx) + 1
+                return not (
+                    self.blocked_tiles.item(one.row_idx, col_idx) and self.blocked_tiles.item(one.row_idx + 1, col_idx)
+                )
+            row_idx = min(one.row_idx, two.row_idx) + 1
+            return not (
+                self.blocked_tiles.item(row_idx, one.col_idx) and self.blocked_tiles.item(row_idx, one.col_idx + 1)
+            )
+        return not (
+            (edge.tile_one is not None and edge.tile_one.tile_type is not None and
+             edge.tile_one.tile_type.code == self.model.blocked_code) and
+            (edge.tile_two is not None and edge.tile_two.tile_type is not None and
+             edge.tile_two.tile_type.code == self.model.blocked_code)
+        )
+
+    def node_term(self, node: Node, graph: Union[Map, VirtualPoints] = None) -> float:
+        """
+        Average or minimum cost of the edges of the node (in graph, the map itself by default)
+        """
+        graph = self.map if graph is None else graph
+        if not self.direct and self.__on_grid(node) and not graph.user_edited(node):
+            return self.node_terms.item(node.row_idx, node.col_idx)
+        # the edges of the node were changed by a user point
+        costs = [self.edge_cost(edge) for edge in graph.edges(node)]
+        return sum(costs) / len(costs) if self.model.node_term == AVG else min(costs)
+
+    def __on_grid(self, node: Node) -> bool:
+        return isinstance(node.row_idx, int) and isinstance(node.col_idx, int)
+
+    def __diagonal_cost(self, edge: Edge) -> float:
+        tile = edge.crossing
+        one, two = edge.node_one, edge.node_two
+        # the same direction as the diagonal of the tile it is on (or was split from, for a user point)
+        going_down = (one.row_idx < two.row_idx) == (one.col_idx < two.col_idx)
+        if self.direct:
+            return self.__direct_diagonal_cost(tile.row_idx, tile.col_idx, going_down)
+        if going_down:
+            return self.diagonal_down.item(tile.row_idx + 1, tile.col_idx + 1)
+        return self.diagonal_up.item(tile.row_idx + 1, tile.col_idx + 1)
+
+    def __direct_diagonal_cost(self, row_idx: int, col_idx: int, going_down: bool) -> float:
+        # same values as the tables, for one tile
+        cost = self.__code_cost(row_idx, col_idx)
+        if self.model.diagonal != CORNERS:
+            return cost
+        top, bottom, left, right = [
+            cost if other is None else (cost + other) / 2
+            for other in [
+                self.__code_cost(row_idx - 1, col_idx),
+                self.__code_cost(row_idx + 1, col_idx),
+                self.__code_cost(row_idx, col_idx - 1),
+                self.__code_cost(row_idx, col_idx + 1),
+            ]
+        ]
+        if going_down:
+            return max(sqrt(top ** 2 + right ** 2), sqrt(left ** 2 + bottom ** 2))
+        return max(sqrt(left ** 2 + top ** 2), sqrt(bottom ** 2 + right ** 2))
+
+    def __code_cost(self, row_idx: int, col_idx: int) -> Optional[float]:
+        if not (0 <= row_idx < self.map.num_rows and 0 <= col_idx < self.map.num_columns):
+            return None
+        return float(self.model.tile_costs[self.map.type_codes[row_idx, col_idx]])
+
+    def __tile_edge_cost(self, edge: Edge) -> float:
+        if edge.tile_one is None:
+            return self.tile_cost(edge.tile_two)
+        elif edge.tile_two is None:
+            return self.tile_cost(edge.tile_one)
+        return (self.tile_cost(edge.tile_one) + self.tile_cost(edge.tile_two)) / 2
+
+    def __update(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        """
+        Recomputes everything that depends on the tiles [row_start, row_end) x [col_start, col_end)
+        """
+        codes = self.map.type_codes[row_start:row_end, col_start:col_end]
+        self.tiles[row_start + 1:row_end + 1, col_start + 1:col_end + 1] = self.model.tile_costs[codes]
+        if self.model.blocked_code is not None:
+            self.blocked_tiles[row_start + 1:row_end + 1, col_start + 1:col_end + 1] = codes == self.model.blocked_code
+        # the edges along the sides of the tiles, i.e. node rows [row_start, row_end]
+        node_rows, node_cols = slice(row_start, row_end + 1), slice(col_start, col_end + 1)
+        tile_cols = slice(col_start + 1, col_end + 1)
+        self.horizontal[node_rows, tile_cols] = _average(
+            self.tiles[row_start:row_end + 1, tile_cols],
+            self.tiles[row_start + 1:row_end + 2, tile_cols]
+        )
+        tile_rows = slice(row_start + 1, row_end + 1)
+        self.vertical[tile_rows, node_cols] = _average(
+            self.tiles[tile_rows, col_start:col_end + 1],
+            self.tiles[tile_rows, col_start + 1:col_end + 2]
+        )
+        if self.model.diagonal == CORNERS:
+            # the sides of the tiles around also changed, so do their diagonals
+            row_start, row_end = max(row_start - 1, 0), min(row_end + 1, self.map.num_rows)
+            col_start, col_end = max(col_start - 1, 0), min(col_end + 1, self.map.num_columns)
+            tile_rows, tile_cols = slice(row_start + 1, row_end + 1), slice(col_start + 1, col_end + 1)
+            top = self.horizontal[row_start:row_end, tile_cols]
+            bottom = self.horizontal[row_start + 1:row_end + 1, tile_cols]
+            left = self.vertical[tile_rows, col_start:col_end]
+            right = self.vertical[tile_rows, col_start + 1:col_end + 1]
+            self.diagonal_down[tile_rows, tile_cols] = np.maximum(
+                np.sqrt(top ** 2 + right ** 2),
+                np.sqrt(left ** 2 + bottom ** 2)
+            )
+            self.diagonal_up[tile_rows, tile_cols] = np.maximum(
+                np.sqrt(left ** 2 + top ** 2),
+                np.sqrt(bottom ** 2 + right ** 2)
+            )
+        if self.model.node_term is None:
+            return
+        # the nodes on the corners of the tiles
+        row_slice = slice(row_start, row_end + 1)
+        col_slice = slice(col_start, col_end + 1)
+        row_below = slice(row_start + 1, row_end + 2)
+        col_right = slice(col_start + 1, col_end + 2)
+        edge_costs = np.stack([
+            # crossing the 4 tiles around the node
+            self.diagonal_down[row_slice, col_slice],
+            self.diagonal_up[row_slice, col_right],
+            self.diagonal_up[row_below, col_slice],
+            self.diagonal_down[row_below, col_right],
+            # left, right, up and down
+            self.horizontal[row_slice, col_slice],
+            self.horizontal[row_slice, col_right],
+            self.vertical[row_slice, col_slice],
+            self.vertical[row_below, col_slice],
+        ])
+        if self.model.node_term == AVG:
+            num_edges = np.count_nonzero(~np.isnan(edge_costs), axis=0)
+            self.node_terms[row_slice, col_slice] = np.nansum(edge_costs, axis=0) / num_edges
+        else:
+            self.node_terms[row_slice, col_slice] = np.nanmin(edge_costs, axis=0)
+
+
+def _average(side_one: np.ndarray, side_two: np.ndarray) -> Union[np.ndarray, float]:
+    """
+    Average cost of the tiles on both sides of edges, or the cost of the only tile for border edges
+    """
+    return np.where(
+        np.isnan(side_one),
+        side_two,
+        np.where(np.isnan(side_two), side_one, (side_one + side_two) / 2)
+    )
@@ -0,0 +1,214 @@
+"""
+
+Distance from every node of the map to its closest goal node, for the role heuristics (d_map)
+
+A goal node is a corner of a tile of the goal type (see Map.tile_index). Instead of measuring every
+node against every goal node, the whole node grid is computed at once from a boolean mask of the goal nodes:
+    manhattan  -- multi-source sweep, forward and backward along the columns then along the rows
+    euclidean  -- exact euclidean distance transform (Felzenszwalb & Huttenlocher), or scipy's if it is installed
+
+The fields are cached on the map and only recomputed when the map revision changes (i.e. a tile was updated)
+
+A chunked map (see Map.create_chunked) gets the same field, computed a band of rows at a time into a file next to
+the map file (see chunked_transform), so no node grid sized array is ever in memory. Not a coarser field: the
+heuristics of the roles add the d_map to other terms and can overestimate, a field that is only a lower bound
+would change their paths and costs, not only their speed.
+
+"""
+import os
+import tempfile
+from math import ceil, floor
+from typing import List, Type
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.chunks import ChunkedGrid
+
+try:
+    from scipy.ndimage import distance_transform_edt
+except ImportError:
+    distance_transform_edt = None
+
+MANHATTAN = 'manhattan'
+EUCLIDEAN = 'euclidean'
+
+
+def goal_distance_field(cov_map: Map, tile_type: Type, metric: str = MANHATTAN) -> np.ndarray:
+    """
+    (rows + 1) x (columns + 1) array, distance of each node of the grid to its closest goal node
+    (inf everywhere if the map has no tile of the type), memory mapped for chunked maps
+    """
+    def create() -> np.ndarray:
+        if cov_map.chunked:
+            return chunked_transform(cov_map.type_codes, tile_type.code, metric)
+        mask = goal_nodes(cov_map, tile_type)
+        if metric == MANHATTAN:
+            return manhattan_transform(mask)
+        elif metric == EUCLIDEAN:
+            return euclidean_transform(mask)
+        raise RuntimeError(f'No distance metric {metric}')
+    return cov_map.cached(('goal_distance', tile_type.code, metric), create)
+
+
+def goal_nodes(cov_map: Map, tile_type: Type) -> np.ndarray:
+    """
+    (rows + 1) x (columns + 1) boolean array, True for the goal nodes (corners of the tiles of the type)
+    """
+    if cov_map.chunked:
+        raise RuntimeError('No goal node grid for chunked maps')
+    return cov_map.cached(('goal_nodes', tile_type.code), lambda: cov_map.tile_index().goal_mask(tile_type))
+
+
+def node_distance(field: np.ndarray, node: Node) -> float:
+    """
+    Distance of a node in the field, a user created node between grid nodes takes the closest of its neighbours
+    """
+    if isinstance(node.row_idx, int) and isinstance(node.col_idx, int):
+        return float(field[node.row_idx, node.col_idx])
+    rows = {floor(node.row_idx), ceil(node.row_idx)}
+    cols = {floor(node.col_idx), ceil(node.col_idx)}
+    return float(min(field[row_idx, col_idx] for row_idx in rows for col_idx in cols))
+
+
+def goal_node_mask(type_codes: np.ndarray, code: int) -> np.ndarray:
+    """
+    Boolean node grid, True for the 4 corners of every tile with the given code
+    """
+    tiles = type_codes == code
+    num_rows, num_cols = tiles.shape
+    mask = np.zeros((num_rows + 1, num_cols + 1), dtype=bool)
+    mask[:-1, :-1] |= tiles
+    mask[:-1, 1:] |= tiles
+    mask[1:, :-1] |= tiles
+    mask[1:, 1:] |= tiles
+    return mask
+
+
+def manhattan_transform(mask: np.ndarray) -> np.ndarray:
+    """
+    Manhattan distance of every cell to the closest True cell
+    """
+    dist = np.where(mask, 0.0, np.inf)
+    _sweep_columns(dist)
+    # the manhattan distance is separable, the same sweep along the rows finishes it
+    _sweep_columns(dist.T)
+    return dist
+
+
+def euclidean_transform(mask: np.ndarray) -> np.ndarray:
+    """
+    Exact euclidean distance of every cell to the closest True cell
+    """
+    if not mask.any():
+        return np.full(mask.shape, np.inf)
+    if distance_transform_edt is not None:
+        return distance_transform_edt(~mask)
+    # 1D distance to the closest goal along each column
+    col_dist = np.where(mask, 0.0, np.inf)
+    _sweep_columns(col_dist)
+    # then along each row, the lower envelope of the parabolas col_dist^2 + (j - col)^2
+    squared = col_dist ** 2
+    dist = np.empty(mask.shape)
+    for row_idx in range(mask.shape[0]):
+        dist[row_idx] = _lower_envelope(squared[row_idx])
+    return np.sqrt(dist)
+
+
+def chunked_transform(chunks: ChunkedGrid, code: int, metric: str) -> np.ndarray:
+    """
+    Same field as manhattan_transform / euclidean_transform of the goal nodes of a chunked map, a band of chunk_size
+    rows at a time into a temporary file in the directory of the map file (8 bytes per node, so the values are the
+    ones of an in memory map), returned memory mapped
+
+    The sweeps down the columns carry the last row of a band to the next band, the sweeps up carry the first row
+    back, and once its column distances are final every band is finished along its rows
+    """
+    if metric not in (MANHATTAN, EUCLIDEAN):
+        raise RuntimeError(f'No distance metric {metric}')
+    num_rows, num_cols = chunks.shape[0] + 1, chunks.shape[1] + 1
+    bands = [(start, min(start + chunks.chunk_size, num_rows)) for start in range(0, num_rows, chunks.chunk_size)]
+    # the file is deleted once closed, the memory map keeps its own handle on it
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(chunks.path))) as field_file:
+        field = np.memmap(field_file, dtype=np.float64, mode='w+', shape=(num_rows, num_cols))
+    last_row = None
+    for row_start, row_end in bands:
+        dist = np.where(_band_goal_nodes(chunks, code, row_start, row_end), 0.0, np.inf)
+        if last_row is not None:
+            np.minimum(dist[0], last_row + 1, out=dist[0])
+        _sweep_down(dist)
+        field[row_start:row_end] = dist
+        last_row = dist[-1]
+    first_row = None
+    for row_start, row_end in reversed(bands):
+        dist = np.array(field[row_start:row_end])
+        if first_row is not None:
+            np.minimum(dist[-1], first_row + 1, out=dist[-1])
+        _sweep_up(dist)
+        first_row = dist[0].copy()
+        if metric == MANHATTAN:
+            _sweep_columns(dist.T)
+        else:
+            squared = dist ** 2
+            for row_idx in range(dist.shape[0]):
+                dist[row_idx] = _lower_envelope(squared[row_idx])
+            np.sqrt(dist, out=dist)
+        field[row_start:row_end] = dist
+    field.flush()
+    # a plain array on the same memory, reading a memmap goes through Python code
+    return field.view(np.ndarray)
+
+
+def _band_goal_nodes(chunks: ChunkedGrid, code: int, row_start: int, row_end: int) -> np.ndarray:
+    """
+    Goal nodes of the rows of nodes row_start to row_end - 1, from the rows of tiles around them
+    """
+    tile_start, tile_end = max(row_start - 1, 0), min(row_end, chunks.shape[0])
+    mask = goal_node_mask(chunks[tile_start:tile_end, :], code)
+    return mask[row_start - tile_start:row_end - tile_start]
+
+
+def _sweep_columns(dist: np.ndarray):
+    """
+    In place, 1D distance down then up every column at once
+    """
+    _sweep_down(dist)
+    _sweep_up(dist)
+
+
+def _sweep_down(dist: np.ndarray):
+    for row_idx in range(1, dist.shape[0]):
+        np.minimum(dist[row_idx], dist[row_idx - 1] + 1, out=dist[row_idx])
+
+
+def _sweep_up(dist: np.ndarray):
+    for row_idx in range(dist.shape[0] - 2, -1, -1):
+        np.minimum(dist[row_idx], dist[row_idx + 1] + 1, out=dist[row_idx])
+
+
+def _lower_envelope(squared: np.ndarray) -> np.ndarray:
+    """
+    min over k of squared[k] + (j - k)^2, for every j
+    """
+    values: List[float] = squared.tolist()
+    parabolas: List[int] = []
+    bounds: List[float] = []
+    for col_idx in np.flatnonzero(np.isfinite(squared)).tolist():
+        value = values[col_idx] + col_idx * col_idx
+        while len(parabolas) > 0:
+            prev = parabolas[-1]
+            # where this parabola gets below the previous one
+            cross = (value - values[prev] - prev * prev) / (2 * (col_idx - prev))
+            if cross <= bounds[-1]:
+                parabolas.pop()
+                bounds.pop()
+            else:
+                break
+        bounds.append(-np.inf if len(parabolas) == 0 else cross)
+        parabolas.append(col_idx)
+    if len(parabolas) == 0:
+        return np.full(len(values), np.inf)
+    cols = np.arange(len(values))
+    closest = np.array(parabolas)[np.searchsorted(bounds, cols, side='right') - 1]
+    return (cols - closest) ** 2 + squared[closest]
@@ -1,22 +1,41 @@
+from typing import Dict, Optional, Type
+
 from mapper.core.map import Map
+from mapper.core.points import VirtualPoints
 from mapper.algos.c import RoleCAlgo
+from mapper.algos.rectangles import RoleCRectangleAlgo
 from mapper.algos.p import RolePAlgo
 from mapper.algos.v import RoleVAlgo
 from mapper.algos.base import HeuristicAStar
 
+ROLE_CLASSES: Dict[str, Type[HeuristicAStar]] = {'C': RoleCAlgo, 'P': RolePAlgo, 'V': RoleVAlgo}
+
 
 class RoleAlgoFactory:
 
     def __init__(self, cov_map: Map):
         self.map = cov_map
 
-    def create(self, role_char: str) -> HeuristicAStar:
-        if role_char == 'C':
-            return RoleCAlgo(self.map)
-        elif role_char == 'P':
-            return RolePAlgo(self.map)
-        elif role_char == 'V':
-            # TODO import and instantiate Role V specific algo
-            return RoleVAlgo(self.map)
-        else:
+    def create(self,
+               role_char: str,
+               queue_type: Optional[str] = None,
+               graph: VirtualPoints = None,
+               rectangles: bool = False) -> HeuristicAStar:
+        """
+        Search of the role, rectangles -- skip the inside of the uniform regions (role C only, see RoleCRectangleAlgo)
+        queue_type -- priority queue backend of the search, None for the default of the role (default_queue_type)
+        """
+        if rectangles and role_char != 'C':
+            raise RuntimeError(f'No rectangle search for role {role_char}')
+        if rectangles:
+            return RoleCRectangleAlgo(self.map, queue_type, graph)
+        return self.role_class(role_char)(self.map, queue_type, graph)
+
+    @staticmethod
+    def role_class(role_char: str) -> Type[HeuristicAStar]:
+        """
+        Search class of the role, its cost_model and accepted_tile_type() describe the role without a START
+        """
+        if role_char not in ROLE_CLASSES:
             raise RuntimeError(f'No algorithm defined for role {role_char}')
+        return ROLE_CLASSES[role_char]
@@ -0,0 +1,166 @@
+"""
+
+Exact cost to go of a role, from every node of the grid to its closest goal node
+
+The goal of every role is any node on a corner of a tile of its goal type, and the moves of the roles on the grid
+cost the same both ways, so one Dijkstra search backwards from all the goal nodes at once gives every node its cost
+to the closest goal, and the first move of the cheapest path from there. A query from START then only picks the
+first move out of START like the role does, and follows the moves of the field to the goal (as long as the path).
+
+The field is computed from the role's CostTables, on the grid only: user points (START / END) are not part of it,
+a path is never cheaper for going through one. It is cached on the map per role, and computed again the first time
+it is needed after a tile changed.
+
+"""
+from heapq import heappush, heappop
+from math import isinf
+from typing import Optional, Tuple
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.cost import CostTables
+from mapper.algos.distance import goal_nodes
+from mapper.algos.factory import RoleAlgoFactory
+
+
+class CostToGo:
+    """
+
+    Cost to go field of one role on a map
+
+        costs()      -- (rows + 1) x (columns + 1) array, cost of the cheapest path from every node to a goal node
+                        (inf if it can't reach one), i.e. for heatmaps
+        find_path()  -- cheapest path from START, without searching
+
+    """
+    def __init__(self, cov_map: Map, role_char: str):
+        if cov_map.chunked:
+            # one cost and one move for every node of a map that doesn't fit in memory
+            raise RuntimeError('No cost to go field on chunked maps')
+        self.map: Map = cov_map
+        self.role_char: str = role_char
+        self.role_class = RoleAlgoFactory.role_class(role_char)
+
+    def costs(self) -> np.ndarray:
+        """
+        Cost to go of every node of the grid (read only, shared with the cache of the map)
+        """
+        return self.__field()[0]
+
+    def cost(self, node: Node) -> float:
+        return self.costs().item(node.row_idx, node.col_idx)
+
+    def search(self):
+        """
+        Prints the path from START and its cost, like HeuristicAStar.search
+        """
+        HeuristicAStar.print_path(self.find_path())
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        Cheapest path from START to a goal node, the first move out of START is the role's, then the field's
+        """
+        role = RoleAlgoFactory(self.map).create(self.role_char)
+        role.costs = CostTables.for_map(self.map, role.cost_model)
+        costs, next_nodes = self.__field()
+        start_info = InfoContainer(role.start_node)
+        if role.is_goal(role.start_node):
+            return start_info
+        best = None
+        for other_node, step_cost, label in role.successors(start_info):
+            if not (isinstance(other_node.row_idx, int) and isinstance(other_node.col_idx, int)):
+                continue
+            total = step_cost + costs.item(other_node.row_idx, other_node.col_idx)
+            if not isinf(total) and (best is None or total < best[0]):
+                best = (total, other_node, step_cost, label)
+        if best is None:
+            return None
+        total, node, step_cost, label = best
+        node_info = InfoContainer(node, start_info, step_cost, label)
+        first_cost = costs.item(node.row_idx, node.col_idx)
+        num_columns = self.map.num_columns + 1
+        while not role.is_goal(node):
+            row_idx, col_idx = divmod(next_nodes.item(node.row_idx, node.col_idx), num_columns)
+            node = self.map.get_node(row_idx, col_idx)
+            # from the field, so the cost of the goal is exactly the total of the first move
+            node_info = InfoContainer(node, node_info, step_cost + first_cost - costs.item(row_idx, col_idx))
+        node_info.cost = total
+        return node_info
+
+    def __field(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.map.cached(('cost_to_go', self.role_char), self.__compute)
+
+    def __compute(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dijkstra search from all the goal nodes, returns the cost of every node and the flat index of the node its
+        cheapest path moves to next (-1 for the goal nodes and the nodes that can't reach one)
+        """
+        num_rows, num_cols = self.map.num_rows + 1, self.map.num_columns + 1
+        moves = [
+            (row_offset * num_cols + col_offset, move_costs.ravel().tolist())
+            for (row_offset, col_offset), move_costs in self.__move_costs().items()
+        ]
+        size = num_rows * num_cols
+        dist = [float('inf')] * size
+        next_nodes = [-1] * size
+        heap = []
+        for index in np.flatnonzero(goal_nodes(self.map, self.role_class.accepted_tile_type())).tolist():
+            dist[index] = 0.0
+            heap.append((0.0, index))
+        while len(heap) > 0:
+            cost, index = heappop(heap)
+            if cost > dist[index]:
+                # stale entry
+                continue
+            # the nodes that move to this one (the moves off the grid cost inf, so the flat index never wraps)
+            for offset, move_costs in moves:
+                other = index - offset
+                if 0 <= other < size:
+                    other_cost = cost + move_costs[other]
+                    if other_cost < dist[other]:
+                        dist[other] = other_cost
+                        next_nodes[other] = index
+                        heappush(heap, (other_cost, other))
+        costs = np.array(dist).reshape((num_rows, num_cols))
+        costs.setflags(write=False)
+        return costs, np.array(next_nodes, dtype=np.int64).reshape((num_rows, num_cols))
+
+    def __move_costs(self):
+        """
+        (row offset, column offset) of a move --> (rows + 1) x (columns + 1) array, cost of the move from every node
+        (inf where the role can't move that way)
+        """
+        model = self.role_class.cost_model
+        tables = CostTables.for_map(self.map, model)
+        num_rows, num_cols = self.map.num_rows, self.map.num_columns
+        horizontal = tables.horizontal[:, 1:num_cols + 1].copy()
+        vertical = tables.vertical[1:num_rows + 1, :].copy()
+        if model.blocked_code is not None:
+            # both sides of the edge blocked
+            blocked = tables.blocked_tiles
+            horizontal[blocked[:num_rows + 1, 1:num_cols + 1] & blocked[1:, 1:num_cols + 1]] = np.nan
+            vertical[blocked[1:num_rows + 1, :num_cols + 1] & blocked[1:num_rows + 1, 1:]] = np.nan
+        moves = {
+            (0, 1): (np.s_[:, :-1], horizontal),
+            (0, -1): (np.s_[:, 1:], horizontal),
+            (1, 0): (np.s_[:-1, :], vertical),
+            (-1, 0): (np.s_[1:, :], vertical),
+        }
+        if model.diagonal_moves:
+            diagonal_down = tables.diagonal_down[1:num_rows + 1, 1:num_cols + 1]
+            diagonal_up = tables.diagonal_up[1:num_rows + 1, 1:num_cols + 1]
+            moves.update({
+                (1, 1): (np.s_[:-1, :-1], diagonal_down),
+                (-1, -1): (np.s_[1:, 1:], diagonal_down),
+                (-1, 1): (np.s_[1:, :-1], diagonal_up),
+                (1, -1): (np.s_[:-1, 1:], diagonal_up),
+            })
+        move_costs = {}
+        for move, (nodes, edge_costs) in moves.items():
+            costs = np.full((num_rows + 1, num_cols + 1), np.inf)
+            costs[nodes] = np.where(np.isnan(edge_costs), np.inf, edge_costs)
+            move_costs[move] = costs
+        return move_costs
@@ -0,0 +1,354 @@
+"""
+
+Hierarchical search (HPA*) for the roles, for big maps where the goal tiles are far apart
+
+The node grid is cut in square clusters of cluster_size x cluster_size tiles. Along every side shared by two clusters
+a few entrance nodes are picked (one in the middle of every run of usable nodes, or both ends of a long run), and
+for every cluster the cheapest path inside it between each pair of its entrances, and from each entrance to the
+closest goal node inside it, is computed once. A query then:
+    1. searches from START inside its cluster, to the entrances (and goal nodes) of that cluster
+    2. searches the small graph of entrances for the cheapest way to a goal
+    3. refines every step of that abstract path with a search inside the one cluster it crosses
+
+Paths are kept inside the clusters they go through and only cross between clusters at entrances, so the path can be
+more expensive than the cheapest one (see compare). The clusters are built the first time a query needs
+them, and dropped when a tile or user point changes something inside them, to be built again on the next query.
+
+"""
+from __future__ import annotations
+from math import ceil, isinf
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.pqueue import create_queue
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.cost import CostTables
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.field import CostToGo
+
+ClusterKey = Tuple[int, int]
+# the end of the abstract search, reached from the entrances that have a goal node in their cluster
+GOAL = 'GOAL'
+# runs of usable nodes along a side longer than this get an entrance at both ends instead of one in the middle
+MAX_SINGLE_ENTRANCE = 5
+
+
+class Cluster:
+    """ Entrances of a cluster, and the costs between them inside the cluster """
+    __slots__ = ['entrances', 'costs', 'goal_costs']
+
+    def __init__(self):
+        self.entrances: List[Node] = []
+        # entrance --> other entrance --> cost of the cheapest path inside the cluster
+        self.costs: Dict[Node, Dict[Node, float]] = {}
+        # entrance --> cost of the cheapest path to a goal node inside the cluster (missing if there is none)
+        self.goal_costs: Dict[Node, float] = {}
+
+
+class HierarchicalSearch:
+    """
+
+    Hierarchical search of one role on a map, attached to the map so it hears about every tile and user point change
+
+    """
+    def __init__(self, cov_map: Map, role_char: str, cluster_size: int = 16):
+        self.map: Map = cov_map
+        self.role_char: str = role_char
+        self.cluster_size: int = cluster_size
+        self.num_cluster_rows: int = max(ceil(cov_map.num_rows / cluster_size), 1)
+        self.num_cluster_cols: int = max(ceil(cov_map.num_columns / cluster_size), 1)
+        self.role: Optional[HeuristicAStar] = None
+        # clusters built so far, the ones changed since are dropped
+        self.clusters: Dict[ClusterKey, Cluster] = {}
+        # expanded by the last query: nodes of the searches inside clusters, entrances of the abstract search,
+        # and nodes expanded to build the clusters it needed
+        self.num_expanded: int = 0
+        self.num_abstract_expanded: int = 0
+        self.num_build_expanded: int = 0
+        self.num_built: int = 0
+        # True if the last query found no path through the entrances and ran the flat search instead
+        self.fell_back: bool = False
+
+    @staticmethod
+    def for_map(cov_map: Map, role_char: str, cluster_size: int = 16) -> HierarchicalSearch:
+        """
+        Hierarchical search of the role for the map, created the first time and then kept up to date by the map
+        """
+        return cov_map.attached(
+            ('hierarchical', role_char, cluster_size),
+            lambda: HierarchicalSearch(cov_map, role_char, cluster_size)
+        )
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        # the nodes around the tile, and around its neighbours (role V diagonals depend on the neighbouring sides)
+        for cluster_row in self.__spanning(row_idx - 1, row_idx + 2, self.num_cluster_rows):
+            for cluster_col in self.__spanning(col_idx - 1, col_idx + 2, self.num_cluster_cols):
+                self.clusters.pop((cluster_row, cluster_col), None)
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        for cluster_row in self.__spanning(row_start - 1, row_end + 1, self.num_cluster_rows):
+            for cluster_col in self.__spanning(col_start - 1, col_end + 1, self.num_cluster_cols):
+                self.clusters.pop((cluster_row, cluster_col), None)
+
+    def nodes_changed(self, nodes: List[Node]):
+        for node in nodes:
+            for key in self.__clusters_of(node):
+                self.clusters.pop(key, None)
+
+    def search(self):
+        """
+        Runs the search and prints the path and its cost, like HeuristicAStar.search
+        """
+        HeuristicAStar.print_path(self.find_path())
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        Searches the clusters for the cheapest path from the start of the role to a goal node
+        """
+        # a new role every time, so START is looked up again (it may have been moved by the user)
+        self.role = RoleAlgoFactory(self.map).create(self.role_char)
+        self.role.costs = CostTables.for_map(self.map, self.role.cost_model)
+        self.num_expanded = self.num_abstract_expanded = self.num_build_expanded = self.num_built = 0
+        self.fell_back = False
+        start = InfoContainer(self.role.start_node)
+        start_clusters = self.__clusters_of(start.node)
+        reached, goal_info = self.__local_search(start, start_clusters, stop_at_goal=False)
+        # abstract search over the entrances, from the ones START reaches in its clusters
+        queue = create_queue('heap')
+        best: Dict[Union[Node, str], float] = {}
+        # entrance (or GOAL) --> (entrance it was reached from, cluster in between), None when reached from START
+        parents: Dict[Union[Node, str], Optional[Tuple[Node, ClusterKey]]] = {}
+        for key in start_clusters:
+            for entrance in self.__cluster(key).entrances:
+                if entrance in reached and reached[entrance].cost < best.get(entrance, float('inf')):
+                    best[entrance] = reached[entrance].cost
+                    parents[entrance] = None
+                    queue.queue(best[entrance], entrance)
+        if goal_info is not None:
+            best[GOAL] = goal_info.cost
+            parents[GOAL] = None
+            queue.queue(goal_info.cost, GOAL)
+        closed_set: Set[Union[Node, str]] = set()
+        while not queue.empty():
+            entrance = queue.dequeue()
+            if entrance in closed_set:
+                continue
+            closed_set.add(entrance)
+            if entrance is GOAL:
+                return self.__refine(parents, reached, goal_info)
+            self.num_abstract_expanded += 1
+            for key in self.__clusters_of(entrance):
+                cluster = self.__cluster(key)
+                if entrance not in cluster.costs:
+                    continue
+                moves = list(cluster.costs[entrance].items())
+                if entrance in cluster.goal_costs:
+                    moves.append((GOAL, cluster.goal_costs[entrance]))
+                for other, step_cost in moves:
+                    cost = best[entrance] + step_cost
+                    if other not in closed_set and cost < best.get(other, float('inf')):
+                        best[other] = cost
+                        parents[other] = (entrance, key)
+                        queue.queue(cost, other)
+        # the entrances picked don't connect START to a goal (but the grid might), fall back to the flat search
+        self.fell_back = True
+        info = self.role.find_path()
+        self.num_expanded += self.role.num_expanded
+        return info
+
+    def compare(self) -> Dict[str, Union[float, bool, None]]:
+        """
+        Runs the hierarchical and the flat search of the role, returns their costs and how many nodes they expanded,
+        and how much more than the cheapest path (the cost to go of START, see CostToGo) the hierarchical one costs
+        (the heuristics of the flat searches of roles C and P can overestimate, it is not always the cheapest)
+        """
+        info = self.find_path()
+        flat_role = RoleAlgoFactory(self.map).create(self.role_char)
+        flat_info = flat_role.find_path()
+        # no cost to go field on chunked maps, and so no suboptimality
+        exact_info = None if self.map.chunked else CostToGo(self.map, self.role_char).find_path()
+        cost = None if info is None else info.cost
+        flat_cost = None if flat_info is None else flat_info.cost
+        exact_cost = None if exact_info is None else exact_info.cost
+        suboptimality = None
+        if cost is not None and exact_cost is not None:
+            # relative extra cost, 0 when both are free
+            suboptimality = (cost - exact_cost) / exact_cost if exact_cost > 0 else float(cost > 0)
+        return {
+            'cost': cost,
+            'flat_cost': flat_cost,
+            'exact_cost': exact_cost,
+            'suboptimality': suboptimality,
+            'expanded': self.num_expanded,
+            'abstract_expanded': self.num_abstract_expanded,
+            'build_expanded': self.num_build_expanded,
+            'clusters_built': self.num_built,
+            'fell_back': self.fell_back,
+            'flat_expanded': flat_role.num_expanded,
+        }
+
+    def __refine(self,
+                 parents: Dict[Union[Node, str], Optional[Tuple[Node, ClusterKey]]],
+                 reached: Dict[Node, InfoContainer],
+                 goal_info: Optional[InfoContainer]) -> InfoContainer:
+        """
+        Turns the abstract path into the path on the grid, one search inside a cluster per step
+        """
+        steps = []
+        elem = GOAL
+        while parents[elem] is not None:
+            entrance, key = parents[elem]
+            steps.append((entrance, key, elem))
+            elem = entrance
+        steps.reverse()
+        if len(steps) == 0:
+            # a goal node in the clusters of START
+            return goal_info
+        # START to the first entrance is already known
+        node_info = reached[steps[0][0]]
+        for _, key, target in steps:
+            if target == GOAL:
+                _, node_info = self.__local_search(node_info, [key], stop_at_goal=True)
+            else:
+                node_info = self.__local_search(node_info, [key], target=target)[0][target]
+        return node_info
+
+    def __cluster(self, key: ClusterKey) -> Cluster:
+        cluster = self.clusters.get(key)
+        if cluster is None:
+            cluster = self.clusters[key] = self.__build(key)
+        return cluster
+
+    def __build(self, key: ClusterKey) -> Cluster:
+        self.num_built += 1
+        expanded = self.num_expanded
+        cluster = Cluster()
+        seen: Set[Node] = set()
+        for side in self.__sides(key):
+            for entrance in self.__side_entrances(side):
+                if entrance not in seen:
+                    seen.add(entrance)
+                    cluster.entrances.append(entrance)
+        for entrance in cluster.entrances:
+            reached, goal_info = self.__local_search(InfoContainer(entrance), [key], stop_at_goal=False)
+            cluster.costs[entrance] = {
+                other: reached[other].cost for other in cluster.entrances if other is not entrance and other in reached
+            }
+            if goal_info is not None:
+                cluster.goal_costs[entrance] = goal_info.cost
+        # building is not part of the query itself
+        self.num_build_expanded += self.num_expanded - expanded
+        self.num_expanded = expanded
+        return cluster
+
+    def __sides(self, key: ClusterKey) -> Iterator[List[Node]]:
+        """
+        Nodes along each side the cluster shares with another cluster
+        """
+        row_start, row_end, col_start, col_end = self.__bounds(key)
+        cluster_row, cluster_col = key
+        get_node = self.map.get_node
+        if cluster_row > 0:
+            yield [get_node(row_start, col_idx) for col_idx in range(col_start, col_end + 1)]
+        if cluster_row < self.num_cluster_rows - 1:
+            yield [get_node(row_end, col_idx) for col_idx in range(col_start, col_end + 1)]
+        if cluster_col > 0:
+            yield [get_node(row_idx, col_start) for row_idx in range(row_start, row_end + 1)]
+        if cluster_col < self.num_cluster_cols - 1:
+            yield [get_node(row_idx, col_end) for row_idx in range(row_start, row_end + 1)]
+
+    def __side_entrances(self, side: List[Node]) -> List[Node]:
+        """
+        Entrances of a side, the same for both clusters of the side (it only depends on the nodes along it)
+        """
+        entrances = []
+        run: List[Node] = []
+        for node in side + [None]:
+            if node is not None and self.__usable(node):
+                run.append(node)
+                continue
+            if len(run) > MAX_SINGLE_ENTRANCE:
+                entrances.extend([run[0], run[-1]])
+            elif len(run) > 0:
+                entrances.append(run[len(run) // 2])
+            run = []
+        return entrances
+
+    def __usable(self, node: Node) -> bool:
+        # a node the role can move away from
+        return any(not isinf(step_cost) for _, step_cost, _ in self.role.successors(InfoContainer(node, cost=1)))
+
+    def __local_search(self,
+                       origin: InfoContainer,
+                       keys: List[ClusterKey],
+                       target: Node = None,
+                       stop_at_goal: bool = False) -> Tuple[Dict[Node, InfoContainer], Optional[InfoContainer]]:
+        """
+        Cheapest paths from origin without leaving the clusters, returns the info of every node reached
+        and of the closest goal node (stops at target, or at the closest goal node if stop_at_goal)
+        """
+        bounds = [self.__bounds(key) for key in keys]
+        queue = create_queue('heap')
+        queue.queue(origin.cost, origin)
+        reached: Dict[Node, InfoContainer] = {}
+        best: Dict[Node, float] = {origin.node: origin.cost}
+        goal_info = None
+        while not queue.empty():
+            node_info = queue.dequeue()
+            if node_info.node in reached:
+                continue
+            reached[node_info.node] = node_info
+            self.num_expanded += 1
+            if goal_info is None and self.role.is_goal(node_info.node):
+                goal_info = node_info
+                if stop_at_goal:
+                    break
+            if node_info.node is target:
+                break
+            for other_node, step_cost, label in self.role.successors(node_info):
+                cost = node_info.cost + step_cost
+                if (other_node in reached or isinf(cost) or cost >= best.get(other_node, float('inf')) or
+                        not any(_inside(other_node, *bound) for bound in bounds)):
+                    continue
+                best[other_node] = cost
+                queue.queue(cost, InfoContainer(other_node, node_info, cost, label))
+        return reached, goal_info
+
+    def __bounds(self, key: ClusterKey) -> Tuple[int, int, int, int]:
+        """
+        First and last node row, first and last node column of the cluster
+        """
+        size = self.cluster_size
+        cluster_row, cluster_col = key
+        return (
+            cluster_row * size, min((cluster_row + 1) * size, self.map.num_rows),
+            cluster_col * size, min((cluster_col + 1) * size, self.map.num_columns)
+        )
+
+    def __clusters_of(self, node: Node) -> List[ClusterKey]:
+        """
+        Clusters the node is in, more than one for the nodes along the sides between clusters
+        """
+        return [
+            (cluster_row, cluster_col)
+            for cluster_row in self.__indexes(node.row_idx, self.num_cluster_rows)
+            for cluster_col in self.__indexes(node.col_idx, self.num_cluster_cols)
+        ]
+
+    def __spanning(self, first: int, last: int, num_clusters: int) -> range:
+        """
+        Clusters (along one axis) with a node between first and last
+        """
+        return range(max(-(-first // self.cluster_size) - 1, 0), min(last // self.cluster_size, num_clusters - 1) + 1)
+
+    def __indexes(self, position: Union[int, float], num_clusters: int) -> List[int]:
+        idx = min(int(position // self.cluster_size), num_clusters - 1)
+        if idx > 0 and position == idx * self.cluster_size:
+            # on the side between two clusters
+            return [idx - 1, idx]
+        return [idx]
+
+
+def _inside(node: Node, row_start: int, row_end: int, col_start: int, col_end: int) -> bool:
+    return row_start <= node.row_idx <= row_end and col_start <= node.col_idx <= col_end
@@ -0,0 +1,250 @@
+"""
+
+Incremental search (LPA* / D* Lite style) for the roles, keeps its state between searches
+
+The search runs backwards, from all the goal nodes at once towards START, so every node gets g(n) = cost of its
+cheapest path to a goal. That way a new START is just another node to read the answer from, and when a tile changes
+(or a user point changes the edges of a few nodes) only the nodes around it are made inconsistent again and repaired,
+instead of searching the whole map from scratch.
+
+The moves and their costs are the ones of the role (successors, edge_allowed, edge costs from its CostTables),
+the start node is the one the role picks (i.e. moved to a corner for roles C and V). There is no heuristic, so the
+path found is the cheapest one, which can be cheaper than the one of the role's A* search.
+
+"""
+from __future__ import annotations
+from heapq import heappush, heappop
+from itertools import count
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.cost import CostTables
+from mapper.algos.distance import goal_nodes
+from mapper.algos.factory import RoleAlgoFactory
+
+INF = float('inf')
+
+
+class IncrementalSearch:
+    """
+
+    Incremental search of one role on a map, attached to the map so it hears about every tile and user point change
+
+    """
+    def __init__(self, cov_map: Map, role_char: str):
+        if cov_map.chunked:
+            # g and rhs for every node reached would not fit next to a map that doesn't fit in memory
+            raise RuntimeError('No incremental search on chunked maps')
+        self.map: Map = cov_map
+        self.role_char: str = role_char
+        self.role: Optional[HeuristicAStar] = None
+        # g(n) and rhs(n) (one step lookahead of g) of the backward search, inf when missing
+        self.g: Dict[Node, float] = {}
+        self.rhs: Dict[Node, float] = {}
+        # heap of (key, seq, node), an entry is stale if the node is no longer queued with that key
+        self.heap: List[Tuple[float, int, Node]] = []
+        self.queued: Dict[Node, float] = {}
+        self.seq = count()
+        self.origin: Optional[Node] = None
+        self.initialized: bool = False
+        # changes since the last search, repaired when the next one starts
+        self.pending_tiles: Set[Tuple[int, int]] = set()
+        self.pending_nodes: List[Node] = []
+        # goal nodes of the grid, for the current map revision
+        self.goal_mask: Optional[np.ndarray] = None
+        # nodes expanded by the last search, to see how much was repaired
+        self.num_expanded: int = 0
+
+    @staticmethod
+    def for_map(cov_map: Map, role_char: str) -> IncrementalSearch:
+        """
+        Incremental search of the role for the map, created the first time and then kept up to date by the map
+        """
+        return cov_map.attached(('incremental', role_char), lambda: IncrementalSearch(cov_map, role_char))
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        self.pending_tiles.add((row_idx, col_idx))
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        if (row_end - row_start) * (col_end - col_start) > len(self.g):
+            # more tiles than nodes the search has reached, repairing costs more than starting over
+            self.__restart()
+            return
+        self.pending_tiles.update(
+            (row_idx, col_idx) for row_idx in range(row_start, row_end) for col_idx in range(col_start, col_end)
+        )
+
+    def nodes_changed(self, nodes: List[Node]):
+        self.pending_nodes.extend(nodes)
+
+    def search(self):
+        """
+        Runs the search and prints the path and its cost, like HeuristicAStar.search
+        """
+        HeuristicAStar.print_path(self.find_path())
+
+    def find_path(self) -> Optional[InfoContainer]:
+        """
+        Repairs the search after the changes since the last call, then follows the cheapest moves from the start
+        """
+        # a new role every time, so START is looked up again (it may have been moved by the user)
+        self.role = RoleAlgoFactory(self.map).create(self.role_char)
+        self.role.costs = CostTables.for_map(self.map, self.role.cost_model)
+        self.goal_mask = goal_nodes(self.map, self.role.accepted_tile_type())
+        self.num_expanded = 0
+        old_origin, self.origin = self.origin, self.role.start_node
+        if not self.initialized:
+            self.__initialize()
+        else:
+            self.__repair()
+        if old_origin is not None and old_origin is not self.origin:
+            # the old start is a regular node again, the new one moves like a start
+            self.__update_vertex(old_origin)
+            self.__update_vertex(self.origin)
+        self.__compute()
+        if self.g.get(self.origin, INF) == INF:
+            return None
+        return self.__follow_path()
+
+    def __initialize(self):
+        self.initialized = True
+        self.pending_tiles = set()
+        self.pending_nodes = []
+        # the goal nodes are consistent from the start (g = rhs = 0), only the nodes next to them need an update
+        for row_idx, col_idx in np.argwhere(self.goal_mask).tolist():
+            node = self.map.get_node(row_idx, col_idx)
+            self.g[node] = self.rhs[node] = 0
+        for row_idx, col_idx in np.argwhere(_next_to(self.goal_mask)).tolist():
+            self.__update_vertex(self.map.get_node(row_idx, col_idx))
+        # user points, and the nodes around them (a user point inside / along a goal tile is a goal too)
+        for node in self.map.user_nodes():
+            self.__update_vertex(node)
+            for other_node in self.__neighbours(node):
+                self.__update_vertex(other_node)
+        self.__update_vertex(self.origin)
+
+    def __restart(self):
+        # the next search starts from scratch
+        self.g, self.rhs, self.heap, self.queued = {}, {}, [], {}
+        self.initialized = False
+        self.pending_tiles = set()
+        self.pending_nodes = []
+
+    def __repair(self):
+        nodes = list(self.pending_nodes)
+        for row_idx, col_idx in self.pending_tiles:
+            # the nodes around the tile, and around its neighbours (role V diagonals depend on the neighbouring sides)
+            for node_row in range(max(row_idx - 1, 0), min(row_idx + 2, self.map.num_rows) + 1):
+                for node_col in range(max(col_idx - 1, 0), min(col_idx + 2, self.map.num_columns) + 1):
+                    node = self.map.get_node(node_row, node_col)
+                    nodes.append(node)
+                    # user points in the tiles around
+                    nodes.extend(other for other in self.__neighbours(node) if not self.__on_grid(other))
+        self.pending_tiles = set()
+        self.pending_nodes = []
+        user_nodes = set(self.map.user_nodes())
+        for node in set(nodes):
+            if not self.__on_grid(node) and node not in user_nodes:
+                # user point that was removed
+                self.__forget(node)
+            else:
+                self.__update_vertex(node)
+
+    def __forget(self, node: Node):
+        self.g.pop(node, None)
+        self.rhs.pop(node, None)
+        self.queued.pop(node, None)
+
+    def __moves(self, node: Node) -> Iterator[Tuple[Node, float, Optional[str]]]:
+        if node is self.origin:
+            return self.role.successors(InfoContainer(node))
+        # any cost above 0 means the node was reached part way through a path, not started from
+        return self.role.successors(InfoContainer(node, cost=1))
+
+    def __neighbours(self, node: Node) -> Iterator[Node]:
+        # the moves are along edges, so the nodes that can move to this node are the other nodes of its edges
+        for edge in node.edges:
+            yield edge.get_other_node(node)
+
+    def __is_goal(self, node: Node) -> bool:
+        if self.__on_grid(node):
+            return bool(self.goal_mask[node.row_idx, node.col_idx])
+        return self.role.is_goal(node)
+
+    def __update_vertex(self, node: Node):
+        if self.__is_goal(node):
+            rhs = 0
+        else:
+            rhs = min((step_cost + self.g.get(other_node, INF) for other_node, step_cost, _ in self.__moves(node)),
+                      default=INF)
+        self.rhs[node] = rhs
+        g = self.g.get(node, INF)
+        if g != rhs:
+            key = min(g, rhs)
+            self.queued[node] = key
+            heappush(self.heap, (key, next(self.seq), node))
+        else:
+            self.queued.pop(node, None)
+
+    def __compute(self):
+        """
+        Expands the inconsistent nodes, cheapest first, until the start is consistent and nothing cheaper is left
+        """
+        while len(self.heap) > 0:
+            key, _, node = self.heap[0]
+            if self.queued.get(node) != key:
+                # stale entry
+                heappop(self.heap)
+                continue
+            origin_g = self.g.get(self.origin, INF)
+            if key >= min(origin_g, self.rhs.get(self.origin, INF)) and origin_g == self.rhs.get(self.origin, INF):
+                break
+            heappop(self.heap)
+            self.queued.pop(node)
+            self.num_expanded += 1
+            if self.g.get(node, INF) > self.rhs[node]:
+                # cheaper than before, settle it
+                self.g[node] = self.rhs[node]
+            else:
+                # more expensive than before, start over for this node
+                self.g[node] = INF
+                self.__update_vertex(node)
+            for other_node in self.__neighbours(node):
+                self.__update_vertex(other_node)
+
+    def __follow_path(self) -> InfoContainer:
+        node_info = InfoContainer(self.origin)
+        visited = {self.origin}
+        while not self.__is_goal(node_info.node):
+            best = None
+            for other_node, step_cost, label in self.__moves(node_info.node):
+                total = step_cost + self.g.get(other_node, INF)
+                if other_node not in visited and (best is None or total < best[0]):
+                    best = (total, other_node, step_cost, label)
+            if best is None:
+                # only zero cost loops back, can't happen unless g is out of date
+                return None
+            _, other_node, step_cost, label = best
+            visited.add(other_node)
+            node_info = InfoContainer(other_node, node_info, node_info.cost + step_cost, label)
+        return node_info
+
+    def __on_grid(self, node: Node) -> bool:
+        return isinstance(node.row_idx, int) and isinstance(node.col_idx, int)
+
+
+def _next_to(mask: np.ndarray) -> np.ndarray:
+    """
+    True for the cells that are not in the mask but one of their 8 neighbours is
+    """
+    padded = np.pad(mask, 1)
+    num_rows, num_cols = mask.shape
+    around = np.zeros(mask.shape, dtype=bool)
+    for row_offset in range(3):
+        for col_offset in range(3):
+            around |= padded[row_offset:row_offset + num_rows, col_offset:col_offset + num_cols]
+    return around & ~mask
@@ -1,11 +1,15 @@
-from typing import Dict, Optional
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
 
 from mapper.core.map import Map
 from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
 from mapper.core.edge import Edge, DiagonalEdge
-from mapper.core.tile import Tile, Quarantine, Vaccine, PlayGround
-from mapper.core.pqueue import PriorityQueue
+from mapper.core.tile import PlayGround
 from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.cost import MIN, CostModel, CostTables
+from mapper.algos.distance import MANHATTAN, goal_distance_field, node_distance
 
 
 class RolePAlgo(HeuristicAStar):
@@ -20,170 +24,100 @@ class RolePAlgo(HeuristicAStar):
     # This is the constructor of role P.
     # Role P algorithm will make use of the PQ, distance_map, and (possibly) the middle node of the tile.
     # Role P also inherits the start node (from base.py)
-    def __init__(self, cov_map: Map):
-        super().__init__(cov_map)
-        self.queue: PriorityQueue = PriorityQueue()
-        self.d_map: Dict[str, int] = {}
-        self.__create_d_map()
+    # for role P, tile_cost for Vaccine is 2, for Playground: 0, for Quarantine: infinite, and for unassigned: 1
+    # the cost of an edge is the avg value of the 2 tiles on its sides (or the value of the tile if it only has one),
+    # the cost of a diagonal edge is the value of the tile it crosses
+    cost_model: CostModel = CostModel('P', {'V': 2, 'P': 0, 'Q': float('inf'), 'U': 1}, node_term=MIN)
+    # the edge costs are multiples of 0.5, so the bucket queue walks its cursor instead of sifting a heap, for the
+    # same dequeue order as the heap
+    default_queue_type: str = 'bucket'
+
+    def __init__(self, cov_map: Map, queue_type: Optional[str] = None, graph: VirtualPoints = None):
+        super().__init__(cov_map, queue_type, graph)
+        self.d_map: Optional[np.ndarray] = None
+        self.costs: Optional[CostTables] = None
         self.middle_label: Optional[str] = None
 
     # goal-state of role P is the closest Playground (in terms of cost)
-    def accepted_tile_type(self):
+    @staticmethod
+    def accepted_tile_type():
         return PlayGround
 
     # This function maps the distance between a node and its closest goal node.
     # A goal node is a node that connects to one of the 4 edges of a Playground tile.
-    # The function enters this information as a k:v pair in a dictionary, where
-    # key is the current node name, and value is the (x,y) coordinates of that closest goal node.
+    # The distances (# moves in x direction + # moves in y direction) of all the nodes are computed at once,
+    # as an array over the node grid, and only recomputed when a tile of the map changes
     def __create_d_map(self):
         """ creates distance to goal for each node """
-        goal_map = {}
-        # First we collect all the goal nodes on the map and store them in a goal_map
-        for i, row in enumerate(self.map.get_node_grid()):
-            for j, node in enumerate(row):
-                if node.borders_tile_of_type(PlayGround):
-                    goal_map[node.get_name()] = (i, j)
-        # Then for every node, we calculate the distance from the current node, to
-        # each of those goal nodes in goal_map. Whichever node from goal_map has the
-        # least distance (ie: min(distances)), is the closest goal node from curr node
-        for i, row in enumerate(self.map.get_node_grid()):
-            for j, node in enumerate(row):
-                distances = [
-                    abs(i - y) + abs(j - x)
-                    for node_name, (y, x) in goal_map.items()
-                ]
-                self.d_map[node.get_name()] = min(distances)
+        self.d_map = goal_distance_field(self.map, PlayGround, MANHATTAN)
 
-    # This is the function for the A*-search algorithm
-    # It calls an inner function (search_helper) recursively, which continuously adds nodes
-    # to the priority queue, and traverses the search path, until it finds a node that sits on
-    # one end of an edge that borders a tile of type Playground.
-    def search(self):
-        """
-
-        Performs the search
+    # The A*-algorithm itself is in HeuristicAStar (base.py), role P plugs into it with the functions below.
+    # Before every search we create a map of distances; from curr node to closest goal node
+    def before_search(self):
+        self.__create_d_map()
+        self.costs = CostTables.for_map(self.map, self.cost_model)
 
+    def successors(self, node_info: InfoContainer) -> Iterator[Tuple[Node, float, Optional[str]]]:
         """
-        # This function populates the queue with the adjacent nodes of the current node
-        # We made it an inner function of search because search(self) will call it recursively
-        # and check on the variables coming from search_helper to update the path and the costs,
-        # until it finds a goal state (a node that belongs to a Playground tile)
-        def search_helper():
-            """
 
-            Inner function so that the first node can populate the queue twice,
-                first with paths that are vertical:
+        Yields the adjacent nodes of the current node, with the cost to get there
 
-                ^                   ^
-                |                   |
-                 ------ START ------
-                |                   |
-                v                   v
+        The first node populates the queue twice if it's inside a tile,
+            first with paths that are vertical:
 
-                second with paths that are horizontal:
+            ^                   ^
+            |                   |
+             ------ START ------
+            |                   |
+            v                   v
 
-                  <------- ------->
-                          |
-                        START
-                          |
-                  <------- ------->
+            second with paths that are horizontal:
 
-            The non-START nodes just do it regularly (once)
+              <------- ------->
+                      |
+                    START
+                      |
+              <------- ------->
 
-            """
-            # For every edge connected to the current node...
-            for edge in node_info.node.edges:
-                # if the node on the other side of the edge is a node that's already been visited
-                # (ie: in our closed list)... then we ignore that edge (and therefore that node) (see: 'continue')
-                other_node = edge.get_other_node(node_info.node)
-                if (
-                    other_node.get_name() in closed_list or
-                    # similarly, since role P can't go down diagonal edges, if the node is on the other side of a
-                    # diagonal edge (from the current node), we also ignore that edge, and that node (ie: 'continue')
-                    (
-                        isinstance(edge, DiagonalEdge) and
-                        not self.__is_first_and_inside(node_info.node, node_info.cost)
-                    )
-                ):
-                    continue
-                # otherwise we calculate the f(n) of the node (ie: calculate_f) sitting on the other side of the edge
-                # (recall: we are currently looping through each edges connected to our current node)
-                if node_info.node.get_name() == 'START':
-                    priority = self.__calculate_f(other_node, edge, node_info.cost, current_node=node_info.node, vertical=vertical)
-                else:
-                    priority = self.__calculate_f(other_node, edge, node_info.cost)
+        The non-START nodes just do it regularly (once)
 
-                # However if it turns out that that the adjacent node is on the other side of an edge with an
-                # edge cost of infinite value, then we should ignore that node ('continue') and leave a message
-                # "infinite edge-cost encountered"
-                if abs(priority) == float('inf'):
-                    msg = "WARNING: infinite cost detected on {} {}--> {}".format(
-                        node_info.node.get_name(),
-                        '' if node_info.cost > 0 or self.middle_label is None else f'--> {self.__extra_label_str()} ',
-                        other_node.get_name()
-                    )
-                    print(msg)
+        """
+        # if the node is the first node, and it's within a tile, then we must pick the right adjacent node on its
+        # vertical axis (ie: vertical = true) and also the right adjacent node on its horizontal axis
+        # (ie: vertical = false), to make sure that we end up going to the right node, which sits on one of the
+        # corners of the tile that we are in
+        first_and_inside = node_info.node is self.start_node and self.__is_first_and_inside(node_info.node, node_info.cost)
+        for vertical in ([True, False] if first_and_inside else [False]):
+            # For every edge connected to the current node...
+            for edge in self.graph.edges(node_info.node):
+                # since role P can't go down diagonal edges, if the node is on the other side of a diagonal edge
+                # (from the current node), we ignore that edge, and that node
+                if isinstance(edge, DiagonalEdge) and not self.__is_first_and_inside(node_info.node, node_info.cost):
                     continue
-                # otherwise, if all is good (the node on the other side is not in the visited list and is not sitting on
-                # the other side of a diagonal edge or an edge with an infinite edge-cost value), then we add that node
-                # to our priority queue... along with the current_node information (ie: current path so far,
-                # current cost of the path so far...) as this information will allow us to retrace the solution path
-                # (and its cost) easily later.
                 cur_cost = self.__edge_cost(edge, node_info.cost, node_info.node, vertical)
-                add_next = [edge] if node_info.cost > 0 or self.middle_label is None else [self.__extra_label_str(), edge]
-                self.queue.queue(
-                    priority,
-                    InfoContainer(other_node, node_info.path + add_next, node_info.cost + cur_cost)
-                )
-        # /end of helper_function
-        # we then create a map of distances; from curr node to closest goal node
-        self.__create_d_map()
-        # and we now start the process of the A*-algorithm...
-        # by first appending the queue with our start_node and creating our closed list
-        self.queue.queue(0, InfoContainer(self.start_node, []))
-        success_info = None
-        closed_list = []
-        # So then... while PQ is not empty...
-        while not self.queue.empty():
-            # we dequeue the node with the lowest f(n), from the PQ
-            node_info = self.queue.dequeue()
-            # append its info to the search path
-            node_info.path.append(node_info.node)
-            # and append it to our closed list
-            closed_list.append(node_info.node.get_name())
-            # if the dequeued node is not a node that borders a tile of type Playground then we recursively call our
-            # inner function (which job is to add the adjacent nodes of the current node to the PQ)
-            # However, if the dequeued node is a node that borders a tile of type Playgrounds, then we found
-            # our goal-state and we break out of the "while PQ not empty" loop
-            if node_info.node.borders_tile_of_type(PlayGround):   # see node.py (last function at the bottom)
-                success_info = node_info
-                break
-            # if the dequeued node is the first node, and it's within a tile, then we need to add it twice to the queue
-            # because we must pick the right adjacent node on its vertical axis (ie: vertical = true) and also
-            # the right adjacent node on its horizontal axis (ie: vertical = false), to make sure that we end up
-            # going to the right node, which sits on one of the corners of the tile that we are in
-            if node_info.node.get_name() == 'START' and self.__is_first_and_inside(node_info.node, node_info.cost):
-                # start node that is inside a tile goes twice (one time vertical axis, one time horizontal axis)
-                for vertical in [True, False]:
-                    search_helper()
-            # but for all other nodes (not 'first_and_inside'), they'll be appended to the queue once
-            else:
-                vertical = False
-                search_helper()
-        # if we end up emptying the queue with no goal-state (a node bordering a playground tile) encountered,
-        # we return 'path not found'
-        if success_info is None:
-            print('\n NO PATH FOUND')
-        # or if we broke out of the loop and found our goal-state node, then we display the path found and the cost,
-        # which is the accumulated cost of the last node (success_node). Recall: the dequeued node always holds the
-        # information regarding the path itself that led to this node (which a compilation of its predecessor nodes),
-        # and the cost of that path. So in the end we just have to display the last node's ('success_node') path & cost
-        else:
-            nodes = [
-                (node.get_name() if isinstance(node, Node) else node)
-                for node in success_info.path if isinstance(node, Node) or isinstance(node, str)
-            ]
-            print(f'\n PATH FOUND:\n   Path: {" --> ".join(nodes)}\n   Cost: {success_info.cost}')
+                # the moves inside the first tile get displayed in the path, between START and the corner node
+                label = None if node_info.cost > 0 else self.__extra_label_str()
+                yield edge.get_other_node(node_info.node), cur_cost, label
+
+    # If it turns out that that the adjacent node is on the other side of an edge with an edge cost of
+    # infinite value, then the search ignores that node and we leave a message "infinite edge-cost encountered"
+    def blocked(self, node_info: InfoContainer, other_node: Node, label: Optional[str]):
+        msg = "WARNING: infinite cost detected on {} {}--> {}".format(
+            self.graph.node_name(node_info.node),
+            '' if label is None else f'--> {label} ',
+            self.graph.node_name(other_node)
+        )
+        print(msg)
+
+    def heuristic(self, node: Node) -> float:
+        return self.__calculate_h(node)
+
+    # a bound that never overestimates, for the bounded searches: one straight move per step of the distance,
+    # none of them cheaper than min_move_cost (0 for the user points, they can be part way along an edge)
+    def lower_bound(self, node: Node) -> float:
+        if not (isinstance(node.row_idx, int) and isinstance(node.col_idx, int)):
+            return 0
+        return self.cost_model.min_move_cost(PlayGround) * node_distance(self.d_map, node)
 
     # if the start node is inside a tile, we label it as such
     def __extra_label_str(self) -> Optional[str]:
@@ -191,17 +125,6 @@ class RolePAlgo(HeuristicAStar):
         self.middle_label = None
         return label
 
-    # this function calculates the f(n) of a node, by adding:
-    # the g(n) of a node, which is the previous node's cost (last registered 'current_cost')
-    # to the h(n) of the node (defined below)
-    def __calculate_f(self, node: Node, edge: Edge, current_cost: float, current_node: Node = None, vertical: bool = False) -> float:
-        if current_node is None:
-            g_n = current_cost + self.__edge_cost(edge, current_cost, node, vertical)
-        else:
-            g_n = current_cost + self.__edge_cost(edge, current_cost, current_node, vertical)
-        h_n = self.__calculate_h(node, current_cost, vertical)
-        return g_n + h_n
-
     # if we start inside a tile, we must calculate the cost to reach one of the nodes at the corners of the tile
     # we also have to display 'left', 'right', 'down', 'up', depending on which directions we take to reach
     # that node in the corner (ie: node with the lowest f(n))...
@@ -211,11 +134,16 @@ class RolePAlgo(HeuristicAStar):
         x_axis = "right" if middle_node.col_idx < target_node.col_idx else "left"
         y_axis = "down" if middle_node.row_idx < target_node.row_idx else "up"
         # getting to the straight (vertical) edge
-        target_vertical = target_node.get_other_node_on_axis(y_axis == 'down', vertical, x_axis == 'right')
+        target_vertical = target_node.get_other_node_on_axis(
+            y_axis == 'down', vertical, x_axis == 'right', self.graph.edges(target_node)
+        )
         self.middle_label = f'{x_axis} --> {y_axis}' if vertical else f'{y_axis} --> {x_axis}'
+        if target_vertical is None:
+            # the edge along the tile was split by the other user point, that way is not a walk along one edge
+            return float('inf')
         # cost of the inner tile moves = cost of walking inside the tile to the vertical edge
         #                                + cost of walking along the vertical edge
-        return self.__tile_cost(edge.crossing) + self.__edge_cost(target_vertical, 0, target_node, vertical)
+        return self.costs.tile_cost(edge.crossing) + self.__edge_cost(target_vertical, 0, target_node, vertical)
 
     # checking if the node is within a tile (ie: x,y coord are floats)
     def __node_is_in_tile(self, node: Node) -> bool:
@@ -237,29 +165,11 @@ class RolePAlgo(HeuristicAStar):
         # cost of walking inside the tile to the vertical edge + cost of walking along the vertical edge
         if self.__is_first_and_inside(node, cost):
             return self.__cost_of_node_in_tile(node, edge, vertical)
-        # Otherwise, the cost of an edge depends on the tiles
-        elif isinstance(edge, DiagonalEdge):
-            return self.__tile_cost(edge.crossing)
-        # if the edge is the side of only one tile, then the edge-cost if the value (cost) of that tile
-        elif edge.tile_one is None:
-            return self.__tile_cost(edge.tile_two)
-        elif edge.tile_two is None:
-            return self.__tile_cost(edge.tile_one)
-        # but if the edge is the side of two tiles, then the edge-cost is the avg value of those 2 tiles
-        # see the function below for finding the value of a tile (ie: tile_cost)
-        else:
-            return (self.__tile_cost(edge.tile_one) + self.__tile_cost(edge.tile_two)) / 2
+        return self.__grid_edge_cost(edge)
 
-    # for role P, tile_cost for Vaccine is 2, for Playground: 0, for Quarantine: infinite, and for unassigned: 1
-    def __tile_cost(self, tile: Tile) -> float:
-        if isinstance(tile.tile_type, Vaccine):
-            return 2
-        elif isinstance(tile.tile_type, PlayGround):
-            return 0
-        elif isinstance(tile.tile_type, Quarantine):
-            return float('inf')
-        else:
-            return 1
+    # Otherwise, the cost of an edge depends on the tiles (see cost_model)
+    def __grid_edge_cost(self, edge: Edge) -> float:
+        return self.costs.edge_cost(edge)
 
     # calculates the best cost-estimation for a node, from its current location, to the closest goal-state.
     # h(n) = min(of all the costs related to the adjacent edges' of n)
@@ -274,7 +184,7 @@ class RolePAlgo(HeuristicAStar):
     #            we will take the first one because at best it will go down an edge that is less costly than the latter.
     #            Note: we subtract one, because when counting the # of moves left, there is one move which we already
     #            counted: the move for which we used (added) the lowest possible edge_cost value...
-    def __calculate_h(self, node: Node, current_cost: float, vertical: bool) -> float:
-        min_cost = min([self.__edge_cost(edge, current_cost, node, vertical) for edge in node.edges])
-        return min_cost - 1 + self.d_map[node.get_name()]
+    def __calculate_h(self, node: Node) -> float:
+        min_cost = self.costs.node_term(node, self.graph)
+        return min_cost - 1 + node_distance(self.d_map, node)
 
@@ -0,0 +1,258 @@
+"""
+
+Connected components of the node grid under the rules of a role, to tell without a search that no goal can be reached
+
+Two grid nodes are connected when the role can go down the edge between them: a finite cost, and for role C not a
+straight edge with the blocked type on both sides (diagonal edges only for the roles with diagonal_moves). A search
+that only moves along such edges never leaves the component of its start, so when the component has no goal node
+the answer is NO PATH FOUND without expanding anything.
+
+The components are a union-find over the nodes, with the number of goal nodes in every component kept at its root.
+Tile changes are only recorded when they happen (the cost tables the edges come from may not be up to date yet), and
+applied the next time the components are used: the edges that opened are unions, the goal nodes that appeared or
+went away update the count of their component, and an edge that closed (a union-find can't split a component) or a
+bulk edit labels the whole grid again, in a few vectorized passes.
+
+"""
+from __future__ import annotations
+from typing import Callable, List, Set, Tuple, Type, Union
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
+from mapper.algos.cost import CostModel, CostTables
+
+
+class Reachability:
+    """
+
+    Components of the node grid for a cost model and a goal tile type, attached to the map so it hears about every
+    tile change (see the module)
+
+    """
+    def __init__(self, cov_map: Map, model: CostModel, goal_type: Type):
+        if cov_map.chunked:
+            # one label per node, for a map that doesn't fit in memory
+            raise RuntimeError('No reachability on chunked maps')
+        self.map: Map = cov_map
+        self.model: CostModel = model
+        self.goal_type: Type = goal_type
+        self.costs: CostTables = CostTables.for_map(cov_map, model)
+        self.num_node_cols: int = cov_map.num_columns + 1
+        num_nodes = (cov_map.num_rows + 1) * self.num_node_cols
+        # node (i, j) is i * (columns + 1) + j, parent in the union-find (itself for the roots)
+        self.parent: np.ndarray = np.arange(num_nodes, dtype=np.int64)
+        # number of goal nodes in the component, at the root of every component
+        self.goal_counts: np.ndarray = np.zeros(num_nodes, dtype=np.int64)
+        # (rows + 1) x (columns + 1), True for the goal nodes the counts were made with
+        self.goal_flags: np.ndarray = np.zeros((cov_map.num_rows + 1, self.num_node_cols), dtype=bool)
+        # edges the role can go down, horizontal (i, j) --> (i, j + 1) at [i, j], vertical (i, j) --> (i + 1, j)
+        # at [i, j], diagonals of tile (i, j) at [i, j] (one flag, both diagonals cost the same kind of sides)
+        self.horizontal: np.ndarray = np.zeros((cov_map.num_rows + 1, cov_map.num_columns), dtype=bool)
+        self.vertical: np.ndarray = np.zeros((cov_map.num_rows, cov_map.num_columns + 1), dtype=bool)
+        self.diagonal_down: np.ndarray = np.zeros((cov_map.num_rows, cov_map.num_columns), dtype=bool)
+        self.diagonal_up: np.ndarray = np.zeros((cov_map.num_rows, cov_map.num_columns), dtype=bool)
+        # tiles changed since the components were last brought up to date
+        self.pending: Set[Tuple[int, int]] = set()
+        self.stale: bool = True
+
+    @staticmethod
+    def for_map(cov_map: Map, model: CostModel, goal_type: Type) -> Reachability:
+        """
+        Components of the model for the map, created the first time and then kept up to date by the map
+        """
+        return cov_map.attached(
+            ('reachability', model.name, goal_type.code), lambda: Reachability(cov_map, model, goal_type)
+        )
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        if not self.stale:
+            self.pending.add((row_idx, col_idx))
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        self.stale = True
+        self.pending.clear()
+
+    def nodes_changed(self, nodes: List[Node]):
+        # nothing to do, user points split edges without changing which grid nodes they connect
+        pass
+
+    def component_has_goal(self, row_idx: int, col_idx: int) -> bool:
+        """
+        True if a goal node is in the component of the grid node
+        """
+        self.__refresh()
+        return self.goal_counts.item(self.__find(row_idx * self.num_node_cols + col_idx)) > 0
+
+    def goal_reachable(self,
+                       node: Node,
+                       graph: Union[Map, VirtualPoints] = None,
+                       is_goal: Callable[[Node], bool] = None) -> bool:
+        """
+        False if the role can't reach a goal node from the node, a user point (off the grid) can reach the components
+        of the grid nodes it is between, or be a goal itself (is_goal)
+        """
+        graph = self.map if graph is None else graph
+        if _on_grid(node):
+            return self.component_has_goal(node.row_idx, node.col_idx)
+        # the user points around it (i.e. START and END on the same edge), until the grid nodes
+        seen, to_visit = {node}, [node]
+        while to_visit:
+            current = to_visit.pop()
+            if is_goal is not None and is_goal(current):
+                return True
+            for edge in graph.edges(current):
+                other_node = edge.get_other_node(current)
+                if other_node in seen:
+                    continue
+                seen.add(other_node)
+                if not _on_grid(other_node):
+                    to_visit.append(other_node)
+                elif self.component_has_goal(other_node.row_idx, other_node.col_idx):
+                    return True
+        return False
+
+    def __refresh(self):
+        """
+        Applies the tile changes since the last time, or labels the whole grid again
+        """
+        if self.stale:
+            self.__rebuild()
+            return
+        while self.pending:
+            row_idx, col_idx = self.pending.pop()
+            if not self.__update(row_idx, col_idx):
+                # an edge closed
+                self.__rebuild()
+                return
+
+    def __rebuild(self):
+        self.horizontal[...], self.vertical[...], self.diagonal_down[...], self.diagonal_up[...] = self.__open_edges(
+            0, self.map.num_rows, 0, self.map.num_columns
+        )
+        node_ids = np.arange(self.parent.size, dtype=np.int64).reshape(self.goal_flags.shape)
+        ends = [
+            (node_ids[:, :-1][self.horizontal], node_ids[:, 1:][self.horizontal]),
+            (node_ids[:-1, :][self.vertical], node_ids[1:, :][self.vertical]),
+            (node_ids[:-1, :-1][self.diagonal_down], node_ids[1:, 1:][self.diagonal_down]),
+            (node_ids[1:, :-1][self.diagonal_up], node_ids[:-1, 1:][self.diagonal_up]),
+        ]
+        self.parent = _label_components(
+            self.parent.size,
+            np.concatenate([one for one, _ in ends]),
+            np.concatenate([two for _, two in ends])
+        )
+        self.goal_flags[...] = self.map.tile_index().goal_mask(self.goal_type)
+        self.goal_counts = np.bincount(self.parent, weights=self.goal_flags.ravel(), minlength=self.parent.size)
+        self.goal_counts = self.goal_counts.astype(np.int64)
+        self.pending.clear()
+        self.stale = False
+
+    def __update(self, row_idx: int, col_idx: int) -> bool:
+        """
+        Unions the edges around the tile that opened and counts its corners that became / stopped being goal nodes,
+        False if an edge closed (the components have to be labelled again)
+        """
+        # the diagonals of the tiles around also depend on the sides of this one
+        reach = 1 if self.model.diagonal_moves else 0
+        row_start, row_end = max(row_idx - reach, 0), min(row_idx + 1 + reach, self.map.num_rows)
+        col_start, col_end = max(col_idx - reach, 0), min(col_idx + 1 + reach, self.map.num_columns)
+        windows = [
+            (self.horizontal, slice(row_start, row_end + 1), slice(col_start, col_end), (0, 0), (0, 1)),
+            (self.vertical, slice(row_start, row_end), slice(col_start, col_end + 1), (0, 0), (1, 0)),
+            (self.diagonal_down, slice(row_start, row_end), slice(col_start, col_end), (0, 0), (1, 1)),
+            (self.diagonal_up, slice(row_start, row_end), slice(col_start, col_end), (1, 0), (0, 1)),
+        ]
+        for (flags, rows, cols, one, two), new in zip(windows, self.__open_edges(row_start, row_end, col_start, col_end)):
+            old = flags[rows, cols]
+            if (old & ~new).any():
+                return False
+            for edge_row, edge_col in zip(*np.nonzero(new & ~old)):
+                top, left = rows.start + int(edge_row), cols.start + int(edge_col)
+                self.__union(
+                    (top + one[0]) * self.num_node_cols + left + one[1],
+                    (top + two[0]) * self.num_node_cols + left + two[1]
+                )
+            flags[rows, cols] = new
+        # the 4 corners of the tile
+        rows, cols = slice(row_idx, row_idx + 2), slice(col_idx, col_idx + 2)
+        new_goals = self.map.tile_index().goal_corners(self.goal_type)[rows, cols] > 0
+        for node_row, node_col in zip(*np.nonzero(new_goals != self.goal_flags[rows, cols])):
+            node_row, node_col = row_idx + int(node_row), col_idx + int(node_col)
+            root = self.__find(node_row * self.num_node_cols + node_col)
+            self.goal_counts[root] += 1 if new_goals[node_row - row_idx, node_col - col_idx] else -1
+        self.goal_flags[rows, cols] = new_goals
+        return True
+
+    def __open_edges(self, row_start: int, row_end: int, col_start: int, col_end: int) -> List[np.ndarray]:
+        """
+        Which edges along and across the tiles [row_start, row_end) x [col_start, col_end) the role can go down:
+        horizontal, vertical, diagonal down, diagonal up (indexed like the arrays of the same names)
+        """
+        costs = self.costs
+        node_rows, node_cols = slice(row_start, row_end + 1), slice(col_start, col_end + 1)
+        tile_rows, tile_cols = slice(row_start + 1, row_end + 1), slice(col_start + 1, col_end + 1)
+        horizontal = np.isfinite(costs.horizontal[node_rows, tile_cols])
+        vertical = np.isfinite(costs.vertical[tile_rows, node_cols])
+        if self.model.blocked_code is not None:
+            # the tables are padded with a row / column of tiles that are never blocked
+            blocked = costs.blocked_tiles
+            horizontal &= ~(blocked[row_start:row_end + 1, tile_cols] & blocked[row_start + 1:row_end + 2, tile_cols])
+            vertical &= ~(blocked[tile_rows, col_start:col_end + 1] & blocked[tile_rows, col_start + 1:col_end + 2])
+        if not self.model.diagonal_moves:
+            closed = np.zeros((row_end - row_start, col_end - col_start), dtype=bool)
+            return [horizontal, vertical, closed, closed]
+        return [
+            horizontal,
+            vertical,
+            np.isfinite(costs.diagonal_down[tile_rows, tile_cols]),
+            np.isfinite(costs.diagonal_up[tile_rows, tile_cols])
+        ]
+
+    def __find(self, idx: int) -> int:
+        parent = self.parent
+        up = parent.item(idx)
+        while up != idx:
+            # path halving
+            grand = parent.item(up)
+            parent[idx] = grand
+            idx, up = grand, parent.item(grand)
+        return idx
+
+    def __union(self, one: int, two: int):
+        one, two = self.__find(one), self.__find(two)
+        if one == two:
+            return
+        # the smaller index is the root, like the labels of a rebuild
+        root, child = min(one, two), max(one, two)
+        self.parent[child] = root
+        self.goal_counts[root] += self.goal_counts[child]
+        self.goal_counts[child] = 0
+
+
+def _on_grid(node: Node) -> bool:
+    return isinstance(node.row_idx, int) and isinstance(node.col_idx, int)
+
+
+def _label_components(num_nodes: int, one: np.ndarray, two: np.ndarray) -> np.ndarray:
+    """
+    Union-find of all the edges at once: every root of a component with an edge to a smaller root is hooked under
+    the smallest one, then the trees are flattened, until no edge is between two components.
+    Returns the smallest node of its component for every node
+    """
+    parent = np.arange(num_nodes, dtype=np.int64)
+    while True:
+        root_one, root_two = parent[one], parent[two]
+        across = root_one != root_two
+        if not across.any():
+            return parent
+        one, two = one[across], two[across]
+        root_one, root_two = root_one[across], root_two[across]
+        np.minimum.at(parent, np.maximum(root_one, root_two), np.minimum(root_one, root_two))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
@@ -0,0 +1,264 @@
+"""
+
+Rectangular symmetry reduction for role C, skips the inside of the uniform regions of the map
+
+A node is free when the 4 tiles around it have the same type (not the blocked type, not the goal type): its 4
+straight edges exist and all cost the same. The free nodes are covered with empty rectangles, and inside one every
+path between two nodes of its perimeter with the fewest moves costs the same. So the search never goes inside the
+rectangles, from a node on the perimeter it only moves:
+    along the perimeter, and out of the rectangle, like the regular search does
+    straight across the rectangle to the opposite side, in one step that costs all the moves it skips
+
+Paths with the fewest moves between two perimeter nodes can always be made of such moves, so the costs are the same
+as the regular search. The nodes that are in no rectangle (tile type boundaries, goal nodes, borders of the map)
+are expanded as usual, and the path is filled back in across the rectangles once the goal is reached.
+
+"""
+from __future__ import annotations
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
+from mapper.core.tile import Quarantine
+from mapper.algos.base import InfoContainer
+from mapper.algos.c import RoleCAlgo
+from mapper.algos.cost import CostModel
+
+# rectangles need an inside (at least 3 x 3 nodes) to save anything
+MIN_SIDE = 3
+# top row, left column, bottom row, right column (inclusive, node indices), type code of the tiles
+Rectangle = Tuple[int, int, int, int, int]
+
+
+class EmptyRectangles:
+    """
+
+    Empty rectangles of free nodes for a cost model, attached to the map so it hears about every tile change
+
+    Rectangles with a node that stops being free are dropped, and their area is covered again the next time
+    the rectangles are used
+
+    """
+    def __init__(self, cov_map: Map, model: CostModel):
+        if cov_map.chunked:
+            # the free nodes of the whole map would have to be in memory
+            raise RuntimeError('No rectangles on chunked maps')
+        self.map: Map = cov_map
+        self.model: CostModel = model
+        # rectangle of every node, -1 for the nodes that are in none
+        self.rect_ids: np.ndarray = np.full((cov_map.num_rows + 1, cov_map.num_columns + 1), -1, dtype=np.int32)
+        self.rects: List[Optional[Rectangle]] = []
+        # areas of the dropped rectangles, to cover again
+        self.dropped: List[Rectangle] = []
+        self.__cover(0, cov_map.num_rows + 1, 0, cov_map.num_columns + 1)
+
+    @staticmethod
+    def for_map(cov_map: Map, model: CostModel) -> EmptyRectangles:
+        """
+        Rectangles of the model for the map, created the first time and then kept up to date by the map
+        """
+        return cov_map.attached(('rectangles', model.name), lambda: EmptyRectangles(cov_map, model))
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        # the 4 nodes around the tile
+        for rect_id in np.unique(self.rect_ids[row_idx:row_idx + 2, col_idx:col_idx + 2]):
+            if rect_id >= 0:
+                self.__drop(rect_id)
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        # the nodes around the tiles
+        for rect_id in np.unique(self.rect_ids[row_start:row_end + 1, col_start:col_end + 1]):
+            if rect_id >= 0:
+                self.__drop(rect_id)
+
+    def nodes_changed(self, nodes: List[Node]):
+        # nothing to do, the rectangles with user points in them are skipped by every search (see RoleCRectangleAlgo)
+        pass
+
+    def update(self):
+        """
+        Covers the areas of the rectangles dropped since the last update
+        """
+        dropped, self.dropped = self.dropped, []
+        for top, left, bottom, right, _ in dropped:
+            self.__cover(top, bottom + 1, left, right + 1)
+
+    def __drop(self, rect_id: int):
+        top, left, bottom, right, _ = rect = self.rects[rect_id]
+        self.rect_ids[top:bottom + 1, left:right + 1] = -1
+        self.rects[rect_id] = None
+        self.dropped.append(rect)
+
+    def rect_of(self, row_idx: int, col_idx: int) -> int:
+        return self.rect_ids.item(row_idx, col_idx)
+
+    def __free_codes(self, row_start: int, row_end: int, col_start: int, col_end: int) -> np.ndarray:
+        """
+        Type code of the tiles around each node of the window if the node is free, -1 if it is not
+        """
+        codes = np.full((row_end - row_start, col_end - col_start), -1, dtype=np.int16)
+        # only the nodes inside the map have 4 tiles around them
+        top, left = max(row_start, 1), max(col_start, 1)
+        bottom, right = min(row_end, self.map.num_rows), min(col_end, self.map.num_columns)
+        if top >= bottom or left >= right:
+            return codes
+        tiles = np.asarray(self.map.type_codes[top - 1:bottom, left - 1:right]).astype(np.int16)
+        code = tiles[:-1, :-1]
+        free = (
+            (code == tiles[:-1, 1:]) & (code == tiles[1:, :-1]) & (code == tiles[1:, 1:]) &
+            (code != self.model.blocked_code) & (code != Quarantine.code)
+        )
+        codes[top - row_start:bottom - row_start, left - col_start:right - col_start] = np.where(free, code, -1)
+        return codes
+
+    def __cover(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        """
+        Covers the free nodes of the window with rectangles, greedily: the first free node left (row by row) starts
+        a rectangle as wide as the free nodes on its row, as high as the rows below are free all along
+        """
+        codes = self.__free_codes(row_start, row_end, col_start, col_end)
+        taken = np.zeros(codes.shape, dtype=bool)
+        for row in range(codes.shape[0] - MIN_SIDE + 1):
+            open_nodes = (codes[row] >= 0) & ~taken[row]
+            # runs of open nodes of the same code on the row
+            bounds = np.flatnonzero(np.diff(np.concatenate(([-1], np.where(open_nodes, codes[row], -1), [-1]))))
+            for left, right in zip(bounds[:-1], bounds[1:]):
+                code = codes[row, left]
+                if right - left < MIN_SIDE or not open_nodes[left]:
+                    continue
+                bottom = row + 1
+                while (
+                    bottom < codes.shape[0] and
+                    (codes[bottom, left:right] == code).all() and not taken[bottom, left:right].any()
+                ):
+                    bottom += 1
+                if bottom - row < MIN_SIDE:
+                    continue
+                taken[row:bottom, left:right] = True
+                rect_id = len(self.rects)
+                self.rects.append(
+                    (row_start + row, col_start + left, row_start + bottom - 1, col_start + right - 1, int(code))
+                )
+                self.rect_ids[row_start + row:row_start + bottom, col_start + left:col_start + right] = rect_id
+
+
+class RoleCRectangleAlgo(RoleCAlgo):
+    """
+
+    Role C that goes across the empty rectangles of the map instead of through them, same costs as RoleCAlgo
+
+    """
+    def __init__(self, cov_map: Map, queue_type: Optional[str] = None, graph: VirtualPoints = None):
+        super().__init__(cov_map, queue_type, graph)
+        self.rectangles: Optional[EmptyRectangles] = None
+        # rectangles that have nodes whose edges were changed by user points --> the pieces of the rectangle
+        # around those nodes, used instead of it for this search
+        self.pieces: Dict[int, List[Rectangle]] = {}
+
+    def before_search(self):
+        super().before_search()
+        self.rectangles = EmptyRectangles.for_map(self.map, self.cost_model)
+        self.rectangles.update()
+        edited: Dict[int, List[Tuple[int, int]]] = {}
+        for user_node in self.graph.user_nodes():
+            for edge in self.graph.edges(user_node):
+                other_node = edge.get_other_node(user_node)
+                if _on_grid(other_node):
+                    rect_id = self.rectangles.rect_of(other_node.row_idx, other_node.col_idx)
+                    if rect_id >= 0:
+                        edited.setdefault(rect_id, []).append((other_node.row_idx, other_node.col_idx))
+        self.pieces = {
+            rect_id: _pieces_around(self.rectangles.rects[rect_id], nodes) for rect_id, nodes in edited.items()
+        }
+
+    def after_search(self, goal_info: Optional[InfoContainer]) -> Optional[InfoContainer]:
+        return self.__fill_path(goal_info)
+
+    def successors(self, node_info: InfoContainer) -> Iterator[Tuple[Node, float, Optional[str]]]:
+        node = node_info.node
+        rect = self.__rect_of(node) if _on_grid(node) else None
+        if rect is None:
+            yield from super().successors(node_info)
+            return
+        top, left, bottom, right, code = rect
+        row_idx, col_idx = node.row_idx, node.col_idx
+        step_cost = float(self.cost_model.tile_costs[code])
+        inside = top < row_idx < bottom and left < col_idx < right
+        if not inside:
+            # along the perimeter and out of the rectangle
+            for other_node, cost, label in super().successors(node_info):
+                if not (top < other_node.row_idx < bottom and left < other_node.col_idx < right):
+                    yield other_node, cost, label
+        # straight across to the opposite sides (only the start can be inside, it goes to all 4 sides)
+        if inside or row_idx == top:
+            yield self.map.get_node(bottom, col_idx), step_cost * (bottom - row_idx), None
+        if inside or row_idx == bottom:
+            yield self.map.get_node(top, col_idx), step_cost * (row_idx - top), None
+        if inside or col_idx == left:
+            yield self.map.get_node(row_idx, right), step_cost * (right - col_idx), None
+        if inside or col_idx == right:
+            yield self.map.get_node(row_idx, left), step_cost * (col_idx - left), None
+
+    def __rect_of(self, node: Node) -> Optional[Rectangle]:
+        rect_id = self.rectangles.rect_of(node.row_idx, node.col_idx)
+        if rect_id < 0:
+            return None
+        pieces = self.pieces.get(rect_id)
+        if pieces is None:
+            return self.rectangles.rects[rect_id]
+        for top, left, bottom, right, code in pieces:
+            if top <= node.row_idx <= bottom and left <= node.col_idx <= right:
+                return top, left, bottom, right, code
+        return None
+
+    def __fill_path(self, goal_info: Optional[InfoContainer]) -> Optional[InfoContainer]:
+        """
+        Puts back the nodes skipped across the rectangles, one move at a time with the cost spread evenly
+        """
+        if goal_info is None:
+            return None
+        infos = []
+        node_info = goal_info
+        while node_info is not None:
+            infos.append(node_info)
+            node_info = node_info.parent
+        infos.reverse()
+        filled = infos[0]
+        for node_info in infos[1:]:
+            from_node, to_node = filled.node, node_info.node
+            if _on_grid(from_node) and _on_grid(to_node):
+                num_moves = abs(to_node.row_idx - from_node.row_idx) + abs(to_node.col_idx - from_node.col_idx)
+                row_offset = (to_node.row_idx - from_node.row_idx) // num_moves
+                col_offset = (to_node.col_idx - from_node.col_idx) // num_moves
+                step_cost = (node_info.cost - filled.cost) / num_moves
+                for move in range(1, num_moves):
+                    node = self.map.get_node(from_node.row_idx + row_offset * move, from_node.col_idx + col_offset * move)
+                    filled = InfoContainer(node, filled, filled.cost + step_cost)
+            filled = InfoContainer(to_node, filled, node_info.cost, node_info.label)
+        return filled
+
+
+def _pieces_around(rect: Rectangle, nodes: List[Tuple[int, int]]) -> List[Rectangle]:
+    """
+    The parts of the rectangle above, below, left and right of the box around the nodes (the big enough ones)
+    """
+    top, left, bottom, right, code = rect
+    box_top, box_bottom = min(row for row, _ in nodes), max(row for row, _ in nodes)
+    box_left, box_right = min(col for _, col in nodes), max(col for _, col in nodes)
+    pieces = [
+        (top, left, box_top - 1, right, code),
+        (box_bottom + 1, left, bottom, right, code),
+        (box_top, left, box_bottom, box_left - 1, code),
+        (box_top, box_right + 1, box_bottom, right, code),
+    ]
+    return [
+        piece for piece in pieces
+        if piece[2] - piece[0] + 1 >= MIN_SIDE and piece[3] - piece[1] + 1 >= MIN_SIDE
+    ]
+
+
+def _on_grid(node: Node) -> bool:
+    return isinstance(node.row_idx, int) and isinstance(node.col_idx, int)
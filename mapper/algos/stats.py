@@ -0,0 +1,162 @@
+"""
+
+What a search did and where its time went, collected by HeuristicAStar when the role has a SearchStats
+(role.stats = SearchStats(), or Map.route(..., stats=SearchStats())), nothing is collected otherwise
+
+    expanded        -- nodes taken off the open queue and expanded
+    generated       -- successors looked at (moves out of the expanded nodes)
+    queued          -- successors put on the open queue
+    duplicates      -- successors not queued: closed already, or queued with a path at least as cheap
+    stale_pops      -- entries taken off the open queue for nodes that were expanded already
+    peak_queue      -- most entries on the open queue at once
+    peak_bytes      -- estimate of the peak memory of the open queue, the closed set and the best g(n) of the nodes
+    d_map_seconds   -- everything before the A* loop: the reachability check (see Reachability) and building
+                       the distance field / cost tables (before_search)
+    search_seconds  -- the A* loop
+    path_seconds    -- rebuilding the path from the goal (by run(), or by whoever rebuilds it, i.e. the batch runner)
+
+The bidirectional search of Map.route(..., to_end=True) collects the same fields, over its two sides.
+path_seconds is None until the path is rebuilt, and a field is None when the search doesn't collect it
+
+"""
+from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from mapper.core.node import Node
+
+if TYPE_CHECKING:
+    from mapper.algos.base import InfoContainer
+
+# an entry of the open queue (a tuple and its priority), without the info
+QUEUE_ENTRY_BYTES = sys.getsizeof((0.0, 0, None)) + sys.getsizeof(0.0)
+COUNTS = ['expanded', 'generated', 'queued', 'duplicates', 'stale_pops']
+TIMINGS = ['d_map_seconds', 'search_seconds', 'path_seconds']
+Number = Union[int, float]
+
+
+class SearchStats:
+    """
+
+    Counters and timings of the last search (see the module, None when not collected), add() sums the stats of
+    several searches
+
+    """
+    def __init__(self):
+        self.expanded: Optional[int] = 0
+        self.generated: Optional[int] = 0
+        self.queued: Optional[int] = 0
+        self.duplicates: Optional[int] = 0
+        self.stale_pops: Optional[int] = 0
+        self.peak_queue: Optional[int] = 0
+        self.peak_bytes: Optional[int] = 0
+        self.d_map_seconds: Optional[float] = 0.0
+        self.search_seconds: Optional[float] = 0.0
+        self.path_seconds: Optional[float] = 0.0
+
+    def add(self, other: SearchStats):
+        """
+        Adds the counts and timings of the other stats, keeps the largest peaks (a field collected by neither
+        stays None)
+        """
+        for name in COUNTS + TIMINGS:
+            setattr(self, name, _combine(getattr(self, name), getattr(other, name), lambda one, two: one + two))
+        for name in ['peak_queue', 'peak_bytes']:
+            setattr(self, name, _combine(getattr(self, name), getattr(other, name), max))
+
+    def to_dict(self) -> Dict[str, Optional[Union[int, float]]]:
+        return {name: getattr(self, name) for name in COUNTS + ['peak_queue', 'peak_bytes'] + TIMINGS}
+
+    def summary(self) -> str:
+        total = sum(getattr(self, name) or 0.0 for name in TIMINGS)
+        peak_bytes = None if self.peak_bytes is None else f'{self.peak_bytes / 1024:.1f}'
+        return (
+            f'   Expanded: {_shown(self.expanded)}, generated: {_shown(self.generated)}, '
+            f'queued: {_shown(self.queued)}, duplicates: {_shown(self.duplicates)}, '
+            f'stale pops: {_shown(self.stale_pops)}\n'
+            f'   Peak queue: {_shown(self.peak_queue)} entries, open / closed sets ~{_shown(peak_bytes)} KB\n'
+            f'   Time: {total * 1000:.2f} ms (d_map {_shown_ms(self.d_map_seconds)}, '
+            f'search {_shown_ms(self.search_seconds)}, path {_shown_ms(self.path_seconds)})'
+        )
+
+
+class SearchProgress:
+    """
+
+    Where a stepwise search is (see HeuristicAStar.steps): nodes expanded so far, entries on the open queue
+    (frontier), nodes in the closed set, f(n) = g(n) + h(n) of the last node expanded and time since it started
+
+    """
+    def __init__(self, expanded: int, frontier: int, closed: int, f_value: float, seconds: float):
+        self.expanded: int = expanded
+        self.frontier: int = frontier
+        self.closed: int = closed
+        self.f_value: float = f_value
+        self.seconds: float = seconds
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        return {
+            'expanded': self.expanded,
+            'frontier': self.frontier,
+            'closed': self.closed,
+            'f_value': self.f_value,
+            'seconds': self.seconds,
+        }
+
+
+class SearchResult:
+    """
+    Goal reached by a search (None if no path), its path and cost, and the stats of the search
+    (and for the bounded searches, how far the cost can be from the cheapest one, see mapper.algos.anytime)
+    """
+
+    def __init__(self,
+                 goal_info: Optional[InfoContainer],
+                 path: List[Union[Node, str]],
+                 stats: Optional[SearchStats],
+                 bound: Optional[float] = None):
+        self.goal_info: Optional[InfoContainer] = goal_info
+        self.path: List[Union[Node, str]] = path
+        self.cost: Optional[float] = None if goal_info is None else goal_info.cost
+        self.stats: Optional[SearchStats] = stats
+        # cost <= bound x cheapest cost, None when not known
+        self.bound: Optional[float] = bound
+
+    @property
+    def found(self) -> bool:
+        return self.goal_info is not None
+
+    def path_names(self, graph: Any = None) -> List[str]:
+        """
+        Names of the nodes of the path (as graph names them, i.e. VirtualPoints), and the labels between them
+        """
+        return [
+            (elem.get_name() if graph is None else graph.node_name(elem)) if isinstance(elem, Node) else elem
+            for elem in self.path
+        ]
+
+    def to_dict(self, graph: Any = None) -> Dict[str, Any]:
+        result = {
+            'path': self.path_names(graph) if self.found else None,
+            'cost': self.cost,
+            'stats': None if self.stats is None else self.stats.to_dict(),
+        }
+        if self.bound is not None:
+            result['bound'] = self.bound
+        return result
+
+
+def _combine(value: Optional[Number],
+             other: Optional[Number],
+             how: Callable[[Number, Number], Number]) -> Optional[Number]:
+    if value is None or other is None:
+        return other if value is None else value
+    return how(value, other)
+
+
+def _shown(value: Any) -> str:
+    return 'n/a' if value is None else str(value)
+
+
+def _shown_ms(seconds: Optional[float]) -> str:
+    return 'n/a' if seconds is None else f'{seconds * 1000:.2f} ms'
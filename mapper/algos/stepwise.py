@@ -0,0 +1,121 @@
+"""
+
+Stepwise searches: the A* search of a role (HeuristicAStar.steps) run a chunk of expansions at a time, so a UI or a
+server can run many long searches side by side, show how far they got, and drop the ones that are no longer wanted
+
+    search = SteppedSearch(role, every=500)
+    while not search.done:
+        progress = search.step()        # 500 more expansions at most
+        if start_moved:
+            search.cancel()             # the search stops there, it can't be resumed
+
+    # from an asyncio event loop, the loop gets control back between chunks (task.cancel() cancels the search)
+    result = await SteppedSearch(role, every=500).run_async()
+
+The search does nothing between two steps, it only goes on when it is stepped, so cancelling is cooperative: a
+cancelled search stops at the end of its current chunk at the latest.
+
+"""
+import asyncio
+from time import perf_counter
+from typing import Iterator, List, Optional
+
+from mapper.algos.base import HeuristicAStar, InfoContainer
+from mapper.algos.stats import SearchProgress, SearchResult
+
+
+class SteppedSearch:
+    """
+
+    The search of a role, every step expands up to `every` nodes (the first one also builds what the heuristic needs)
+
+    """
+    def __init__(self, role: HeuristicAStar, every: int = 1000):
+        if every < 1:
+            raise RuntimeError(f'Invalid number of expansions per step {every}')
+        self.role: HeuristicAStar = role
+        self.every: int = every
+        # progress after the last step, None before the first one
+        self.progress: Optional[SearchProgress] = None
+        self.done: bool = False
+        self.cancelled: bool = False
+        # goal reached once done (None if there is no path, or the search was cancelled)
+        self.goal_info: Optional[InfoContainer] = None
+        self.__steps = None
+
+    def step(self) -> Optional[SearchProgress]:
+        """
+        Runs the search for up to `every` more expansions, returns its progress (the last one once it's done)
+        """
+        if self.done:
+            return self.progress
+        if self.__steps is None:
+            self.__steps = self.role.steps(self.every)
+        try:
+            self.progress = next(self.__steps)
+        except StopIteration as stop:
+            self.goal_info = stop.value
+            self.done = True
+        return self.progress
+
+    def cancel(self):
+        """
+        Stops the search where it is, for good (nothing to do if it's done already)
+        """
+        if self.done:
+            return
+        if self.__steps is not None:
+            self.__steps.close()
+        self.done = self.cancelled = True
+
+    def __iter__(self) -> Iterator[SearchProgress]:
+        """
+        Steps the search to the end, yields the progress after every step
+        """
+        while not self.done:
+            progress = self.step()
+            if not self.done:
+                yield progress
+
+    def result(self) -> Optional[SearchResult]:
+        """
+        Goal reached, path and cost once the search is done (None while it runs, or if it was cancelled)
+        """
+        if not self.done or self.cancelled:
+            return None
+        path_start = perf_counter()
+        path = [] if self.goal_info is None else self.goal_info.path()
+        if self.role.stats is not None:
+            self.role.stats.path_seconds = perf_counter() - path_start
+        return SearchResult(self.goal_info, path, self.role.stats)
+
+    async def run_async(self, pause: float = 0.0) -> Optional[SearchResult]:
+        """
+        Steps the search to the end from an event loop, giving it back for `pause` seconds between steps,
+        cancelling the task running it cancels the search
+        """
+        try:
+            while not self.done:
+                self.step()
+                await asyncio.sleep(pause)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        return self.result()
+
+
+def run_interleaved(searches: List[SteppedSearch]) -> Iterator[SteppedSearch]:
+    """
+    Steps the searches in turn, one step each, and yields every search when it is done (cancelled ones included,
+    the caller can cancel any of them in between)
+    """
+    running = list(searches)
+    while running:
+        still_running = []
+        for search in running:
+            search.step()
+            if search.done:
+                yield search
+            else:
+                still_running.append(search)
+        running = still_running
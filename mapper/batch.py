@@ -0,0 +1,201 @@
+"""
+
+Non-interactive batch runner, runs scenarios from a JSONL file across a pool of processes
+
+One scenario per line:
+    {"id": "a", "rows": 3, "columns": 4, "tiles": {"1": "V", "6": "Q"}, "start": [0.5, 1], "end": [2, 2], "role": "C"}
+        id       -- optional, copied to the result (defaults to the line number)
+        tiles    -- tile index (as in the Driver, starting at 1) --> type, or a list of [index, type]
+        layout   -- optional, one string of V / P / Q / U per row of tiles, assigned before the tiles
+        end      -- optional
+        compact  -- optional, build the map in compact mode
+        queue    -- optional, priority queue backend of the search (see mapper.core.pqueue.QUEUE_TYPES),
+                    defaults to the one of the role (default_queue_type), not with to_end or anytime
+        to_end   -- optional, route from start to end instead of to the closest goal tile (see Map.route)
+        stats    -- optional, add the counters and timings of the search to the result (see mapper.algos.stats)
+        anytime  -- optional, settings of a weighted A* / ARA* search with a budget instead (see AnytimeSearch),
+                    i.e. {"epsilon": 3, "final_epsilon": 1, "max_seconds": 0.05}, adds the "bound" of the path
+                    and whether the search ran "out_of_budget" to the result (the stats are over all its runs)
+        rectangles -- optional, skip the inside of the uniform regions of the map (role C only, see
+                    RoleCRectangleAlgo), also for an anytime search
+        hierarchical -- optional, true or the settings of a hierarchical search instead (see HierarchicalSearch),
+                    i.e. {"cluster_size": 8}, on the map with START added to it, adds whether it "fell_back" to the
+                    flat search to the result (no queue, to_end, anytime, stats or rectangles)
+
+One JSON result per scenario, in the same order as the input:
+    {"id": "a", "path": ["START", "left --> down", "F", ...], "cost": 2.5, "seconds": 0.0004, "warnings": []}
+    path and cost are null when there is no path, an "error" is reported instead if the scenario can't run
+
+    python -m mapper.batch scenarios.jsonl [--workers 4] [--chunksize 16] [--output results.jsonl]
+
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
+from mapper.algos.anytime import AnytimeSearch
+from mapper.algos.base import InfoContainer
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.hierarchical import HierarchicalSearch
+from mapper.algos.stats import SearchStats
+
+
+def run_scenario(line_info: Tuple[int, str]) -> str:
+    """
+    Runs the scenario on one line of the input, returns its result as a JSON line
+    """
+    line_num, line = line_info
+    result: Dict[str, Any] = {'id': line_num}
+    try:
+        scenario = json.loads(line)
+        result['id'] = scenario.get('id', line_num)
+        result.update(_search(scenario))
+    except Exception as error:
+        result['error'] = f'{error.__class__.__name__}: {error}'
+    return json.dumps(result)
+
+
+def _search(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    cov_map = Map(
+        num_columns=int(scenario['columns']),
+        num_rows=int(scenario['rows']),
+        compact=bool(scenario.get('compact', False))
+    )
+    if 'layout' in scenario:
+        cov_map.assign_tiles(scenario['layout'])
+    tiles = scenario.get('tiles', {})
+    for tile_index, tile_type in (tiles.items() if isinstance(tiles, dict) else tiles):
+        if not cov_map.validate_index(int(tile_index)):
+            raise RuntimeError(f'Tile {tile_index} is not in the map')
+        cov_map.update_tile(int(tile_index), tile_type)
+    start = _point(scenario['start'])
+    end = _point(scenario.get('end'))
+    start_time = perf_counter()
+    # the roles print their warnings, keep them out of the results stream
+    output = io.StringIO()
+    stats = SearchStats() if scenario.get('stats', False) else None
+    search, hierarchical = None, None
+    with contextlib.redirect_stdout(output):
+        if 'hierarchical' in scenario:
+            success_info, graph, hierarchical = _hierarchical_route(cov_map, scenario, start)
+        elif 'anytime' in scenario:
+            success_info, graph, search = _anytime_route(cov_map, scenario, start, end, stats)
+        else:
+            success_info, graph = cov_map.route(
+                scenario['role'].upper(),
+                start,
+                end,
+                scenario.get('queue'),
+                bool(scenario.get('to_end', False)),
+                stats,
+                bool(scenario.get('rectangles', False))
+            )
+    seconds = perf_counter() - start_time
+    if success_info is None:
+        path, cost = None, None
+    else:
+        path_start = perf_counter()
+        path = [graph.node_name(elem) if isinstance(elem, Node) else elem for elem in success_info.path()]
+        cost = success_info.cost
+        if stats is not None:
+            stats.path_seconds = perf_counter() - path_start
+    result = {
+        'path': path,
+        'cost': cost,
+        'seconds': seconds,
+        'warnings': [line.strip() for line in output.getvalue().splitlines() if line.strip() != ''],
+    }
+    if stats is not None:
+        result['stats'] = stats.to_dict()
+    if search is not None:
+        result['bound'] = search.bound
+        result['out_of_budget'] = search.out_of_budget
+    if hierarchical is not None:
+        result['fell_back'] = hierarchical.fell_back
+    return result
+
+
+def _anytime_route(cov_map: Map,
+                   scenario: Dict[str, Any],
+                   start: Tuple[float, float],
+                   end: Optional[Tuple[float, float]],
+                   stats: Optional[SearchStats]) -> Tuple[Optional[InfoContainer], VirtualPoints, AnytimeSearch]:
+    # like Map.route, with the search of the role wrapped in an AnytimeSearch
+    if scenario.get('to_end', False):
+        raise RuntimeError('No anytime search from START to END')
+    if scenario.get('queue') is not None:
+        raise RuntimeError(f'The anytime search keeps its own queue, not a {scenario["queue"]} queue')
+    points = [('START', start)] if end is None else [('START', start), ('END', end)]
+    graph = VirtualPoints(cov_map, points)
+    role = RoleAlgoFactory(cov_map).create(
+        scenario['role'].upper(), graph=graph, rectangles=bool(scenario.get('rectangles', False))
+    )
+    role.stats = stats
+    search = AnytimeSearch(role, **scenario['anytime'])
+    return search.find_path(), graph, search
+
+
+def _hierarchical_route(cov_map: Map,
+                        scenario: Dict[str, Any],
+                        start: Tuple[float, float]) -> Tuple[Optional[InfoContainer], Map, HierarchicalSearch]:
+    # the clusters are built on the map itself, START is added to it (the map is only used by this scenario)
+    for option in ['queue', 'to_end', 'anytime', 'stats', 'rectangles']:
+        if scenario.get(option):
+            raise RuntimeError(f'No {option} for the hierarchical search')
+    cov_map.add_point(*start, 'START')
+    settings = scenario['hierarchical']
+    search = HierarchicalSearch(cov_map, scenario['role'].upper(), **(settings if isinstance(settings, dict) else {}))
+    return search.find_path(), cov_map, search
+
+
+def _point(point: Optional[Any]) -> Optional[Tuple[float, float]]:
+    if point is None:
+        return None
+    x, y = point
+    return float(x), float(y)
+
+
+def run_batch(lines: Iterator[str], workers: int = None, chunksize: int = 1) -> Iterator[str]:
+    """
+    Yields the result of every scenario, in input order, as soon as it and the ones before it are done
+
+    workers -- number of processes (None = one per CPU), 1 runs the scenarios in this process
+    """
+    numbered = ((line_num, line) for line_num, line in enumerate(lines, 1) if line.strip() != '')
+    if workers == 1:
+        yield from map(run_scenario, numbered)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run_scenario, numbered, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the scenarios of a JSONL file, one JSON result per line')
+    parser.add_argument('scenarios', help='JSONL file of scenarios, - for stdin')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: one per CPU)')
+    parser.add_argument('--chunksize', type=int, default=1, help='scenarios sent to a process at once')
+    parser.add_argument('--output', default=None, help='file to write the results to (default: stdout)')
+    args = parser.parse_args()
+    scenarios = sys.stdin if args.scenarios == '-' else open(args.scenarios)
+    output = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        for result in run_batch(scenarios, args.workers, args.chunksize):
+            output.write(result + '\n')
+            output.flush()
+    finally:
+        if scenarios is not sys.stdin:
+            scenarios.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+
+Seeded synthetic maps for the benchmarks
+
+A layout gets exactly round(density * tiles) tiles of each of V, P and Q (the rest unassigned): every tile gets a
+random score, the lowest scores are V, then P, then Q. With random scores the types are scattered evenly, with
+clustered scores (coarse noise blown up to cluster_size x cluster_size patches, plus a little fine noise) each type
+comes in blobs like real layouts (parks, quarantine zones).
+
+"""
+from math import ceil
+from typing import Dict, Tuple
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.tile import TILE_CODES
+
+RANDOM = 'random'
+CLUSTERED = 'clustered'
+LAYOUTS = [RANDOM, CLUSTERED]
+# sparse goal tiles, so the searches have some way to go
+DEFAULT_DENSITIES = {'V': 0.01, 'P': 0.05, 'Q': 0.01}
+
+
+def generate_layout(num_rows: int,
+                    num_cols: int,
+                    densities: Dict[str, float] = None,
+                    layout: str = RANDOM,
+                    cluster_size: int = 8,
+                    seed: int = 472) -> np.ndarray:
+    """
+    (rows x columns) uint8 array of type codes (see TILE_CODES), the same for the same arguments
+    """
+    densities = DEFAULT_DENSITIES if densities is None else densities
+    if sum(densities.values()) > 1 or any(density < 0 for density in densities.values()):
+        raise RuntimeError(f'Invalid tile densities {densities}')
+    rand = np.random.RandomState(seed)
+    if layout == RANDOM:
+        scores = rand.random_sample((num_rows, num_cols))
+    elif layout == CLUSTERED:
+        coarse = rand.random_sample((ceil(num_rows / cluster_size), ceil(num_cols / cluster_size)))
+        patches = np.repeat(np.repeat(coarse, cluster_size, axis=0), cluster_size, axis=1)[:num_rows, :num_cols]
+        scores = patches + 0.1 * rand.random_sample((num_rows, num_cols))
+    else:
+        raise RuntimeError(f'No layout {layout}, choose from {LAYOUTS}')
+    codes = np.zeros(num_rows * num_cols, dtype=np.uint8)
+    order = np.argsort(scores, axis=None, kind='stable')
+    first = 0
+    for key in ['V', 'P', 'Q']:
+        num_tiles = int(round(densities.get(key, 0.0) * codes.size))
+        codes[order[first:first + num_tiles]] = TILE_CODES[key]
+        first += num_tiles
+    return codes.reshape((num_rows, num_cols))
+
+
+def start_point(num_rows: int, num_cols: int, seed: int = 472) -> Tuple[float, float]:
+    """
+    (x, y) in the middle of a random tile
+    """
+    rand = np.random.RandomState(seed + 1)
+    return float(rand.randint(num_cols)) + 0.5, float(rand.randint(num_rows)) + 0.5
+
+
+def generate_map(num_rows: int,
+                 num_cols: int,
+                 densities: Dict[str, float] = None,
+                 layout: str = RANDOM,
+                 compact: bool = False,
+                 seed: int = 472) -> Map:
+    """
+    Map with a generated layout and a START in the middle of a random tile
+    """
+    cov_map = Map(num_columns=num_cols, num_rows=num_rows, compact=compact)
+    cov_map.assign_tiles(generate_layout(num_rows, num_cols, densities, layout, seed=seed))
+    x, y = start_point(num_rows, num_cols, seed)
+    cov_map.add_point(x, y, 'START')
+    return cov_map
@@ -0,0 +1,61 @@
+"""
+
+Micro-benchmark of the priority queue backends in mapper.core.pqueue
+
+Replays an A*-like workload (each dequeue is followed by a handful of queues with slightly higher priorities)
+against every backend, once with priorities in steps of 0.5 like the RoleC/RoleP edge costs and once with
+fractional priorities like the euclidean heuristic of RoleV.
+
+    python -m mapper.bench.pqueue [num_pops] [branching]
+
+"""
+import random
+import sys
+from time import perf_counter
+from typing import List, Tuple
+
+from mapper.core.pqueue import QUEUE_TYPES, create_queue
+
+
+def build_workload(num_pops: int, branching: int, fractional: bool, seed: int = 472) -> List[List[float]]:
+    """
+    For every dequeue, the priority offsets of the items queued after it
+    """
+    rand = random.Random(seed)
+    if fractional:
+        return [[rand.uniform(0, 3) for _ in range(branching)] for _ in range(num_pops)]
+    return [[rand.randint(0, 6) * 0.5 for _ in range(branching)] for _ in range(num_pops)]
+
+
+def run_workload(queue_type: str, workload: List[List[float]]) -> Tuple[float, int]:
+    """
+    Runs the workload on a fresh queue, returns (seconds, number of items dequeued)
+    """
+    queue = create_queue(queue_type)
+    start = perf_counter()
+    queue.queue(0, 0.0)
+    popped = 0
+    for offsets in workload:
+        if queue.empty():
+            break
+        priority = queue.dequeue()
+        popped += 1
+        for offset in offsets:
+            queue.queue(priority + offset, priority + offset)
+    return perf_counter() - start, popped
+
+
+def main(num_pops: int = 10000, branching: int = 3):
+    for fractional in [False, True]:
+        workload = build_workload(num_pops, branching, fractional)
+        label = 'fractional priorities' if fractional else 'priorities in steps of 0.5'
+        print(f'\n Priority queue backends, {num_pops} pops x {branching} queues each, {label}\n')
+        baseline = None
+        for queue_type in QUEUE_TYPES.keys():
+            seconds, popped = run_workload(queue_type, workload)
+            baseline = seconds if baseline is None else baseline
+            print(f'   {queue_type:<8} {seconds * 1000:>10.1f} ms   {popped:>8} pops   x{baseline / seconds:.1f}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
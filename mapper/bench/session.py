@@ -0,0 +1,167 @@
+"""
+
+Profile of an interactive session: every menu action of the Driver is a phase, and for every phase the report has
+
+    calls, wall time and CPU time (the wall time includes waiting for the user to type, the CPU time doesn't)
+    with cprofile  -- the hottest functions: CPU time spent in the function itself, over all the calls of the phase
+    with memory    -- the largest allocation sites: memory still allocated after the phase (tracemalloc snapshots
+                      before / after every call), and the peak of the phase
+
+cProfile and tracemalloc slow the Python code down, the times of a session profiled with them are only comparable
+to other sessions profiled the same way.
+
+    python -m mapper.driver --profile session.txt --profile-with cprofile,memory
+    MAPPER_PROFILE=session.txt MAPPER_PROFILE_WITH=cprofile python -m mapper.driver
+
+"""
+from __future__ import annotations
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter, process_time
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+CPROFILE = 'cprofile'
+MEMORY = 'memory'
+OPTIONS = [CPROFILE, MEMORY]
+# the allocations of the profiler itself, not of the session
+IGNORED_FILES = [tracemalloc.__file__, pstats.__file__, cProfile.__file__, '<frozen importlib._bootstrap>', '<unknown>']
+
+
+class PhaseProfile:
+    """
+
+    What the calls of one phase took: times, cProfile stats and memory still allocated per allocation site
+
+    """
+    def __init__(self, name: str, cprofile: bool):
+        self.name: str = name
+        self.calls: int = 0
+        self.wall_seconds: float = 0.0
+        self.cpu_seconds: float = 0.0
+        # CPU timer, so the time waiting for input() doesn't make it the hottest function
+        self.profile: Optional[cProfile.Profile] = cProfile.Profile(process_time) if cprofile else None
+        # (file, line) --> [bytes, blocks] still allocated after the calls
+        self.allocations: Dict[Tuple[str, int], List[int]] = {}
+        self.peak_bytes: int = 0
+
+    def add_allocations(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot):
+        for diff in after.compare_to(before, 'lineno'):
+            if diff.size_diff == 0:
+                continue
+            frame = diff.traceback[0]
+            totals = self.allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            totals[0] += diff.size_diff
+            totals[1] += diff.count_diff
+
+
+class SessionProfiler:
+    """
+
+    Times every phase of a session (see the module), phase() wraps one call of a phase
+
+    """
+    def __init__(self, cprofile: bool = False, memory: bool = False, top: int = 10):
+        self.cprofile: bool = cprofile
+        self.memory: bool = memory
+        # functions / allocation sites per phase in the report
+        self.top: int = top
+        self.started: datetime = datetime.now(timezone.utc)
+        # name --> profile, in the order the phases were first run
+        self.phases: Dict[str, PhaseProfile] = {}
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def from_options(options: str, top: int = 10) -> SessionProfiler:
+        """
+        Profiler with the comma separated options (see OPTIONS), i.e. 'cprofile,memory'
+        """
+        chosen = [option.strip().lower() for option in (options or '').split(',') if option.strip() != '']
+        for option in chosen:
+            if option not in OPTIONS:
+                raise RuntimeError(f'No profiling option {option}, choose from {OPTIONS}')
+        return SessionProfiler(CPROFILE in chosen, MEMORY in chosen, top)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseProfile]:
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseProfile(name, self.cprofile)
+        before = None
+        if self.memory:
+            before = self.__snapshot()
+            if hasattr(tracemalloc, 'reset_peak'):
+                # python 3.9+, the peak is the one of the session so far otherwise
+                tracemalloc.reset_peak()
+        wall_start, cpu_start = perf_counter(), process_time()
+        if phase.profile is not None:
+            phase.profile.enable()
+        try:
+            yield phase
+        finally:
+            if phase.profile is not None:
+                phase.profile.disable()
+            phase.calls += 1
+            phase.wall_seconds += perf_counter() - wall_start
+            phase.cpu_seconds += process_time() - cpu_start
+            if before is not None:
+                phase.peak_bytes = max(phase.peak_bytes, tracemalloc.get_traced_memory()[1])
+                phase.add_allocations(before, self.__snapshot())
+
+    @staticmethod
+    def __snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+        )
+
+    def write(self, out: TextIO):
+        """
+        Writes the report of the session: a summary of the phases, then the hottest functions and the largest
+        allocation sites of every phase
+        """
+        out.write(f'\n PROFILE OF THE SESSION started {self.started.isoformat(timespec="seconds")}\n')
+        out.write(f' (cProfile: {"on" if self.cprofile else "off"}, tracemalloc: {"on" if self.memory else "off"})\n\n')
+        out.write(f'   {"phase":<20}{"calls":>7}{"wall s":>11}{"cpu s":>11}{"retained KB":>14}{"peak KB":>11}\n')
+        # the phases that took the most CPU first
+        phases = sorted(self.phases.values(), key=lambda elem: elem.cpu_seconds, reverse=True)
+        for phase in phases:
+            retained = sum(size for size, _ in phase.allocations.values()) / 1024
+            memory = f'{retained:>14.1f}{phase.peak_bytes / 1024:>11.1f}' if self.memory else f'{"-":>14}{"-":>11}'
+            out.write(
+                f'   {phase.name:<20}{phase.calls:>7}{phase.wall_seconds:>11.3f}{phase.cpu_seconds:>11.3f}{memory}\n'
+            )
+        for phase in phases:
+            if phase.profile is not None:
+                self.__write_functions(out, phase)
+            if self.memory:
+                self.__write_allocations(out, phase)
+        out.write('\n')
+
+    def __write_functions(self, out: TextIO, phase: PhaseProfile):
+        out.write(f'\n {phase.name}: hottest functions (CPU time in the function itself)\n\n')
+        try:
+            stats = pstats.Stats(phase.profile).stats
+        except TypeError:
+            # nothing was profiled
+            stats = {}
+        out.write(f'   {"own s":>9}{"total s":>10}{"calls":>10}   function\n')
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        for (filename, lineno, func_name), (_, num_calls, own, total, _) in ranked:
+            where = func_name if filename == '~' else f'{func_name} ({filename}:{lineno})'
+            out.write(f'   {own:>9.4f}{total:>10.4f}{num_calls:>10}   {where}\n')
+
+    def __write_allocations(self, out: TextIO, phase: PhaseProfile):
+        out.write(f'\n {phase.name}: largest allocation sites (memory still allocated after the phase)\n\n')
+        out.write(f'   {"KB":>10}{"blocks":>10}   line\n')
+        ranked = sorted(phase.allocations.items(), key=lambda item: abs(item[1][0]), reverse=True)[:self.top]
+        for (filename, lineno), (size, blocks) in ranked:
+            out.write(f'   {size / 1024:>10.1f}{blocks:>10}   {filename}:{lineno}\n')
+
+    def write_report(self, path: str):
+        with open(path, 'w') as out:
+            self.write(out)
+        if self.memory:
+            tracemalloc.stop()
@@ -0,0 +1,242 @@
+"""
+
+Benchmark suite: map construction, cost tables, heuristic distance fields (d_map), search and rendering
+
+For every size and layout a seeded map is generated (see mapper.bench.maps), then every step is timed:
+    construction  -- Map, tile types and tile index, START
+    render        -- display of the whole map, or of a render_limit x render_limit window of bigger maps
+    cost_tables   -- CostTables of the role
+    d_map         -- distance field of the role heuristic (before_search, the cost tables are already there)
+    search        -- find_path of the role (best of --repeat runs), with the nodes expanded and the path cost
+
+With --memory, the peak memory allocated by every step is measured too (tracemalloc, which slows the Python code
+down, the timings of such a run are only comparable to other runs with --memory).
+
+The results are written as JSON (--output), a run can be compared to an older one with --compare:
+
+    python -m mapper.bench.suite --sizes 10,50,100 --layouts random,clustered --output run.json
+    python -m mapper.bench.suite --sizes 500,1000,2000 --compact --roles C,V --compare run.json
+
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mapper.algos.cost import CostTables
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.bench.maps import DEFAULT_DENSITIES, LAYOUTS, RANDOM, generate_layout, start_point
+from mapper.core.map import Map
+from mapper.core.render import MapRenderer
+
+ROLES = ['C', 'P', 'V']
+# what identifies the same measurement in two runs
+RECORD_KEY = ['rows', 'columns', 'layout', 'compact', 'role', 'step']
+
+
+def measure(step: Callable[[], Any], memory: bool = False) -> Tuple[float, Optional[int], Any]:
+    """
+    Runs the step, returns (seconds, peak bytes allocated by the step or None, what the step returned)
+    """
+    if memory:
+        tracemalloc.start()
+    start = perf_counter()
+    try:
+        value = step()
+        seconds = perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return seconds, peak, value
+
+
+def bench_map(num_rows: int,
+              num_cols: int,
+              layout: str = RANDOM,
+              densities: Dict[str, float] = None,
+              roles: List[str] = None,
+              compact: bool = False,
+              seed: int = 472,
+              repeat: int = 1,
+              render_limit: int = 100,
+              memory: bool = False) -> List[Dict[str, Any]]:
+    """
+    Measures all the steps on one generated map, returns one record per step
+    """
+    roles = ROLES if roles is None else roles
+    codes = generate_layout(num_rows, num_cols, densities, layout, seed=seed)
+    base = {'rows': num_rows, 'columns': num_cols, 'layout': layout, 'compact': compact}
+    records = []
+
+    def record(role: Optional[str], step: str, seconds: float, peak: Optional[int], **extra):
+        records.append(dict(base, role=role, step=step, seconds=seconds, peak_bytes=peak, **extra))
+
+    def construct() -> Map:
+        cov_map = Map(num_columns=num_cols, num_rows=num_rows, compact=compact)
+        cov_map.assign_tiles(codes)
+        cov_map.tile_index()
+        x, y = start_point(num_rows, num_cols, seed)
+        cov_map.add_point(x, y, 'START')
+        return cov_map
+
+    seconds, peak, cov_map = measure(construct, memory)
+    record(None, 'construction', seconds, peak)
+    render_rows, render_cols = min(num_rows, render_limit), min(num_cols, render_limit)
+    seconds, peak, _ = measure(lambda: MapRenderer(cov_map).render(0, render_rows, 0, render_cols), memory)
+    record(None, 'render', seconds, peak, tiles=render_rows * render_cols)
+    for role_char in roles:
+        role = RoleAlgoFactory(cov_map).create(role_char)
+        seconds, peak, _ = measure(lambda: CostTables.for_map(cov_map, role.cost_model), memory)
+        record(role_char, 'cost_tables', seconds, peak)
+        seconds, peak, _ = measure(role.before_search, memory)
+        record(role_char, 'd_map', seconds, peak)
+        best = None
+        for _ in range(max(repeat, 1)):
+            # the roles print their warnings, keep them out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(role.find_path, memory)
+            best = result if best is None or result[0] < best[0] else best
+        seconds, peak, goal_info = best
+        record(
+            role_char,
+            'search',
+            seconds,
+            peak,
+            expanded=role.num_expanded,
+            cost=None if goal_info is None else goal_info.cost
+        )
+    return records
+
+
+def run(sizes: List[Tuple[int, int]],
+        layouts: List[str] = None,
+        densities: Dict[str, float] = None,
+        roles: List[str] = None,
+        compact: bool = False,
+        seed: int = 472,
+        repeat: int = 1,
+        render_limit: int = 100,
+        memory: bool = False) -> Dict[str, Any]:
+    """
+    Measures every size and layout, returns the run: {"meta": {...}, "results": [records]}
+    """
+    layouts = [RANDOM] if layouts is None else layouts
+    densities = DEFAULT_DENSITIES if densities is None else densities
+    meta = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'densities': densities,
+        'seed': seed,
+        'repeat': repeat,
+        'memory': memory,
+    }
+    results = []
+    for num_rows, num_cols in sizes:
+        for layout in layouts:
+            records = bench_map(
+                num_rows, num_cols, layout, densities, roles, compact, seed, repeat, render_limit, memory
+            )
+            for elem in records:
+                print_record(elem)
+            results.extend(records)
+    return {'meta': meta, 'results': results}
+
+
+def print_record(elem: Dict[str, Any]):
+    size = f'{elem["rows"]}x{elem["columns"]}'
+    memory = '' if elem['peak_bytes'] is None else f'{elem["peak_bytes"] / 2 ** 20:>9.1f} MB'
+    extra = ''
+    if elem['step'] == 'search':
+        extra = f'   expanded {elem["expanded"]}, cost {elem["cost"]}'
+    print(f'   {size:>11} {elem["layout"]:<10} {elem["role"] or "-":<2} {elem["step"]:<13}'
+          f'{elem["seconds"] * 1000:>11.1f} ms{memory}{extra}')
+
+
+def compare(old_run: Dict[str, Any], new_run: Dict[str, Any]):
+    """
+    Prints new / old time (and peak memory) of every measurement that is in both runs
+    """
+    old_records = {tuple(elem[key] for key in RECORD_KEY): elem for elem in old_run['results']}
+    print('\n Compared to the older run (new / old, above 1 is slower):\n')
+    for elem in new_run['results']:
+        old = old_records.get(tuple(elem[key] for key in RECORD_KEY))
+        if old is None:
+            continue
+        ratios = f'time x{elem["seconds"] / old["seconds"]:.2f}' if old['seconds'] > 0 else 'time -'
+        if elem['peak_bytes'] is not None and old['peak_bytes']:
+            ratios += f'   memory x{elem["peak_bytes"] / old["peak_bytes"]:.2f}'
+        size = f'{elem["rows"]}x{elem["columns"]}'
+        print(f'   {size:>11} {elem["layout"]:<10} {elem["role"] or "-":<2} {elem["step"]:<13} {ratios}')
+
+
+def _sizes(text: str) -> List[Tuple[int, int]]:
+    # 100 is 100 x 100, 100x200 is 100 rows x 200 columns
+    sizes = []
+    for size in text.split(','):
+        rows, _, cols = size.lower().partition('x')
+        sizes.append((int(rows), int(cols or rows)))
+    return sizes
+
+
+def _densities(text: str) -> Dict[str, float]:
+    # V=0.01,P=0.05,Q=0.01
+    densities = {}
+    for pair in text.split(','):
+        key, _, value = pair.partition('=')
+        densities[key.strip().upper()] = float(value)
+    return densities
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Times map construction, d_map, search and rendering per role')
+    parser.add_argument('--sizes', type=_sizes, default=_sizes('10,50,100'),
+                        help='map sizes, 100 or 100x200 (rows x columns), comma separated (10 to 2000 a side)')
+    parser.add_argument('--layouts', default=RANDOM, help=f'comma separated, from {LAYOUTS}')
+    parser.add_argument('--densities', type=_densities, default=DEFAULT_DENSITIES,
+                        help='share of the tiles of each type, i.e. V=0.01,P=0.05,Q=0.01')
+    parser.add_argument('--roles', default=','.join(ROLES), help='comma separated')
+    parser.add_argument('--compact', action='store_true', help='compact maps (for the big sizes)')
+    parser.add_argument('--seed', type=int, default=472)
+    parser.add_argument('--repeat', type=int, default=1, help='searches per role, the best time is kept')
+    parser.add_argument('--render-limit', type=int, default=100, help='largest side of the rendered window')
+    parser.add_argument('--memory', action='store_true', help='measure the peak memory of every step')
+    parser.add_argument('--output', default=None, help='JSON file for the results')
+    parser.add_argument('--compare', default=None, help='JSON file of an older run to compare to')
+    args = parser.parse_args(argv)
+    layouts = [layout.strip() for layout in args.layouts.split(',')]
+    for layout in layouts:
+        if layout not in LAYOUTS:
+            parser.error(f'No layout {layout}, choose from {LAYOUTS}')
+    print(f'\n Benchmarks ({"compact maps" if args.compact else "regular maps"}):\n')
+    new_run = run(
+        args.sizes,
+        layouts,
+        args.densities,
+        [role.strip().upper() for role in args.roles.split(',')],
+        args.compact,
+        args.seed,
+        args.repeat,
+        args.render_limit,
+        args.memory
+    )
+    if args.output is not None:
+        with open(args.output, 'w') as out:
+            json.dump(new_run, out, indent=1)
+    if args.compare is not None:
+        with open(args.compare) as old_file:
+            compare(json.load(old_file), new_run)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
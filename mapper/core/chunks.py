@@ -0,0 +1,295 @@
+"""
+
+Tile type grid stored on disk in fixed size square chunks, for maps larger than memory
+
+    header   -- magic b'COVCHK', format version, rows, columns, chunk size (little endian), padded to 64 bytes
+    chunks   -- chunk_size x chunk_size uint8 codes per chunk, chunk by chunk row by row (the chunks on the right
+                and bottom borders are padded to the full size)
+
+A chunk is one contiguous block of the file, so the tiles around a node are a few pages apart instead of a whole
+row of the map. The file is memory mapped, and only a bounded number of chunks are copied in memory at once
+(least recently used ones are written back and dropped), with hit / miss counts to tune the chunk size and
+the number of resident chunks.
+
+"""
+from __future__ import annotations
+import struct
+from math import gcd
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from mapper.core.tile import TILE_CODES
+
+MAGIC = b'COVCHK'
+VERSION = 1
+# magic, version, rows, columns, chunk size
+HEADER = struct.Struct('<6sHIII')
+DATA_OFFSET = 64
+# side of the blocks the tile types are counted in (the largest divisor of the chunk size up to this)
+BLOCK_SIZE = 16
+
+
+class ChunkedGrid:
+    """
+
+    rows x columns grid of tile codes backed by a chunked file, supports grid[row, col] and
+    grid[row_slice, col_slice] (read and write) like the numpy array of an in memory map
+
+    Also keeps how many tiles of each type every block of block_size x block_size tiles has, so whole map
+    questions (is there a tile of this type, roughly where) don't need to read the chunks
+
+    """
+    def __init__(self, path: str, max_resident: int = 64, block_counts: np.ndarray = None):
+        self.path: str = path
+        with open(path, 'rb') as chunk_file:
+            magic, version, num_rows, num_cols, chunk_size = HEADER.unpack(chunk_file.read(HEADER.size))
+        if magic != MAGIC:
+            raise RuntimeError(f'{path} is not a chunked map file')
+        if version != VERSION:
+            raise RuntimeError(f'Chunked map file version {version} is not supported')
+        self.shape: Tuple[int, int] = (num_rows, num_cols)
+        self.chunk_size: int = chunk_size
+        self.num_chunk_rows: int = -(-num_rows // chunk_size)
+        self.num_chunk_cols: int = -(-num_cols // chunk_size)
+        self.block_size: int = gcd(chunk_size, BLOCK_SIZE)
+        self.data: np.memmap = np.memmap(
+            path,
+            dtype=np.uint8,
+            mode='r+',
+            offset=DATA_OFFSET,
+            shape=(self.num_chunk_rows, self.num_chunk_cols, chunk_size, chunk_size)
+        )
+        # resident chunks, least recently used first
+        self.max_resident: int = max(max_resident, 1)
+        self.resident: OrderedDict[Tuple[int, int], np.ndarray] = OrderedDict()
+        self.last_key: Optional[Tuple[int, int]] = None
+        self.last_chunk: Optional[np.ndarray] = None
+        self.dirty: set = set()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        # (tile codes, block rows, block columns), number of tiles of each code in every block
+        self.block_counts: np.ndarray = self.__count_blocks() if block_counts is None else block_counts
+
+    @staticmethod
+    def create(path: str, num_rows: int, num_cols: int, chunk_size: int = 256, max_resident: int = 64) -> ChunkedGrid:
+        """
+        New grid file of unassigned tiles (the file is sparse until chunks get written)
+        """
+        num_chunks = -(-num_rows // chunk_size) * -(-num_cols // chunk_size)
+        with open(path, 'wb') as chunk_file:
+            chunk_file.write(HEADER.pack(MAGIC, VERSION, num_rows, num_cols, chunk_size).ljust(DATA_OFFSET, b'\0'))
+            chunk_file.truncate(DATA_OFFSET + num_chunks * chunk_size * chunk_size)
+        # nothing to count, every tile is unassigned (code 0), the blocks on the borders can be smaller
+        block_size = gcd(chunk_size, BLOCK_SIZE)
+        block_rows = np.minimum(block_size, num_rows - np.arange(0, num_rows, block_size))
+        block_cols = np.minimum(block_size, num_cols - np.arange(0, num_cols, block_size))
+        block_counts = np.zeros((len(TILE_CODES), len(block_rows), len(block_cols)), dtype=np.int32)
+        block_counts[0] = np.outer(block_rows, block_cols)
+        return ChunkedGrid(path, max_resident, block_counts)
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    def counts(self) -> np.ndarray:
+        """
+        Number of tiles of each code in the whole grid
+        """
+        return self.block_counts.sum(axis=(1, 2), dtype=np.int64)
+
+    def chunk(self, chunk_row: int, chunk_col: int) -> np.ndarray:
+        """
+        The chunk, loaded in memory if it is not already (evicting the least recently used chunk if needed)
+        """
+        key = (chunk_row, chunk_col)
+        if key == self.last_key:
+            # same chunk as the last access, by far the most common case, already the most recently used
+            self.hits += 1
+            return self.last_chunk
+        chunk = self.resident.get(key)
+        if chunk is not None:
+            self.hits += 1
+            self.resident.move_to_end(key)
+        else:
+            self.misses += 1
+            chunk = self.resident[key] = np.array(self.data[chunk_row, chunk_col])
+            if len(self.resident) > self.max_resident:
+                old_key, old_chunk = self.resident.popitem(last=False)
+                self.evictions += 1
+                if old_key in self.dirty:
+                    self.data[old_key] = old_chunk
+                    self.dirty.discard(old_key)
+        self.last_key, self.last_chunk = key, chunk
+        return chunk
+
+    def __getitem__(self, key: Tuple[Union[int, slice], Union[int, slice]]) -> Union[int, np.ndarray]:
+        row_idx, col_idx = key
+        if isinstance(row_idx, slice) or isinstance(col_idx, slice):
+            return self.__window(row_idx, col_idx)
+        if not (0 <= row_idx < self.shape[0] and 0 <= col_idx < self.shape[1]):
+            row_idx, col_idx = self.__check(row_idx, col_idx)
+        size = self.chunk_size
+        return self.chunk(row_idx // size, col_idx // size).item(row_idx % size, col_idx % size)
+
+    def __setitem__(self, key: Tuple[Union[int, slice], Union[int, slice]], code: Union[int, np.ndarray]):
+        if isinstance(key[0], slice) or isinstance(key[1], slice):
+            self.__set_window(key[0], key[1], code)
+            return
+        row_idx, col_idx = self.__check(*key)
+        size = self.chunk_size
+        chunk_row, chunk_col = row_idx // size, col_idx // size
+        chunk = self.chunk(chunk_row, chunk_col)
+        block_row, block_col = row_idx // self.block_size, col_idx // self.block_size
+        self.block_counts[int(chunk[row_idx % size, col_idx % size]), block_row, block_col] -= 1
+        self.block_counts[int(code), block_row, block_col] += 1
+        chunk[row_idx % size, col_idx % size] = code
+        self.dirty.add((chunk_row, chunk_col))
+
+    def iter_chunks(self) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Yields (first row, first column, tiles) of every chunk, without the padding, through the resident chunks
+        """
+        size = self.chunk_size
+        for chunk_row in range(self.num_chunk_rows):
+            for chunk_col in range(self.num_chunk_cols):
+                num_rows = min(size, self.shape[0] - chunk_row * size)
+                num_cols = min(size, self.shape[1] - chunk_col * size)
+                yield chunk_row * size, chunk_col * size, self.chunk(chunk_row, chunk_col)[:num_rows, :num_cols]
+
+    def flush(self):
+        """
+        Writes the changed resident chunks back to the file
+        """
+        for key in self.dirty:
+            self.data[key] = self.resident[key]
+        self.dirty = set()
+        self.data.flush()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Chunk cache statistics since the grid was opened
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            'resident': len(self.resident),
+            'max_resident': self.max_resident,
+            'chunk_size': self.chunk_size,
+        }
+
+    def __check(self, row_idx: int, col_idx: int) -> Tuple[int, int]:
+        if row_idx < 0:
+            row_idx += self.shape[0]
+        if col_idx < 0:
+            col_idx += self.shape[1]
+        if not (0 <= row_idx < self.shape[0] and 0 <= col_idx < self.shape[1]):
+            raise IndexError(f'Tile ({row_idx}, {col_idx}) is out of the grid')
+        return row_idx, col_idx
+
+    def __window(self, row_key: Union[int, slice], col_key: Union[int, slice]) -> np.ndarray:
+        rows, cols = self.__ranges(row_key, col_key)
+        window = np.zeros((len(rows), len(cols)), dtype=np.uint8)
+        for _, chunk_part, window_part in self.__parts(rows, cols):
+            window[window_part] = chunk_part
+        if not isinstance(row_key, slice):
+            return window[0]
+        if not isinstance(col_key, slice):
+            return window[:, 0]
+        return window
+
+    def __set_window(self, row_key: Union[int, slice], col_key: Union[int, slice], codes: Union[int, np.ndarray]):
+        """
+        Writes a window of tiles, the block counts are updated for the tiles that changed only
+        """
+        rows, cols = self.__ranges(row_key, col_key)
+        codes = np.broadcast_to(np.asarray(codes, dtype=np.uint8), (len(rows), len(cols)))
+        block_size = self.block_size
+        for key, chunk_part, window_part in self.__parts(rows, cols):
+            new_codes = codes[window_part]
+            changed = chunk_part != new_codes
+            if not changed.any():
+                continue
+            changed_rows, changed_cols = np.nonzero(changed)
+            block_rows = (changed_rows + rows[0] + window_part[0].start) // block_size
+            block_cols = (changed_cols + cols[0] + window_part[1].start) // block_size
+            np.add.at(self.block_counts, (chunk_part[changed], block_rows, block_cols), -1)
+            np.add.at(self.block_counts, (new_codes[changed], block_rows, block_cols), 1)
+            chunk_part[...] = new_codes
+            self.dirty.add(key)
+
+    def __ranges(self, row_key: Union[int, slice], col_key: Union[int, slice]) -> Tuple[range, range]:
+        if isinstance(row_key, slice):
+            rows = range(*row_key.indices(self.shape[0]))
+        else:
+            row_idx = self.__check(row_key, 0)[0]
+            rows = range(row_idx, row_idx + 1)
+        if isinstance(col_key, slice):
+            cols = range(*col_key.indices(self.shape[1]))
+        else:
+            col_idx = self.__check(0, col_key)[1]
+            cols = range(col_idx, col_idx + 1)
+        if (len(rows) > 1 and rows.step != 1) or (len(cols) > 1 and cols.step != 1):
+            raise IndexError('Chunked grids only support contiguous slices')
+        return rows, cols
+
+    def __parts(self, rows: range, cols: range) -> Iterator[Tuple[Tuple[int, int], np.ndarray, Tuple[slice, slice]]]:
+        """
+        Yields (chunk key, part of the chunk in the window (a view), where that part is in the window)
+        for every chunk the window overlaps
+        """
+        if len(rows) == 0 or len(cols) == 0:
+            return
+        size = self.chunk_size
+        row_start, row_end = rows[0], rows[-1] + 1
+        col_start, col_end = cols[0], cols[-1] + 1
+        for chunk_row in range(row_start // size, (row_end - 1) // size + 1):
+            for chunk_col in range(col_start // size, (col_end - 1) // size + 1):
+                chunk = self.chunk(chunk_row, chunk_col)
+                # part of the window in this chunk
+                top, bottom = max(row_start, chunk_row * size), min(row_end, (chunk_row + 1) * size)
+                left, right = max(col_start, chunk_col * size), min(col_end, (chunk_col + 1) * size)
+                chunk_top, chunk_left = chunk_row * size, chunk_col * size
+                chunk_part = chunk[top - chunk_top:bottom - chunk_top, left - chunk_left:right - chunk_left]
+                yield (chunk_row, chunk_col), chunk_part, (
+                    slice(top - row_start, bottom - row_start), slice(left - col_start, right - col_start)
+                )
+
+    def __count_blocks(self) -> np.ndarray:
+        size, block_size = self.chunk_size, self.block_size
+        counts = np.zeros(
+            (len(TILE_CODES), -(-self.shape[0] // block_size), -(-self.shape[1] // block_size)),
+            dtype=np.int32
+        )
+        # blocks per chunk side, a chunk is always a whole number of blocks
+        num_blocks = size // block_size
+        # read from the file one chunk row at a time (not the memory map, that would keep the whole file mapped
+        # in memory), so only one row of chunks is in memory at once
+        with open(self.path, 'rb') as chunk_file:
+            chunk_file.seek(DATA_OFFSET)
+            for chunk_row in range(self.num_chunk_rows):
+                num_rows = min(size, self.shape[0] - chunk_row * size)
+                chunks = np.fromfile(chunk_file, dtype=np.uint8, count=self.num_chunk_cols * size * size)
+                chunks = chunks.reshape((self.num_chunk_cols, size, size))
+                for chunk_col in range(self.num_chunk_cols):
+                    num_cols = min(size, self.shape[1] - chunk_col * size)
+                    # the padding of the border chunks is not counted
+                    tiles = np.where(
+                        (np.arange(size)[:, None] < num_rows) & (np.arange(size)[None, :] < num_cols),
+                        chunks[chunk_col],
+                        len(TILE_CODES)
+                    ).reshape((num_blocks, block_size, num_blocks, block_size))
+                    block_row, block_col = chunk_row * num_blocks, chunk_col * num_blocks
+                    window = counts[:, block_row:block_row + num_blocks, block_col:block_col + num_blocks]
+                    for code in range(len(TILE_CODES)):
+                        window[code] = (tiles == code).sum(axis=(1, 3))[:window.shape[1], :window.shape[2]]
+        return counts
@@ -5,6 +5,8 @@ class Edge:
 
     Base class representing a connection between two nodes
 
+    Nodes are compared by identity, names are only for display (and user points rename grid nodes)
+
     """
     def __init__(self, node_one, node_two):
         self.node_one = node_one
@@ -12,14 +14,11 @@ class Edge:
 
     def edge_matches_node(self, node) -> bool:
         # checks if the passed node is part of this edge
-        return (
-            node.name == self.node_one.name or
-            node.name == self.node_two.name
-        )
+        return node is self.node_one or node is self.node_two
 
     def edge_matches_axis_divisor(self, node, vertical_axis: bool, divisor: int) -> bool:
         # checks if the passed node is on the same axis as the desired axis
-        other_node = self.node_one if self.node_one.name != node.name else self.node_two
+        other_node = self.node_one if self.node_one is not node else self.node_two
         divided_col = int(other_node.col_idx / divisor)
         divided_row = int(other_node.row_idx / divisor)
         return (
@@ -37,7 +36,7 @@ class Edge:
 
     def edge_matches_axis(self, node, vertical_axis: bool, include_other: bool = False) -> bool:
         # checks if the passed node is on the same axis as the desired axis
-        other_node = self.node_one if self.node_one.name != node.name else self.node_two
+        other_node = self.node_one if self.node_one is not node else self.node_two
         return (
             (
                 vertical_axis and
@@ -52,26 +51,29 @@ class Edge:
         )
 
     def get_other_node(self, node):
-        return self.node_one if node.name != self.node_one.name else self.node_two
-
-    def get_other_node_idx(self, node) -> int:
-        invalid_idx = -1
-        for idx, edge in enumerate(node.edges):
-            if (
-                type(edge) is type(self) and
-                edge.node_one.name == self.node_one.name and
-                edge.node_two.name == self.node_two.name
-            ):
-                return idx
-        return invalid_idx
+        return self.node_one if node is not self.node_one else self.node_two
 
     def edge_matches_both_nodes(self, node_one, node_two):
         return (
-            (self.node_one.name == node_one.name and node_two.name == self.node_two.name) or
-            (self.node_one.name == node_two.name and self.node_two.name == node_one.name)
+            (self.node_one is node_one and self.node_two is node_two) or
+            (self.node_one is node_two and self.node_two is node_one)
         )
 
 
+# direction of a grid edge from the node at its (row, col), see Map.grid_edge
+RIGHT = 'right'
+DOWN = 'down'
+DIAGONAL_DOWN = 'diagonal down'
+DIAGONAL_UP = 'diagonal up'
+# direction --> (row, col) offset of the other node
+DIRECTION_OFFSETS = {
+    RIGHT: (0, 1),
+    DOWN: (1, 0),
+    DIAGONAL_DOWN: (1, 1),
+    DIAGONAL_UP: (-1, 1),
+}
+
+
 class DiagonalEdge(Edge):
     """
 
@@ -0,0 +1,288 @@
+from __future__ import annotations
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from weakref import WeakValueDictionary
+
+from mapper.core.edge import (
+    Edge, DiagonalEdge, StraightEdge, RIGHT, DOWN, DIAGONAL_DOWN, DIAGONAL_UP, DIRECTION_OFFSETS
+)
+from mapper.core.node import Node
+from mapper.core.tile import Tile, TileType, Vaccine, PlayGround, Quarantine
+
+if TYPE_CHECKING:
+    from mapper.core.map import Map
+
+
+# code in the type grid --> tile type, the views share one instance per type
+TYPES_BY_CODE: List[Optional[TileType]] = [None, Vaccine(), PlayGround(), Quarantine()]
+
+
+class GridTile(Tile):
+    """
+
+    Tile of a compact map, a view on one cell of the map's type grid
+
+    """
+    def __init__(self, cov_map: Map, row_idx: int, col_idx: int):
+        # Tile.__init__ is not called, it would reset the type of the cell to unassigned
+        self.map: Map = cov_map
+        self.row_idx: int = row_idx
+        self.col_idx: int = col_idx
+        self.num_in_row: int = cov_map.num_columns
+        self.num_display_rows: int = 9
+        self.display_width: int = 13
+        self.label: Optional[str] = None
+
+    @property
+    def tile_type(self) -> Optional[TileType]:
+        return TYPES_BY_CODE[self.map.type_codes[self.row_idx, self.col_idx]]
+
+    @tile_type.setter
+    def tile_type(self, tile_type: Optional[TileType]):
+        self.map.type_codes[self.row_idx, self.col_idx] = 0 if tile_type is None else tile_type.code
+
+
+class GridNode(Node):
+    """
+
+    Node of a compact map, its edges are created from the (row, col) of the node every time they are asked for,
+    so a node doesn't keep its neighbours alive (see NodeGrid)
+
+    A user point that changes the edges of a node (or renames it) gives the node its own list of edges and pins it
+    in the grid, until Map.remove_user_points releases it
+
+    """
+    def __init__(self, grid: NodeGrid, row_idx: int, col_idx: int):
+        # Node.__init__ is not called, the nodes are created over and over and most are never named
+        self.grid: NodeGrid = grid
+        self.map: Map = grid.map
+        self.row_idx: int = row_idx
+        self.col_idx: int = col_idx
+        self.row_total: int = grid.map.num_columns
+        self.node_id: Optional[int] = Node.seq_for_position(row_idx, col_idx, self.row_total)
+        self.old_name: Optional[str] = None
+        self._name: Optional[str] = None
+        self._edges: Optional[List[Edge]] = None
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._name = Node.name_for_seq(self.node_id)
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @property
+    def edges(self) -> List[Edge]:
+        if self._edges is None:
+            return self.__create_edges()
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges: List[Edge]):
+        self._edges = edges
+
+    def add_edge(self, edge: Edge):
+        self.__own_edges().append(edge)
+
+    def remove_edge(self, edge: Edge):
+        self.__own_edges()
+        super().remove_edge(edge)
+
+    def set_name(self, name: str):
+        self.grid.pin(self)
+        super().set_name(name)
+
+    def release(self):
+        """
+        Back to the edges of the grid, once the user points are gone
+        """
+        self._edges = None
+
+    def __own_edges(self) -> List[Edge]:
+        if self._edges is None:
+            self._edges = self.__create_edges()
+            self.grid.pin(self)
+        return self._edges
+
+    def __create_edges(self) -> List[Edge]:
+        """
+        Same edges, in the same order, as the ones Map connects for a node of the regular map
+        """
+        row_idx, col_idx = self.row_idx, self.col_idx
+        num_rows, num_cols = self.map.num_rows, self.map.num_columns
+        edge = self.grid.edge
+        edges = []
+        if row_idx > 0 and col_idx > 0:
+            # diagonal down from the top left
+            edges.append(edge(row_idx - 1, col_idx - 1, DIAGONAL_DOWN))
+        if row_idx > 0:
+            # vertical edge from above
+            edges.append(edge(row_idx - 1, col_idx, DOWN))
+        if col_idx > 0:
+            # horizontal edge from the left
+            edges.append(edge(row_idx, col_idx - 1, RIGHT))
+        if row_idx < num_rows:
+            edges.append(edge(row_idx, col_idx, DOWN))
+        if col_idx < num_cols:
+            edges.append(edge(row_idx, col_idx, RIGHT))
+        if row_idx < num_rows and col_idx < num_cols:
+            # diagonal down to the bottom right
+            edges.append(edge(row_idx, col_idx, DIAGONAL_DOWN))
+        if row_idx > 0 and col_idx < num_cols:
+            # diagonal up to the top right
+            edges.append(edge(row_idx, col_idx, DIAGONAL_UP))
+        if row_idx < num_rows and col_idx > 0:
+            # diagonal up from the bottom left
+            edges.append(edge(row_idx + 1, col_idx - 1, DIAGONAL_UP))
+        return edges
+
+
+class GridRow:
+    """
+
+    One row of a TileGrid or NodeGrid, supports row[col_idx], len() and iteration like a list
+
+    """
+    def __init__(self, grid, row_idx: int):
+        self.grid = grid
+        self.row_idx: int = row_idx
+
+    def __getitem__(self, col_idx: int):
+        if col_idx < 0:
+            col_idx += len(self)
+        if not 0 <= col_idx < len(self):
+            raise IndexError(f'Column {col_idx} is out of the grid')
+        return self.grid.create(self.row_idx, col_idx)
+
+    def __len__(self) -> int:
+        return self.grid.num_cols
+
+    def __iter__(self) -> Iterator:
+        for col_idx in range(len(self)):
+            yield self.grid.create(self.row_idx, col_idx)
+
+
+class LazyGrid:
+    """
+
+    2D grid of views, supports grid[row_idx][col_idx], len() and iteration like a list of lists
+
+    """
+    def __init__(self, num_rows: int, num_cols: int):
+        self.num_rows: int = num_rows
+        self.num_cols: int = num_cols
+
+    def create(self, row_idx: int, col_idx: int):
+        ...
+
+    def __getitem__(self, row_idx: int) -> GridRow:
+        if row_idx < 0:
+            row_idx += len(self)
+        if not 0 <= row_idx < len(self):
+            raise IndexError(f'Row {row_idx} is out of the grid')
+        return GridRow(self, row_idx)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __iter__(self) -> Iterator[GridRow]:
+        for row_idx in range(len(self)):
+            yield GridRow(self, row_idx)
+
+
+class TileGrid(LazyGrid):
+    """
+
+    The tiles of a compact map, a new view is created for every access
+
+    """
+    def __init__(self, cov_map: Map):
+        super().__init__(cov_map.num_rows, cov_map.num_columns)
+        self.map: Map = cov_map
+
+    def create(self, row_idx: int, col_idx: int) -> GridTile:
+        return GridTile(self.map, row_idx, col_idx)
+
+
+class NodeGrid(LazyGrid):
+    """
+
+    The nodes of a compact map, a node is kept (by a weak reference) as long as something else keeps it,
+    so the search (and user points) always see the same node object, and the map doesn't keep the nodes of
+    every search
+
+    The edges are kept the same way, by (row, col, direction) from the node they start at, so both nodes
+    of an edge share the same edge object like on a regular map. An edge keeps its nodes but a node only keeps
+    its edges once pinned (see GridNode), the nodes and edges a search touched go away with the search
+
+    """
+    def __init__(self, cov_map: Map):
+        super().__init__(cov_map.num_rows + 1, cov_map.num_columns + 1)
+        self.map: Map = cov_map
+        self.nodes: WeakValueDictionary[Tuple[int, int], GridNode] = WeakValueDictionary()
+        self.edges: WeakValueDictionary[Tuple[int, int, str], Edge] = WeakValueDictionary()
+        # weak dictionaries are no safer than their Python code, creating nodes and edges is locked
+        self.lock: Lock = Lock()
+        # nodes with edges of their own or a new name, kept until release
+        self.pinned: Dict[Tuple[int, int], GridNode] = {}
+
+    def create(self, row_idx: int, col_idx: int) -> GridNode:
+        # straight from the weak references, WeakValueDictionary.get is Python code and the search calls this a lot
+        ref = self.nodes.data.get((row_idx, col_idx))
+        node = None if ref is None else ref()
+        if node is None:
+            # locked, so concurrent searches creating the same node all end up with the one that is kept
+            with self.lock:
+                node = self.nodes.get((row_idx, col_idx))
+                if node is None:
+                    # int, like the nodes of a regular map whatever the index was (i.e. numpy ints)
+                    node = self.nodes[(row_idx, col_idx)] = GridNode(self, int(row_idx), int(col_idx))
+        return node
+
+    def pin(self, node: GridNode):
+        self.pinned[(node.row_idx, node.col_idx)] = node
+
+    def release(self):
+        """
+        Unpins all the nodes, their edges are the ones of the grid again
+        """
+        for node in self.pinned.values():
+            node.release()
+        self.pinned = {}
+
+    def edge(self, row_idx: int, col_idx: int, direction: str) -> Edge:
+        """
+        Edge of the grid going in direction from node (row_idx, col_idx), created the first time
+        """
+        key = (row_idx, col_idx, direction)
+        ref = self.edges.data.get(key)
+        edge = None if ref is None else ref()
+        if edge is None:
+            # the nodes are created outside of the lock, it isn't reentrant
+            new_edge = self.__create_edge(row_idx, col_idx, direction)
+            with self.lock:
+                edge = self.edges.get(key)
+                if edge is None:
+                    edge = self.edges[key] = new_edge
+        return edge
+
+    def __create_edge(self, row_idx: int, col_idx: int, direction: str) -> Edge:
+        tile = self.map.map_grid.create
+        row_offset, col_offset = DIRECTION_OFFSETS[direction]
+        node_one, node_two = self.create(row_idx, col_idx), self.create(row_idx + row_offset, col_idx + col_offset)
+        if direction == DIAGONAL_DOWN:
+            return DiagonalEdge(node_one, node_two, tile(row_idx, col_idx))
+        elif direction == DIAGONAL_UP:
+            return DiagonalEdge(node_one, node_two, tile(row_idx - 1, col_idx))
+        elif direction == DOWN:
+            left_tile = None if col_idx == 0 else tile(row_idx, col_idx - 1)
+            right_tile = None if col_idx == self.map.num_columns else tile(row_idx, col_idx)
+            return StraightEdge(node_one, node_two, left_tile, right_tile)
+        elif row_idx == 0:
+            return StraightEdge(node_one, node_two, None, tile(row_idx, col_idx))
+        elif row_idx == self.map.num_rows:
+            return StraightEdge(node_one, node_two, tile(row_idx - 1, col_idx), None)
+        return StraightEdge(node_one, node_two, tile(row_idx, col_idx), tile(row_idx - 1, col_idx))
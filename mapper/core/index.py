@@ -0,0 +1,108 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Set, Tuple, Type
+
+import numpy as np
+
+from mapper.core.tile import TILE_CODES
+
+if TYPE_CHECKING:
+    from mapper.core.map import Map
+
+# codes of the tile types that are indexed (not unassigned, the tiles no one looks for)
+INDEXED_CODES = [code for code in TILE_CODES.values() if code != 0]
+
+
+class TileIndex:
+    """
+
+    Tiles of every type, and for every node how many tiles of each type it is a corner of, kept up to date by
+    Map.update_tile (see Map.tile_index)
+
+    A node is a goal node of a role when it is a corner of a tile of the role's goal type, so the goal test of a
+    grid node is one lookup and the goal nodes of a type are one comparison on the whole node grid
+
+    """
+    def __init__(self, cov_map: Map):
+        if cov_map.chunked:
+            # one counter per node and type, for a map that doesn't fit in memory
+            raise RuntimeError('No tile index on chunked maps')
+        self.map: Map = cov_map
+        # code --> (row, col) of the tiles of that type
+        self.tiles: Dict[int, Set[Tuple[int, int]]] = {}
+        # code --> (rows + 1) x (columns + 1), number of tiles of that type the node is a corner of (0 to 4)
+        self.corners: Dict[int, np.ndarray] = {
+            code: np.zeros((cov_map.num_rows + 1, cov_map.num_columns + 1), dtype=np.uint8) for code in INDEXED_CODES
+        }
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Indexes all the tiles of the map again, the arrays are updated in place
+        """
+        type_codes = np.asarray(self.map.type_codes)
+        for code in INDEXED_CODES:
+            tiles = type_codes == code
+            rows, cols = np.nonzero(tiles)
+            self.tiles[code] = set(zip(rows.tolist(), cols.tolist()))
+            counts = self.corners[code]
+            counts.fill(0)
+            counts[:-1, :-1] += tiles
+            counts[:-1, 1:] += tiles
+            counts[1:, :-1] += tiles
+            counts[1:, 1:] += tiles
+
+    def tile_changed(self, row_idx: int, col_idx: int, old_code: int, new_code: int):
+        if old_code == new_code:
+            return
+        if old_code != 0:
+            self.tiles[old_code].discard((row_idx, col_idx))
+            self.corners[old_code][row_idx:row_idx + 2, col_idx:col_idx + 2] -= 1
+        if new_code != 0:
+            self.tiles[new_code].add((row_idx, col_idx))
+            self.corners[new_code][row_idx:row_idx + 2, col_idx:col_idx + 2] += 1
+
+    def tiles_changed(self, row_start: int, col_start: int, old_codes: np.ndarray, new_codes: np.ndarray):
+        """
+        Same as tile_changed for a whole window of tiles at once, starting at (row_start, col_start)
+        """
+        num_rows, num_cols = old_codes.shape
+        for code in INDEXED_CODES:
+            was, now = old_codes == code, new_codes == code
+            removed_rows, removed_cols = np.nonzero(was & ~now)
+            self.tiles[code].difference_update(
+                zip((removed_rows + row_start).tolist(), (removed_cols + col_start).tolist())
+            )
+            added_rows, added_cols = np.nonzero(now & ~was)
+            self.tiles[code].update(zip((added_rows + row_start).tolist(), (added_cols + col_start).tolist()))
+            delta = now.astype(np.int16) - was
+            if not delta.any():
+                continue
+            node_delta = np.zeros((num_rows + 1, num_cols + 1), dtype=np.int16)
+            node_delta[:-1, :-1] += delta
+            node_delta[:-1, 1:] += delta
+            node_delta[1:, :-1] += delta
+            node_delta[1:, 1:] += delta
+            corners = self.corners[code][row_start:row_start + num_rows + 1, col_start:col_start + num_cols + 1]
+            corners[...] = corners + node_delta
+
+    def tiles_of_type(self, tile_type: Type) -> Set[Tuple[int, int]]:
+        """
+        (row, col) of the tiles of the type (shared with the index, don't change it)
+        """
+        return self.tiles[tile_type.code]
+
+    def goal_corners(self, tile_type: Type) -> np.ndarray:
+        """
+        Node grid of the number of tiles of the type around each node, more than 0 for the goal nodes of the type
+        (shared with the index and updated in place, don't change it)
+        """
+        return self.corners[tile_type.code]
+
+    def goal_mask(self, tile_type: Type) -> np.ndarray:
+        """
+        (rows + 1) x (columns + 1) boolean array, True for the corners of the tiles of the type
+        """
+        return self.corners[tile_type.code] > 0
+
+    def is_goal_node(self, tile_type: Type, row_idx: int, col_idx: int) -> bool:
+        return self.corners[tile_type.code].item(row_idx, col_idx) > 0
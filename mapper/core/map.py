@@ -1,8 +1,18 @@
-from typing import Dict, List, Union, Tuple, Type
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Union, Tuple, Type
+
+import numpy as np
 
 from mapper.core.node import Node
-from mapper.core.tile import Tile, TileTypeFactory
-from mapper.core.edge import Edge, DiagonalEdge, StraightEdge
+from mapper.core.tile import Tile, TileTypeFactory, TILE_CODES
+from mapper.core.edge import Edge, DiagonalEdge, StraightEdge, RIGHT, DOWN, DIAGONAL_DOWN, DIAGONAL_UP
+from mapper.core.grid import TileGrid, NodeGrid
+from mapper.core.points import VirtualPoints
+from mapper.core.render import MapRenderer
+from mapper.core.index import TileIndex
+from mapper.core.chunks import ChunkedGrid
+
+# code in the type grid --> key in the counts
+CODE_KEYS = {code: key for key, code in TILE_CODES.items()}
 
 
 class Map:
@@ -13,25 +23,49 @@ class Map:
     """
     TILE_WIDTH: int = 1
 
-    def __init__(self, num_columns: int, num_rows: int):
+    def __init__(self, num_columns: int, num_rows: int, compact: bool = False, chunks: ChunkedGrid = None):
         self.num_columns: int = num_columns
         self.num_rows: int = num_rows
-        # 2D map grid, with just the squares
-        self.map_grid: List[List[Tile]] = [[Tile(i, j, num_columns) for j in range(num_columns)] for i in range(num_rows)]
+        # compact maps only store the type grid, their tiles, nodes and edges are views created when accessed
+        self.compact: bool = compact
+        # chunked maps are compact maps whose type grid is on disk (see create_chunked / open_chunked)
+        self.chunked: bool = chunks is not None
+        if self.chunked and not compact:
+            raise RuntimeError('Chunked maps are always compact')
+        # 2D map grid with the code of each tile type (see TILE_CODES)
+        self.type_codes: Union[np.ndarray, ChunkedGrid] = (
+            np.zeros((num_rows, num_columns), dtype=np.uint8) if chunks is None else chunks
+        )
+        # bumped every time a tile changes, anything derived from the tiles is cached per revision
+        self.revision: int = 0
+        self._cache: Dict[Hashable, Tuple[int, Any]] = {}
+        # objects kept with the map, told about every tile change (see attached)
+        self._attached: Dict[Hashable, Any] = {}
+        # tiles and goal nodes of every type, made the first time it is asked for (see tile_index)
+        self._tile_index: Optional[TileIndex] = None
         # keep track of nodes in a map for easy lookup
         self._node_lookup: Dict[str, Node] = {}
-        # keep track of edges to not duplicate
-        self._all_edges: List[Edge] = []
         # keep track of all endpoint things created by user
         self._user_created: List[Union[Edge, Node]] = []
         # keep track of all grid related things that get removed a user creates a point
         self._grid_storage: List[Union[Edge, Node]] = []
-        # 2D map grid with just the nodes (to make it easier to connect them)
-        Node.reset()
-        self._node_grid: List[List[Node]] = [
-            [self.__create_new_node(i, j) for j in range(num_columns + 1)]
-            for i in range(num_rows + 1)
-        ]
+        # grid nodes whose edges were changed by a user point
+        self._user_edited: Set[Node] = set()
+        # node ids are allocated per map, the grid nodes take the first ones, user points the ones after
+        self._next_node_id: int = (num_rows + 1) * (num_columns + 1)
+        # (row, col, direction) --> edge of the grid starting at that node (regular maps, see grid_edge)
+        self._edge_index: Dict[Tuple[int, int, str], Edge] = {}
+        if compact:
+            self.map_grid: Union[List[List[Tile]], TileGrid] = TileGrid(self)
+            self._node_grid: Union[List[List[Node]], NodeGrid] = NodeGrid(self)
+        else:
+            # 2D map grid, with just the squares
+            self.map_grid = [[Tile(i, j, num_columns) for j in range(num_columns)] for i in range(num_rows)]
+            # 2D map grid with just the nodes (to make it easier to connect them)
+            self._node_grid = [
+                [self.__create_new_node(i, j) for j in range(num_columns + 1)]
+                for i in range(num_rows + 1)
+            ]
         # the graph, starting from the top-left node
         self.graph: Node = self._node_grid[0][0]
         self.counts = {
@@ -40,24 +74,160 @@ class Map:
             'Q': 0,
             'U': self.num_rows * self.num_columns
         }
-        # connect all the nodes
-        self.__connect()
+        if self.chunked:
+            self.__count_types(chunks.counts())
+        if not compact:
+            # connect all the nodes
+            self.__connect()
+
+    @staticmethod
+    def create_chunked(num_columns: int,
+                       num_rows: int,
+                       path: str,
+                       chunk_size: int = 256,
+                       max_resident_chunks: int = 64) -> 'Map':
+        """
+        New map of unassigned tiles whose type grid is stored in chunks in the file at path (see ChunkedGrid),
+        only max_resident_chunks chunks of chunk_size x chunk_size tiles are kept in memory at once
+        """
+        chunks = ChunkedGrid.create(path, num_rows, num_columns, chunk_size, max_resident_chunks)
+        return Map(num_columns=num_columns, num_rows=num_rows, compact=True, chunks=chunks)
+
+    @staticmethod
+    def open_chunked(path: str, max_resident_chunks: int = 64) -> 'Map':
+        """
+        Map of a file made by create_chunked, tile changes are written back by type_codes.flush()
+        (type_codes.stats() gives the chunk hits / misses)
+        """
+        chunks = ChunkedGrid(path, max_resident_chunks)
+        num_rows, num_cols = chunks.shape
+        return Map(num_columns=num_cols, num_rows=num_rows, compact=True, chunks=chunks)
+
+    def cached(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Returns the value stored under key for the current revision of the map, calls create() if there is none
+        """
+        revision, value = self._cache.get(key, (None, None))
+        if revision != self.revision:
+            value = create()
+            self._cache[key] = (self.revision, value)
+        return value
+
+    def attached(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Returns the object attached to the map under key, calls create() the first time
+
+        Unlike cached, attached objects are kept when tiles change: update_tile calls their
+        tile_changed(row_idx, col_idx) so they can update themselves, the bulk edits (fill_tiles, mask_tiles,
+        assign_tiles) call their tiles_changed(row_start, row_end, col_start, col_end) once with the window of the
+        tiles that changed, and add_point / remove_user_points call their nodes_changed(nodes) with the nodes
+        that were added, removed or had their edges changed
+        """
+        value = self._attached.get(key)
+        if value is None:
+            value = self._attached[key] = create()
+        return value
+
+    def tile_index(self) -> TileIndex:
+        """
+        Tiles of every type and goal nodes of every type, indexed the first time and then kept up to date
+        by the tile edits
+        """
+        if self._tile_index is None:
+            self._tile_index = TileIndex(self)
+        return self._tile_index
+
+    def user_edited(self, node: Node) -> bool:
+        """
+        True if the edges of a grid node were changed by a user point
+        """
+        return node in self._user_edited
+
+    def edges(self, node: Node) -> List[Edge]:
+        """
+        Edges of the node in the map (VirtualPoints answers the same for its points)
+        """
+        return node.edges
+
+    def node_name(self, node: Node) -> str:
+        return node.get_name()
+
+    def route(self,
+              role_char: str,
+              start: Tuple[float, float],
+              end: Tuple[float, float] = None,
+              queue_type: Optional[str] = None,
+              to_end: bool = False,
+              stats: Any = None,
+              rectangles: bool = False):
+        """
+        Searches for the role from a START (x, y), and an optional END, that are not added to the map
+
+        The points are virtual nodes (see VirtualPoints), the map is only read so routes can run concurrently,
+        returns the InfoContainer of the goal node reached (None if there is no path) and the VirtualPoints
+        (their node_name gives the display name of the nodes of the path)
+
+        queue_type -- priority queue backend of the search, None for the default of the role (a route to END keeps
+                      its own queue, it can't be given one)
+        to_end     -- route from START to END (see BidirectionalSearch) instead of to the closest goal tile
+        stats      -- a SearchStats (see mapper.algos.stats) to fill with the counters and timings of the search,
+                      its path_seconds is left to whoever rebuilds the path from the InfoContainer
+        rectangles -- skip the inside of the uniform regions of the map (role C only, see RoleCRectangleAlgo)
+        """
+        # imported here, the algos depend on the map
+        from mapper.algos.factory import RoleAlgoFactory
+        from mapper.algos.bidirectional import BidirectionalSearch
+        if to_end and end is None:
+            raise RuntimeError('A route to END needs an END point')
+        if to_end and queue_type is not None:
+            raise RuntimeError(f'A route to END keeps its own queue, not a {queue_type} queue')
+        if to_end and rectangles:
+            raise RuntimeError('No rectangle search from START to END')
+        points = [('START', start)] if end is None else [('START', start), ('END', end)]
+        graph = VirtualPoints(self, points)
+        if to_end:
+            search = BidirectionalSearch(self, role_char, graph)
+            search.stats = stats
+            return search.find_path(), graph
+        role = RoleAlgoFactory(self).create(role_char, queue_type, graph, rectangles)
+        role.stats = stats
+        return role.find_path(), graph
+
+    def user_nodes(self) -> List[Node]:
+        """
+        Nodes created for user points (not the grid nodes renamed by one)
+        """
+        return [elem for elem in self._user_created if isinstance(elem, Node)]
+
+    def user_points(self) -> List[Tuple[str, Tuple[float, float]]]:
+        """
+        (name, (x, y)) of the START and END points added by the user, in the order they were added
+        """
+        points = []
+        for name in ['START', 'END']:
+            node = self._node_lookup.get(name)
+            # a grid node that only happens to have the same name is not a point
+            if node is not None and (node.old_name is not None or node in self.user_nodes()):
+                points.append((name, (float(node.col_idx * self.TILE_WIDTH), float(node.row_idx * self.TILE_WIDTH))))
+        return points
 
     def get_counts(self) -> Tuple[int, int, int, int]:
         return self.counts['V'], self.counts['P'], self.counts['Q'], self.counts['U']
 
     def valid_map_for_role(self, tile_type: Type) -> bool:
-        for row in self.map_grid:
-            for tile in row:
-                if isinstance(tile.tile_type, tile_type):
-                    return True
-        return False
+        return self.counts[CODE_KEYS[tile_type.code]] > 0
 
     def has_start(self) -> bool:
         return 'START' in self._node_lookup.keys()
 
+    def has_end(self) -> bool:
+        return 'END' in self._node_lookup.keys()
+
     def lookup_node(self, name: str) -> Node:
         the_node = self._node_lookup.get(name)
+        if the_node is None and self.compact:
+            # grid nodes of a compact map are not in the lookup, find them from their name
+            the_node = self.__node_from_name(name)
         if the_node is None:
             raise RuntimeError(f'No node in map with name {name}')
         return the_node
@@ -65,6 +235,30 @@ class Map:
     def get_node(self, row_idx: int, col_idx: int) -> Node:
         return self._node_grid[row_idx][col_idx]
 
+    def node_seq(self, row_idx: int, col_idx: int) -> int:
+        """
+        Position of a grid node in the sequence of node names, also its node id
+        """
+        return Node.seq_for_position(row_idx, col_idx, self.num_columns)
+
+    def grid_edge(self, row_idx: int, col_idx: int, direction: str) -> Edge:
+        """
+        Edge of the grid going in direction (RIGHT, DOWN, DIAGONAL_DOWN or DIAGONAL_UP) from node (row_idx, col_idx)
+
+        The grid edges are never deleted, only taken out of the node edge lists while a user point splits them
+        """
+        if self.compact:
+            return self._node_grid.edge(row_idx, col_idx, direction)
+        return self._edge_index[(row_idx, col_idx, direction)]
+
+    def __node_from_name(self, name: str) -> Union[Node, None]:
+        seq_int = Node.seq_for_name(name)
+        if seq_int is None or not 0 <= seq_int < (self.num_rows + 1) * (self.num_columns + 1):
+            return None
+        node = self.get_node(*divmod(seq_int, self.num_columns + 1))
+        # the node might have been renamed by a user point
+        return node if node.get_name() == name else None
+
     def max_x(self):
         return self.num_rows * self.TILE_WIDTH
 
@@ -84,7 +278,9 @@ class Map:
             existing_node.revert_name()
             self._node_lookup[existing_node.get_name()] = existing_node
 
-        new_nodes = [elem for elem in self._user_created if isinstance(elem, Node)]
+        new_nodes = self.user_nodes()
+        changed_nodes = new_nodes + list(self._user_edited)
+        changed_nodes.extend(self._node_lookup[name] for name in ['START', 'END'] if name in self._node_lookup)
         if len(self._user_created) == 0:
             # user created both nodes on existing nodes
             for name in ['START', 'END']:
@@ -101,8 +297,7 @@ class Map:
             else:
                 # remove the edge by removing it from the edge lists of both nodes
                 for node in [elem.node_one, elem.node_two]:
-                    node_idx = elem.get_other_node_idx(node)
-                    node.remove_edge_by_idx(node_idx)
+                    node.remove_edge(elem)
         # revert all things that were put in storage because of user created stuff
         for elem in self._grid_storage:
             # these should only be edges, because nodes just get renamed
@@ -112,6 +307,12 @@ class Map:
         # reset
         self._user_created = []
         self._grid_storage = []
+        self._user_edited = set()
+        self._next_node_id = (self.num_rows + 1) * (self.num_columns + 1)
+        if self.compact:
+            # the grid nodes are back to the edges of the grid
+            self._node_grid.release()
+        self.__nodes_changed(changed_nodes)
 
     def add_point(self, x: float, y: float, name: str):
         """
@@ -121,13 +322,18 @@ class Map:
             (X, Y) is inside a tile...
         """
         if self.__is_existing_point(x, y):
-            self.__replace_existing_node(x, y, name)
+            changed_nodes = self.__replace_existing_node(x, y, name)
         elif self.__is_on_edge(x, y):
-            self.__add_on_edge(x, y, name)
+            changed_nodes = self.__add_on_edge(x, y, name)
         else:
-            self.__add_to_tile(x, y, name)
+            changed_nodes = self.__add_to_tile(x, y, name)
+        self.__nodes_changed(changed_nodes)
+
+    def __nodes_changed(self, nodes: List[Node]):
+        for value in self._attached.values():
+            value.nodes_changed(nodes)
 
-    def __add_to_tile(self, x: float, y: float, name: str):
+    def __add_to_tile(self, x: float, y: float, name: str) -> List[Node]:
         # get all nodes
         row_idx = int(y / self.TILE_WIDTH)
         col_idx = int(x / self.TILE_WIDTH)
@@ -136,29 +342,17 @@ class Map:
         bottom_left_node = self._node_grid[row_idx + 1][col_idx]
         top_right_node = self._node_grid[row_idx][col_idx + 1]
         tile = self.map_grid[row_idx][col_idx]
-        downwards_diag, upwards_diag = None, None
-        downleft_idx, downright_idx, upleft_idx, upright_idx = None, None, None, None
         # get the diagonal edges
-        for i, (node_left, node_right) in enumerate([(top_left_node, bottom_right_node), (bottom_left_node, top_right_node)]):
-            for j, edge in enumerate(node_left.edges):
-                if edge.edge_matches_both_nodes(node_left, node_right):
-                    if i == 0:
-                        downwards_diag = edge
-                        downleft_idx = j
-                        downright_idx = edge.get_other_node_idx(node_right)
-                    else:
-                        upwards_diag = edge
-                        upleft_idx = j
-                        upright_idx = edge.get_other_node_idx(node_right)
-                    self._grid_storage.append(edge)
-                    break
+        downwards_diag = self.grid_edge(row_idx, col_idx, DIAGONAL_DOWN)
+        upwards_diag = self.grid_edge(row_idx + 1, col_idx, DIAGONAL_UP)
+        self._grid_storage.extend([downwards_diag, upwards_diag])
         # remove the long diagonal edges from all tiles
-        top_left_node.remove_edge_by_idx(downleft_idx)
-        bottom_right_node.remove_edge_by_idx(downright_idx)
-        top_right_node.remove_edge_by_idx(upright_idx)
-        bottom_left_node.remove_edge_by_idx(upleft_idx)
+        top_left_node.remove_edge(downwards_diag)
+        bottom_right_node.remove_edge(downwards_diag)
+        top_right_node.remove_edge(upwards_diag)
+        bottom_left_node.remove_edge(upwards_diag)
         # create new
-        new_node = Node(y, x, None, name)
+        new_node = Node(y, x, None, name, self.__new_node_id())
         top_left_edge = DiagonalEdge(top_left_node, new_node, tile)
         bottom_left_edge = DiagonalEdge(bottom_left_node, new_node, tile)
         bottom_right_edge = DiagonalEdge(new_node, bottom_right_node, tile)
@@ -176,8 +370,10 @@ class Map:
         # store the new stuff
         self._node_lookup[new_node.get_name()] = new_node
         self._user_created.extend([new_node, bottom_left_edge, bottom_right_edge, top_right_edge, top_left_edge])
+        self._user_edited.update([top_left_node, bottom_right_node, bottom_left_node, top_right_node])
+        return [new_node, top_left_node, bottom_right_node, bottom_left_node, top_right_node]
 
-    def __add_on_edge(self, x: float, y: float, name: str):
+    def __add_on_edge(self, x: float, y: float, name: str) -> List[Node]:
         # have to find the edge that has a node on the same axis, and is higher in idx
         row_idx = int(int(y) / self.TILE_WIDTH)
         col_idx = int(int(x) / self.TILE_WIDTH)
@@ -190,18 +386,13 @@ class Map:
             vertical_axis = False
             y = int(y)
         origin_node = self._node_grid[row_idx][col_idx]
-        origin_idx, edge, terminal_node, terminal_idx = None, None, None, None
-        for origin_idx, existing_edge in enumerate(origin_node.edges):
-            if existing_edge.edge_matches_axis(origin_node, vertical_axis):
-                edge = existing_edge
-                terminal_node = existing_edge.get_other_node(origin_node)
-                terminal_idx = existing_edge.get_other_node_idx(terminal_node)
-                break
+        edge = self.grid_edge(row_idx, col_idx, DOWN if vertical_axis else RIGHT)
+        terminal_node = edge.get_other_node(origin_node)
         # have to split the edge, create a new Node, create two edges
-        origin_node.remove_edge_by_idx(origin_idx)
-        terminal_node.remove_edge_by_idx(terminal_idx)
+        origin_node.remove_edge(edge)
+        terminal_node.remove_edge(edge)
         self._grid_storage.append(edge)
-        new_node = Node(y, x, None, name)
+        new_node = Node(y, x, None, name, self.__new_node_id())
         new_edge_one = StraightEdge(origin_node, new_node, edge.tile_one, edge.tile_two)
         new_edge_two = StraightEdge(new_node, terminal_node, edge.tile_one, edge.tile_two)
         new_node.add_edge(new_edge_one)
@@ -210,6 +401,13 @@ class Map:
         terminal_node.add_edge(new_edge_two)
         self._node_lookup[new_node.get_name()] = new_node
         self._user_created.extend([new_node, new_edge_one, new_edge_two])
+        self._user_edited.update([origin_node, terminal_node])
+        return [new_node, origin_node, terminal_node]
+
+    def __new_node_id(self) -> int:
+        node_id = self._next_node_id
+        self._next_node_id += 1
+        return node_id
 
     def __is_on_edge(self, x: float, y: float) -> bool:
         return (
@@ -217,7 +415,7 @@ class Map:
             (y.is_integer() and (y % self.TILE_WIDTH) == 0)
         )
 
-    def __replace_existing_node(self, x: float, y: float, name: str):
+    def __replace_existing_node(self, x: float, y: float, name: str) -> List[Node]:
         row_idx = int(int(y) / self.TILE_WIDTH)
         col_idx = int(int(x) / self.TILE_WIDTH)
         existing_node = self._node_grid[row_idx][col_idx]
@@ -225,9 +423,11 @@ class Map:
         # or simply rename it.... but have to remember it was renamed???
         #    maybe that's as simple as, if there are no user created things,
         #    then you know it was replacing an existing node
-        self._node_lookup.pop(existing_node.get_name())
+        # grid nodes of a compact map are only in the lookup once renamed
+        self._node_lookup.pop(existing_node.get_name(), None)
         existing_node.set_name(name)
         self._node_lookup[existing_node.get_name()] = existing_node
+        return [existing_node]
 
     def __is_existing_point(self, x: float, y: float) -> bool:
         return (
@@ -251,11 +451,114 @@ class Map:
         Changes the tile type of the given index
         """
         row_index, col_index = self.__translate_index(tile_index)
-        existing_type = self.map_grid[row_index][col_index].tile_type
-        existing_type_key = 'U' if existing_type is None else existing_type.__class__.__name__[0]
-        self.counts[existing_type_key] -= 1
+        existing_code = int(self.type_codes[row_index, col_index])
+        new_code = TileTypeFactory.code(tile_type)
+        self.counts[CODE_KEYS[existing_code]] -= 1
         self.counts[tile_type.upper()] += 1
-        self.map_grid[row_index][col_index].set_type(TileTypeFactory.create_type(tile_type))
+        if not self.compact:
+            self.map_grid[row_index][col_index].set_type(TileTypeFactory.create_type(tile_type))
+        self.type_codes[row_index, col_index] = new_code
+        self.revision += 1
+        if self._tile_index is not None:
+            self._tile_index.tile_changed(row_index, col_index, existing_code, new_code)
+        for value in self._attached.values():
+            value.tile_changed(row_index, col_index)
+
+    def fill_tiles(self, row_start: int, row_end: int, col_start: int, col_end: int, tile_type: str):
+        """
+        Changes the tiles in rows row_start to row_end - 1, columns col_start to col_end - 1 to the type
+        """
+        code = TileTypeFactory.code(tile_type)
+        shape = (max(row_end - row_start, 0), max(col_end - col_start, 0))
+        self.__update_tiles(row_start, col_start, np.full(shape, code, dtype=np.uint8))
+
+    def mask_tiles(self, mask: np.ndarray, tile_type: str):
+        """
+        Changes the tiles where the (rows x columns) boolean mask is True to the type
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != (self.num_rows, self.num_columns):
+            raise RuntimeError(f'Mask of shape {mask.shape} for a map of {self.num_rows} X {self.num_columns}')
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return
+        # only the window with the tiles to change
+        top, bottom, left, right = rows.min(), rows.max() + 1, cols.min(), cols.max() + 1
+        codes = np.full((bottom - top, right - left), TileTypeFactory.code(tile_type), dtype=np.uint8)
+        self.__update_tiles(int(top), int(left), codes, mask[top:bottom, left:right])
+
+    def assign_tiles(self, layout: Union[np.ndarray, str, List[str]], row_start: int = 0, col_start: int = 0):
+        """
+        Changes the tiles from (row_start, col_start) on to the types of the layout: a 2D array of V / P / Q / U
+        characters or of type codes (see TILE_CODES), or text with one line of V / P / Q / U per row of tiles
+        """
+        self.__update_tiles(row_start, col_start, layout_codes(layout))
+
+    def __update_tiles(self, row_start: int, col_start: int, codes: np.ndarray, mask: np.ndarray = None):
+        """
+        Changes the window of tiles starting at (row_start, col_start) to the codes (where the mask is True),
+        in one pass: the counts, the tile index and everything attached are updated once for the whole window
+        """
+        row_end, col_end = row_start + codes.shape[0], col_start + codes.shape[1]
+        if not (0 <= row_start <= row_end <= self.num_rows and 0 <= col_start <= col_end <= self.num_columns):
+            raise RuntimeError(f'Tiles {row_start}-{row_end} X {col_start}-{col_end} are not all in the map')
+        if codes.size == 0:
+            return
+        old_codes = np.array(self.type_codes[row_start:row_end, col_start:col_end])
+        new_codes = codes if mask is None else np.where(mask, codes, old_codes)
+        changed = old_codes != new_codes
+        if not changed.any():
+            return
+        deltas = (
+            np.bincount(new_codes[changed], minlength=len(TILE_CODES)) -
+            np.bincount(old_codes[changed], minlength=len(TILE_CODES))
+        )
+        for code, key in CODE_KEYS.items():
+            self.counts[key] += int(deltas[code])
+        self.type_codes[row_start:row_end, col_start:col_end] = new_codes
+        rows, cols = np.nonzero(changed)
+        if not self.compact:
+            for row_idx, col_idx, code in zip(rows.tolist(), cols.tolist(), new_codes[changed].tolist()):
+                self.map_grid[row_start + row_idx][col_start + col_idx].set_type(
+                    TileTypeFactory.create_type(CODE_KEYS[code])
+                )
+        self.revision += 1
+        if self._tile_index is not None:
+            self._tile_index.tiles_changed(row_start, col_start, old_codes, new_codes)
+        # the window around the tiles that did change
+        top, bottom = row_start + int(rows.min()), row_start + int(rows.max()) + 1
+        left, right = col_start + int(cols.min()), col_start + int(cols.max()) + 1
+        for value in self._attached.values():
+            value.tiles_changed(top, bottom, left, right)
+
+    def load_type_codes(self, type_codes: np.ndarray):
+        """
+        Replaces all the tile types at once with a (rows x columns) array of codes (see TILE_CODES),
+        the array is used as is (i.e. a memory mapped file, see mapper.core.storage)
+
+        Everything attached to the map is dropped, it is created again the next time it is asked for
+        """
+        if self.chunked:
+            raise RuntimeError('The tile types of a chunked map are its file')
+        if type_codes.shape != (self.num_rows, self.num_columns):
+            raise RuntimeError(f'Tile types of shape {type_codes.shape} for a map of {self.num_rows} X {self.num_columns}')
+        if type_codes.size > 0 and int(type_codes.max()) >= len(TILE_CODES):
+            raise RuntimeError(f'Unknown tile type code {int(type_codes.max())}')
+        self.type_codes = type_codes
+        self.__count_types(np.bincount(type_codes.ravel(), minlength=len(TILE_CODES)))
+        if not self.compact:
+            # regular maps also keep the type in every tile
+            for row_idx, row in enumerate(self.map_grid):
+                for col_idx, tile in enumerate(row):
+                    tile.set_type(TileTypeFactory.create_type(CODE_KEYS[int(type_codes[row_idx, col_idx])]))
+        self.revision += 1
+        if self._tile_index is not None:
+            self._tile_index.rebuild()
+        self._attached = {}
+
+    def __count_types(self, counts: np.ndarray):
+        for code, key in CODE_KEYS.items():
+            self.counts[key] = int(counts[code])
 
     def validate_index(self, tile_index: int) -> bool:
         """
@@ -304,7 +607,8 @@ class Map:
                     else:
                         left_tile = self.map_grid[row_idx][col_idx - 1]
                         right_tile = self.map_grid[row_idx][col_idx]
-                    self.__create_edge(node, next_node, left_tile, right_tile, accept_none=True)
+                    edge = self.__create_edge(node, next_node, left_tile, right_tile, accept_none=True)
+                    self._edge_index[(row_idx, col_idx, DOWN)] = edge
 
                 if not self.__max_node_col(col_idx):
                     # create horizontal edge
@@ -321,21 +625,24 @@ class Map:
                         # somewhere inside
                         top_tile = self.map_grid[row_idx][col_idx]
                         bottom_tile = self.map_grid[row_idx - 1][col_idx]
-                    self.__create_edge(node, next_node, top_tile, bottom_tile, accept_none=True)
+                    edge = self.__create_edge(node, next_node, top_tile, bottom_tile, accept_none=True)
+                    self._edge_index[(row_idx, col_idx, RIGHT)] = edge
 
                 if not self.__max_node_col(col_idx) and not self.__max_node_row(row_idx):
                     # connect diagonal down
                     # make sure this is not along right or bottom edge
                     next_node = self._node_grid[row_idx + 1][col_idx + 1]
                     crossing_tile = self.map_grid[row_idx][col_idx]
-                    self.__create_edge(node, next_node, crossing_tile, accept_none=False)
+                    edge = self.__create_edge(node, next_node, crossing_tile, accept_none=False)
+                    self._edge_index[(row_idx, col_idx, DIAGONAL_DOWN)] = edge
 
                 if row_idx != 0 and not self.__max_node_col(col_idx):
                     # connect diagonal up
                     # make sure this is not along top or right edge
                     next_node = self._node_grid[row_idx - 1][col_idx + 1]
                     crossing_tile = self.map_grid[row_idx - 1][col_idx]
-                    self.__create_edge(node, next_node, crossing_tile, accept_none=False)
+                    edge = self.__create_edge(node, next_node, crossing_tile, accept_none=False)
+                    self._edge_index[(row_idx, col_idx, DIAGONAL_UP)] = edge
 
     def __max_node_col(self, col_idx: int) -> bool:
         return col_idx == self.num_columns
@@ -364,102 +671,60 @@ class Map:
         else:
             # diagonal edge
             edge = DiagonalEdge(node_one, node_two, tile_one)
-        self._all_edges.append(edge)
         if node_one is not None:
             node_one.add_edge(edge)
         if node_two is not None:
             node_two.add_edge(edge)
         return edge
 
-    def str_display(self):
+    def str_display(self,
+                    row_start: int = 0,
+                    row_end: Optional[int] = None,
+                    col_start: int = 0,
+                    col_end: Optional[int] = None):
         """
-        Prints the map to console
+        Prints the map to console, or only the tiles in rows row_start to row_end - 1, columns col_start to col_end - 1
         """
-        # for printing awkwardly positioned user points:
-        # if counter = 0 --> check along top edge, using top left node, check vertical axis
-        # if counter = 3 AND MAX GRID COL --> check along right edge
-        # if counter = 3 --> check left edge
-        # if bottom edge, check bottom edge
-        # if counter = 0 --> check if node has diagonal edge with float coords (user created point in middle of tile)
+        print(MapRenderer.for_map(self).render(row_start, row_end, col_start, col_end))
 
-        # assume uniform grid
-        tile_size = self.map_grid[0][0].display_size()
-        collected_strs = ['' for _ in self.map_grid for _ in range(tile_size)]
-        collected_strs.append('')
-        for row_idx, row in enumerate(self._node_grid):
-            for col_idx, node in enumerate(row):
-                cur_row_idx = row_idx * tile_size
-                # add the node names in the corner of the grid
-                node_name = node.get_name()
-                collected_strs[cur_row_idx] += node_name
-                if self.__max_node_col(col_idx):
-                    # on the right outer edge
-                    continue
-                if self.__max_node_row(row_idx):
-                    # on the bottom edge, only need to fill in the nodes and the bottom edge
-                    # see if there is a user-defined point along bottom edge
-                    bottom_edge_label = node.get_user_point_label_on_axis(vertical_axis=False, divisor=self.TILE_WIDTH)
-                    collected_strs[cur_row_idx] += self.map_grid[row_idx - 1][col_idx].to_str_display(
-                        tile_size,
-                        name=node_name,
-                        horizontal_label=bottom_edge_label
-                    )
-                else:
-                    # inside the grid
-                    incrementer, counter = 0, 0
-                    middle_label = None
-                    for idx in range(tile_size):
-                        cur_row_idx += incrementer
-                        if counter == 0:
-                            # see if there is user-defined point along top edge of tile
-                            top_edge_user_label = node.get_user_point_label_on_axis(vertical_axis=False, divisor=self.TILE_WIDTH)
-                            middle_label = node.get_user_point_in_tile_label(self.TILE_WIDTH)
-                        else:
-                            top_edge_user_label = None
-                        if counter == 3:
-                            # see if there is user-defined point along the left edge of the tile
-                            left_edge_user_label = node.get_user_point_label_on_axis(vertical_axis=True, divisor=self.TILE_WIDTH)
-                            if left_edge_user_label is not None:
-                                to_sub = int(len(left_edge_user_label) / 2)
-                                # make space on left to centre the label
-                                collected_strs[cur_row_idx] = collected_strs[cur_row_idx][0: -to_sub]
-                        else:
-                            left_edge_user_label = None
-                        incrementer = incrementer if incrementer != 0 else 1
-                        if self.__max_grid_col(col_idx):
-                            if counter == 3:
-                                # see if there is a user-defined point along the right edge of the tile
-                                next_node = self._node_grid[row_idx][col_idx + 1]
-                                right_vertical_label = next_node.get_user_point_label_on_axis(
-                                    vertical_axis=True,
-                                    divisor=self.TILE_WIDTH
-                                )
-                            else:
-                                right_vertical_label = None
-                            # last tile in the row, add the | on the right side
-                            collected_strs[cur_row_idx] += self.map_grid[row_idx][col_idx].to_str_display(
-                                idx,
-                                include_right=True,
-                                name=node_name,
-                                horizontal_label=top_edge_user_label,
-                                left_vertical_label=left_edge_user_label,
-                                right_vertical_label=right_vertical_label,
-                                leftmost=col_idx == 0,
-                                middle_label=middle_label
-                            )
-                        else:
-                            # inside the grid
-                            collected_strs[cur_row_idx] += self.map_grid[row_idx][col_idx].to_str_display(
-                                idx,
-                                name=node_name,
-                                horizontal_label=top_edge_user_label,
-                                left_vertical_label=left_edge_user_label,
-                                leftmost=col_idx == 0,
-                                middle_label=middle_label
-                            )
-                        counter += 1
-        # finished, print
-        print('\n'.join(collected_strs))
+    def write_display(self, path: str):
+        """
+        Writes the display of the whole map to the file at path, for maps too big to print
+        """
+        with open(path, 'w') as out:
+            MapRenderer.for_map(self).write(out)
 
     def get_node_grid(self) -> List[List[Node]]:
         return self._node_grid
+
+
+def layout_codes(layout: Union[np.ndarray, str, List[str]]) -> np.ndarray:
+    """
+    2D uint8 array of the type codes of a layout (see Map.assign_tiles)
+    """
+    if isinstance(layout, str):
+        layout = layout.split()
+    if isinstance(layout, list) and all(isinstance(line, str) for line in layout):
+        if len({len(line) for line in layout}) > 1:
+            raise RuntimeError('The lines of the layout have different lengths')
+        num_cols = len(layout[0]) if len(layout) > 0 else 0
+        layout = np.array([list(line) for line in layout], dtype='<U1').reshape((len(layout), num_cols))
+    layout = np.asarray(layout)
+    if layout.ndim != 2:
+        raise RuntimeError(f'Layout of {layout.ndim} dimensions, it should have 2')
+    if layout.dtype.kind in 'US':
+        if layout.size > 0 and (np.char.str_len(layout) != 1).any():
+            raise RuntimeError('Invalid TileType in the layout')
+        # through a table of the character codes, so the whole layout is translated at once
+        chars = np.char.upper(layout.astype('<U1')).view(np.uint32).reshape(layout.shape)
+        table = np.full(128, len(TILE_CODES), dtype=np.uint8)
+        for key, code in TILE_CODES.items():
+            table[ord(key)] = code
+        codes = table[np.minimum(chars, 127)]
+    elif layout.dtype.kind in 'iu':
+        codes = np.where((layout >= 0) & (layout < len(TILE_CODES)), layout, len(TILE_CODES)).astype(np.uint8)
+    else:
+        raise RuntimeError(f'Layout of {layout.dtype}, it should be characters or type codes')
+    if codes.size > 0 and int(codes.max()) >= len(TILE_CODES):
+        raise RuntimeError('Invalid TileType in the layout')
+    return codes
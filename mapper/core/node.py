@@ -9,13 +9,18 @@ class Node:
 
     Class representing a node in the Graph of the map
 
-    """
-    SEQ_INT = 0
+    node_id is a dense integer allocated by the map the node belongs to, grid nodes take their position in the
+    grid (row * (columns + 1) + col) and user points the ids after the grid. The points of a VirtualPoints view
+    don't belong to the map, they have none
 
-    def __init__(self, row_idx: int, col_idx: int, row_total: int, name: str = None):
+    """
+    def __init__(self, row_idx: int, col_idx: int, row_total: int, name: str = None, node_id: int = None):
         self.row_idx: int = row_idx
         self.col_idx: int = col_idx
         self.row_total: int = row_total
+        if node_id is None and row_total is not None:
+            node_id = Node.seq_for_position(row_idx, col_idx, row_total)
+        self.node_id: Optional[int] = node_id
         if name is None:
             self.name: str = self.create_name(row_idx, col_idx, row_total)
         else:
@@ -23,13 +28,24 @@ class Node:
         self.edges: List[Edge] = []
         self.old_name: Optional[str] = None
 
-    @staticmethod
-    def reset():
-        Node.SEQ_INT = 0
-
     def add_edge(self, edge: Edge):
         self.edges.append(edge)
 
+    def remove_edge(self, edge: Edge):
+        # by identity, a node never has more than a handful of edges
+        for idx, existing_edge in enumerate(self.edges):
+            if existing_edge is edge:
+                self.edges.pop(idx)
+                return
+        raise RuntimeError(f'Node {self.name} has no such edge')
+
+    def edge_to(self, other_node: Node) -> Optional[Edge]:
+        # the edge going to the other node, None if they are not connected
+        for edge in self.edges:
+            if edge.node_one is other_node or edge.node_two is other_node:
+                return edge
+        return None
+
     def get_user_point_in_tile_label(self, divisor: int) -> Union[str, None]:
         for edge in self.edges:
             if (
@@ -62,8 +78,13 @@ class Node:
                 return edge.get_other_node(self).name
         return None
 
-    def get_other_node_on_axis(self, below: bool, vertical: bool, right: bool) -> Union[Edge, None]:
-        for edge in self.edges:
+    def get_other_node_on_axis(self,
+                               below: bool,
+                               vertical: bool,
+                               right: bool,
+                               edges: List[Edge] = None) -> Union[Edge, None]:
+        # edges: the edges of the node to look at, if not its own (i.e. with virtual points, see VirtualPoints)
+        for edge in (self.edges if edges is None else edges):
             if (
                 # must be straight edge on axis
                 not isinstance(edge, DiagonalEdge) and
@@ -92,14 +113,33 @@ class Node:
 
     @staticmethod
     def create_name(row_idx: int, col_idx: int, row_total: int) -> str:
-        # the name is a sequential character code A, B, C .. AAB ... BAD ...
-        seq_int = Node.SEQ_INT
-        Node.SEQ_INT += 1
-        num_extra = int(seq_int / 26)
-        extra_char = chr(num_extra + 64) if num_extra != 0 else ''
-        char = chr((seq_int % 26) + 65)
-        name = f'{extra_char}{char}'
-        return name
+        return Node.name_for_seq(Node.seq_for_position(row_idx, col_idx, row_total))
+
+    @staticmethod
+    def seq_for_position(row_idx: int, col_idx: int, row_total: int) -> int:
+        # position of a grid node, row by row, in a grid of row_total tiles (row_total + 1 nodes) per row
+        return row_idx * (row_total + 1) + col_idx
+
+    @staticmethod
+    def name_for_seq(seq_int: int) -> str:
+        # the name is the bijective base 26 code of the sequence A, B, .. Z, AA, AB, .. ZZ, AAA ...
+        # so every position gets its own name, whatever the size of the map
+        chars = []
+        seq_int += 1
+        while seq_int > 0:
+            seq_int, remainder = divmod(seq_int - 1, 26)
+            chars.append(chr(remainder + 65))
+        return ''.join(reversed(chars))
+
+    @staticmethod
+    def seq_for_name(name: str) -> Optional[int]:
+        # inverse of name_for_seq, None if the name is not a sequential name
+        if len(name) == 0 or not all('A' <= char <= 'Z' for char in name):
+            return None
+        seq_int = 0
+        for char in name:
+            seq_int = seq_int * 26 + ord(char) - 64
+        return seq_int - 1
 
     def revert_name(self):
         self.name = self.old_name
@@ -112,11 +152,8 @@ class Node:
         self.old_name = self.name
         self.name = name
 
-    def remove_edge_by_idx(self, idx: int):
-        self.edges.pop(idx)
-
-    def borders_tile_of_type(self, tile_type: Type) -> bool:
-        for edge in self.edges:
+    def borders_tile_of_type(self, tile_type: Type, edges: List[Edge] = None) -> bool:
+        for edge in (self.edges if edges is None else edges):
             if isinstance(edge, DiagonalEdge) and isinstance(edge.crossing.tile_type, tile_type):
                 return True
         return False
@@ -0,0 +1,164 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from mapper.core.edge import Edge, DiagonalEdge, StraightEdge, RIGHT, DOWN, DIAGONAL_DOWN, DIAGONAL_UP
+from mapper.core.node import Node
+
+if TYPE_CHECKING:
+    from mapper.core.map import Map
+
+
+class VirtualPoints:
+    """
+
+    START / END points laid over a map without changing it
+
+    Map.add_point splits the edges of the grid to connect a point, these points only exist in this view:
+    the edges of the grid nodes a point is connected to are kept here, and the search asks the view (not the node)
+    for the edges of a node. The map is only read, so any number of views (and searches) can share it.
+    A point goes on the edges as they are, already split by the other points (of the map or of this view), and a
+    point where there already is one is that point.
+
+    Same interface as Map for the search: lookup_node, node_name, edges, user_edited and user_nodes
+
+    """
+    def __init__(self, cov_map: Map, points: List[Tuple[str, Tuple[float, float]]]):
+        self.map: Map = cov_map
+        # point name --> node, for points on a grid node this is the grid node itself
+        self._points: Dict[str, Node] = {}
+        # node --> its edges in this view, for the virtual nodes and the grid nodes they are connected to
+        self._edges: Dict[Node, List[Edge]] = {}
+        for name, (x, y) in points:
+            if not cov_map.validate_coords(x, y):
+                raise RuntimeError(f'Point {name} ({x}, {y}) is outside of the map')
+            self.__add_point(float(x), float(y), name)
+
+    def lookup_node(self, name: str) -> Node:
+        node = self._points.get(name)
+        if node is None:
+            return self.map.lookup_node(name)
+        return node
+
+    def node_name(self, node: Node) -> str:
+        # a point on a grid node is that node, named after the point only in this view
+        for name, point_node in self._points.items():
+            if point_node is node:
+                return name
+        return node.get_name()
+
+    def edges(self, node: Node) -> List[Edge]:
+        edges = self._edges.get(node)
+        return node.edges if edges is None else edges
+
+    def user_edited(self, node: Node) -> bool:
+        return node in self._edges or self.map.user_edited(node)
+
+    def user_nodes(self) -> List[Node]:
+        """
+        Nodes created for the points of this view (not the grid nodes they are on), and for the user points of the map
+        """
+        # the nodes created here are not part of any grid (no row_total), a point of the map can be one of the points
+        map_nodes = self.map.user_nodes()
+        created = [node for node in self._points.values() if node.row_total is None and node not in map_nodes]
+        return list(dict.fromkeys(created)) + map_nodes
+
+    def __add_point(self, x: float, y: float, name: str):
+        width = self.map.TILE_WIDTH
+        row_idx, col_idx = int(y / width), int(x / width)
+        if x.is_integer() and y.is_integer() and x % width == 0 and y % width == 0:
+            # on a grid node, the node is the point
+            self._points[name] = self.map.get_node(row_idx, col_idx)
+        elif x.is_integer() and x % width == 0:
+            # on a vertical edge
+            self.__split_edge(DOWN, row_idx, col_idx, Node(y, int(x), None, name))
+        elif y.is_integer() and y % width == 0:
+            # on a horizontal edge
+            self.__split_edge(RIGHT, row_idx, col_idx, Node(int(y), x, None, name))
+        else:
+            self.__add_to_tile(row_idx, col_idx, Node(y, x, None, name))
+
+    def __add_to_tile(self, row_idx: int, col_idx: int, new_node: Node):
+        # same edges, in the same order, as Map.__add_to_tile
+        top_left_node = self.map.get_node(row_idx, col_idx)
+        bottom_right_node = self.map.get_node(row_idx + 1, col_idx + 1)
+        bottom_left_node = self.map.get_node(row_idx + 1, col_idx)
+        top_right_node = self.map.get_node(row_idx, col_idx + 1)
+        tile = self.map.map_grid[row_idx][col_idx]
+        downwards_diag = self.map.grid_edge(row_idx, col_idx, DIAGONAL_DOWN)
+        upwards_diag = self.map.grid_edge(row_idx + 1, col_idx, DIAGONAL_UP)
+        if any(edge is downwards_diag for edge in self.edges(top_left_node)):
+            for node, edge in [(top_left_node, downwards_diag), (bottom_right_node, downwards_diag),
+                               (top_right_node, upwards_diag), (bottom_left_node, upwards_diag)]:
+                self.__remove_edge(node, edge)
+        else:
+            # the diagonals went to another point in the tile, the new one is connected to the corners as well
+            for edge in self.edges(top_left_node):
+                other_node = edge.get_other_node(top_left_node)
+                if (
+                    isinstance(edge, DiagonalEdge) and
+                    (other_node.row_idx, other_node.col_idx) == (new_node.row_idx, new_node.col_idx)
+                ):
+                    self._points[new_node.get_name()] = other_node
+                    return
+        top_left_edge = DiagonalEdge(top_left_node, new_node, tile)
+        bottom_left_edge = DiagonalEdge(bottom_left_node, new_node, tile)
+        bottom_right_edge = DiagonalEdge(new_node, bottom_right_node, tile)
+        top_right_edge = DiagonalEdge(new_node, top_right_node, tile)
+        self._edges[new_node] = [top_left_edge, bottom_left_edge, bottom_right_edge, top_right_edge]
+        self.__own_edges(bottom_left_node).append(bottom_left_edge)
+        self.__own_edges(bottom_right_node).append(bottom_right_edge)
+        self.__own_edges(top_left_node).append(top_left_edge)
+        self.__own_edges(top_right_node).append(top_right_edge)
+        self._points[new_node.get_name()] = new_node
+
+    def __split_edge(self, direction: str, row_idx: int, col_idx: int, new_node: Node):
+        # same edges, in the same order, as Map.__add_on_edge, for the part of the grid edge the point is on
+        along = 'row_idx' if direction == DOWN else 'col_idx'
+        position = getattr(new_node, along)
+        origin_node = self.map.get_node(row_idx, col_idx)
+        while True:
+            edge = self.__next_on_line(origin_node, along)
+            terminal_node = edge.get_other_node(origin_node)
+            if getattr(terminal_node, along) == position:
+                self._points[new_node.get_name()] = terminal_node
+                return
+            if getattr(terminal_node, along) > position:
+                break
+            # a point on the edge before this one
+            origin_node = terminal_node
+        self.__remove_edge(origin_node, edge)
+        self.__remove_edge(terminal_node, edge)
+        new_edge_one = StraightEdge(origin_node, new_node, edge.tile_one, edge.tile_two)
+        new_edge_two = StraightEdge(new_node, terminal_node, edge.tile_one, edge.tile_two)
+        self._edges[new_node] = [new_edge_one, new_edge_two]
+        self.__own_edges(origin_node).append(new_edge_one)
+        self.__own_edges(terminal_node).append(new_edge_two)
+        self._points[new_node.get_name()] = new_node
+
+    def __next_on_line(self, node: Node, along: str) -> Edge:
+        # the straight edge to the next node down (along the rows) or right (along the columns) of the node
+        across = 'col_idx' if along == 'row_idx' else 'row_idx'
+        for edge in self.edges(node):
+            other_node = edge.get_other_node(node)
+            if (
+                not isinstance(edge, DiagonalEdge) and
+                getattr(other_node, across) == getattr(node, across) and
+                getattr(other_node, along) > getattr(node, along)
+            ):
+                return edge
+        raise RuntimeError(f'Node {node.get_name()} has no edge to split')
+
+    def __own_edges(self, node: Node) -> List[Edge]:
+        # the edges of a grid node in this view, copied from the node the first time they change
+        edges = self._edges.get(node)
+        if edges is None:
+            edges = self._edges[node] = list(node.edges)
+        return edges
+
+    def __remove_edge(self, node: Node, edge: Edge):
+        edges = self.__own_edges(node)
+        for idx, existing_edge in enumerate(edges):
+            if existing_edge is edge:
+                edges.pop(idx)
+                return
+        raise RuntimeError(f'Node {node.get_name()} has no such edge')
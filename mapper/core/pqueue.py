@@ -1,8 +1,18 @@
-from typing import Any, Union, Dict, List
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from math import floor, isinf
+from typing import Any, Deque, Union, Dict, List, Tuple, Type
 
 
-class PriorityQueue:
+class DictPriorityQueue:
+    """
 
+    Original priority queue, a dict of FIFO lists keyed by priority
+
+    Every dequeue scans all the distinct priorities, kept around to benchmark against
+
+    """
     def __init__(self):
         self.num_items = 0
         self.items: Dict[Union[int, float], List[Any]] = {}
@@ -26,3 +36,117 @@ class PriorityQueue:
 
     def empty(self) -> bool:
         return self.num_items == 0
+
+    def __len__(self) -> int:
+        return self.num_items
+
+
+class HeapPriorityQueue:
+    """
+
+    Binary heap priority queue, O(log n) queue and dequeue
+
+    Items with the same priority come out in the order they went in (FIFO), the same as the original queue
+
+    """
+    def __init__(self):
+        self.items: List[Tuple[Union[int, float], int, Any]] = []
+        # insertion counter used to break ties, so items themselves never get compared
+        self.seq = count()
+
+    def queue(self, priority: Union[int, float], item: Any):
+        heappush(self.items, (priority, next(self.seq), item))
+
+    def dequeue(self) -> Any:
+        if len(self.items) == 0:
+            return None
+        return heappop(self.items)[2]
+
+    def empty(self) -> bool:
+        return len(self.items) == 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class BucketPriorityQueue:
+    """
+
+    Dial style bucket queue
+
+    Priorities are grouped into buckets of width `resolution` (RoleC/RoleP edge costs are multiples of 0.5),
+    dequeue walks a cursor forward over the buckets instead of comparing every item. Priorities that fall exactly
+    on a bucket boundary go in a FIFO, any other priority (i.e. the euclidean heuristic of Role V) goes in a small
+    heap behind it, so the dequeue order is exactly the same as HeapPriorityQueue.
+
+    """
+    def __init__(self, resolution: float = 0.5):
+        self.resolution: float = resolution
+        self.num_items: int = 0
+        # bucket idx --> (FIFO of items on the boundary, heap of (priority, seq, item) inside the bucket)
+        self.buckets: Dict[int, Tuple[Deque[Any], List[Tuple[Union[int, float], int, Any]]]] = {}
+        # infinite priorities can't be bucketed, they get their own heap
+        self.overflow: List[Tuple[Union[int, float], int, Any]] = []
+        self.cursor: int = 0
+        self.seq = count()
+
+    def queue(self, priority: Union[int, float], item: Any):
+        self.num_items += 1
+        if isinf(priority):
+            heappush(self.overflow, (priority, next(self.seq), item))
+            return
+        bucket_idx = floor(priority / self.resolution)
+        bucket = self.buckets.get(bucket_idx)
+        if bucket is None:
+            bucket = self.buckets[bucket_idx] = (deque(), [])
+            if len(self.buckets) == 1:
+                # only bucket in the queue, start the cursor on it
+                self.cursor = bucket_idx
+        # A* with an inconsistent heuristic can queue below the cursor, so allow it to move back
+        if bucket_idx < self.cursor:
+            self.cursor = bucket_idx
+        if priority == bucket_idx * self.resolution:
+            bucket[0].append(item)
+        else:
+            heappush(bucket[1], (priority, next(self.seq), item))
+
+    def dequeue(self) -> Any:
+        if self.num_items == 0:
+            return None
+        self.num_items -= 1
+        if len(self.buckets) == 0:
+            return heappop(self.overflow)[2]
+        while self.cursor not in self.buckets:
+            self.cursor += 1
+        boundary, inside = self.buckets[self.cursor]
+        to_return = boundary.popleft() if len(boundary) > 0 else heappop(inside)[2]
+        if len(boundary) == 0 and len(inside) == 0:
+            self.buckets.pop(self.cursor)
+        return to_return
+
+    def empty(self) -> bool:
+        return self.num_items == 0
+
+    def __len__(self) -> int:
+        return self.num_items
+
+
+# the queue for any priorities (the searches of roles C and P default to the bucket queue, see
+# HeuristicAStar.default_queue_type)
+PriorityQueue = HeapPriorityQueue
+
+QUEUE_TYPES: Dict[str, Type] = {
+    'dict': DictPriorityQueue,
+    'heap': HeapPriorityQueue,
+    'bucket': BucketPriorityQueue,
+}
+
+
+def create_queue(queue_type: str = 'heap'):
+    """
+    Creates an empty priority queue of the given backend ('dict', 'heap' or 'bucket')
+    """
+    queue_class = QUEUE_TYPES.get(queue_type)
+    if queue_class is None:
+        raise RuntimeError(f'No priority queue of type {queue_type}')
+    return queue_class()
@@ -0,0 +1,175 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from mapper.core.node import Node
+
+if TYPE_CHECKING:
+    from mapper.core.map import Map
+
+# display row of a tile with the labels of the user points on its left / right edge
+SIDE_LABEL_ROW = 3
+
+
+class MapRenderer:
+    """
+
+    Text display of a map (see Map.str_display), attached to the map so it hears about every change
+
+    The display is made of one block per node above and left of a tile: the node name, the top edge and the inside
+    of the tile, with the labels of the user points on them. A block only depends on its tile and on the node and
+    the one right of it, so the blocks are kept and only the ones of changed tiles / nodes are made again.
+    Any window of tiles can be displayed, row by row, i.e. to print part of a big map or write it to a file
+
+    """
+    def __init__(self, cov_map: Map):
+        self.map: Map = cov_map
+        # display rows of a tile, assume uniform grid
+        self.tile_size: int = cov_map.map_grid[0][0].display_size()
+        # (row, col) of the node --> display rows of its block
+        self._blocks: Dict[Tuple[int, int], List[str]] = {}
+        # a chunked map doesn't fit in memory, its display doesn't either
+        self._keep_blocks: bool = not cov_map.chunked
+
+    @staticmethod
+    def for_map(cov_map: Map) -> MapRenderer:
+        return cov_map.attached('renderer', lambda: MapRenderer(cov_map))
+
+    def tile_changed(self, row_idx: int, col_idx: int):
+        self._blocks.pop((row_idx, col_idx), None)
+
+    def tiles_changed(self, row_start: int, row_end: int, col_start: int, col_end: int):
+        if (row_end - row_start) * (col_end - col_start) > len(self._blocks):
+            self._blocks = {
+                key: block for key, block in self._blocks.items()
+                if not (row_start <= key[0] < row_end and col_start <= key[1] < col_end)
+            }
+            return
+        for row_idx in range(row_start, row_end):
+            for col_idx in range(col_start, col_end):
+                self._blocks.pop((row_idx, col_idx), None)
+
+    def nodes_changed(self, nodes: List[Node]):
+        for node in nodes:
+            if isinstance(node.row_idx, int) and isinstance(node.col_idx, int):
+                # the block of the node, and the one left of it (labels on the edge between them)
+                self._blocks.pop((node.row_idx, node.col_idx), None)
+                self._blocks.pop((node.row_idx, node.col_idx - 1), None)
+
+    def render(self,
+               row_start: int = 0,
+               row_end: Optional[int] = None,
+               col_start: int = 0,
+               col_end: Optional[int] = None) -> str:
+        return '\n'.join(self.lines(row_start, row_end, col_start, col_end))
+
+    def write(self,
+              out: TextIO,
+              row_start: int = 0,
+              row_end: Optional[int] = None,
+              col_start: int = 0,
+              col_end: Optional[int] = None):
+        """
+        Writes the display to a file, one row at a time
+        """
+        for line in self.lines(row_start, row_end, col_start, col_end):
+            out.write(line)
+            out.write('\n')
+
+    def lines(self,
+              row_start: int = 0,
+              row_end: Optional[int] = None,
+              col_start: int = 0,
+              col_end: Optional[int] = None) -> Iterator[str]:
+        """
+        Display rows of the tiles in rows row_start to row_end - 1, columns col_start to col_end - 1
+        (the whole map by default)
+        """
+        row_end = self.map.num_rows if row_end is None else row_end
+        col_end = self.map.num_columns if col_end is None else col_end
+        if not (0 <= row_start < row_end <= self.map.num_rows and 0 <= col_start < col_end <= self.map.num_columns):
+            raise RuntimeError(f'Invalid window rows {row_start}-{row_end}, columns {col_start}-{col_end}')
+        for row_idx in range(row_start, row_end):
+            blocks = [self.__block(row_idx, col_idx) for col_idx in range(col_start, col_end)]
+            if col_start > 0:
+                blocks[0] = self.__left_side(row_idx, col_start, blocks[0])
+            right_side = self.__right_side(row_idx, col_end)
+            for idx in range(self.tile_size):
+                yield ''.join([block[idx] for block in blocks] + [right_side[idx]])
+        # bottom edge of the window
+        bottom = [self.__block(row_end, col_idx)[0] for col_idx in range(col_start, col_end)]
+        yield ''.join(bottom) + self.map.get_node(row_end, col_end).get_name()
+
+    def __block(self, row_idx: int, col_idx: int) -> List[str]:
+        block = self._blocks.get((row_idx, col_idx))
+        if block is None:
+            block = self.__make_block(row_idx, col_idx)
+            if self._keep_blocks:
+                self._blocks[(row_idx, col_idx)] = block
+        return block
+
+    def __make_block(self, row_idx: int, col_idx: int) -> List[str]:
+        """
+        Display rows of the node at (row_idx, col_idx) and the tile below and right of it
+        (only the bottom edge of the tile above it for the nodes of the bottom row)
+        """
+        width = self.map.TILE_WIDTH
+        node = self.map.get_node(row_idx, col_idx)
+        node_name = node.get_name()
+        top_edge_user_label = node.get_user_point_label_on_axis(vertical_axis=False, divisor=width)
+        if row_idx == self.map.num_rows:
+            tile = self.map.map_grid[row_idx - 1][col_idx]
+            bottom_edge = tile.to_str_display(self.tile_size, name=node_name, horizontal_label=top_edge_user_label)
+            return [node_name + bottom_edge]
+        tile = self.map.map_grid[row_idx][col_idx]
+        last_col = col_idx == self.map.num_columns - 1
+        middle_label = node.get_user_point_in_tile_label(width)
+        left_edge_user_label = node.get_user_point_label_on_axis(vertical_axis=True, divisor=width)
+        right_node = self.map.get_node(row_idx, col_idx + 1)
+        right_edge_user_label = right_node.get_user_point_label_on_axis(vertical_axis=True, divisor=width)
+        block = []
+        for idx in range(self.tile_size):
+            side_row = idx == SIDE_LABEL_ROW
+            block.append(tile.to_str_display(
+                idx,
+                include_right=last_col,
+                name=node_name,
+                horizontal_label=top_edge_user_label if idx == 0 else None,
+                left_vertical_label=left_edge_user_label if side_row else None,
+                right_vertical_label=right_edge_user_label if side_row and last_col else None,
+                leftmost=col_idx == 0,
+                middle_label=middle_label
+            ))
+        block[0] = node_name + block[0]
+        if not last_col and right_edge_user_label is not None:
+            # make space on the right to centre the label of the next tile
+            side_row = block[SIDE_LABEL_ROW]
+            block[SIDE_LABEL_ROW] = side_row[:len(side_row) - int(len(right_edge_user_label) / 2)]
+        return block
+
+    def __left_side(self, row_idx: int, col_idx: int, block: List[str]) -> List[str]:
+        """
+        Block of the first tile of a window that doesn't start at the left edge of the map: a label on its left
+        edge takes space from the tile left of it on the full display, here it takes the space after the label
+        """
+        node = self.map.get_node(row_idx, col_idx)
+        label = node.get_user_point_label_on_axis(vertical_axis=True, divisor=self.map.TILE_WIDTH)
+        if label is None:
+            return block
+        side_row = block[SIDE_LABEL_ROW]
+        block = list(block)
+        block[SIDE_LABEL_ROW] = label + side_row[len(label) + int(len(label) / 2):]
+        return block
+
+    def __right_side(self, row_idx: int, col_idx: int) -> List[str]:
+        """
+        Display rows right of the last tile of a window: the name of the node in the corner, and the right edge
+        of the tiles when it's not the right edge of the map (which the last tile of the row has)
+        """
+        node = self.map.get_node(row_idx, col_idx)
+        if col_idx == self.map.num_columns:
+            return [node.get_name()] + [''] * (self.tile_size - 1)
+        side = [node.get_name()] + ['|'] * (self.tile_size - 1)
+        label = node.get_user_point_label_on_axis(vertical_axis=True, divisor=self.map.TILE_WIDTH)
+        if label is not None:
+            side[SIDE_LABEL_ROW] = label
+        return side
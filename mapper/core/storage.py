@@ -0,0 +1,70 @@
+"""
+
+Binary map files, a small header followed by the raw uint8 tile type grid
+
+    header   -- magic b'COVMAP', format version, rows, columns, number of user points (little endian)
+    points   -- per user point: name (8 bytes, ascii, zero padded), x, y (float64)
+    tiles    -- rows x columns uint8 codes (see TILE_CODES), row by row
+
+The tile grid is memory mapped on load and given to the map as is, there is no per tile work, so big maps load
+in the time it takes to count their tile types (and only the pages a search touches are read from disk)
+
+"""
+import struct
+
+import numpy as np
+
+from mapper.core.map import Map
+
+MAGIC = b'COVMAP'
+VERSION = 1
+# magic, version, rows, columns, number of points
+HEADER = struct.Struct('<6sHIII')
+# name, x, y
+POINT = struct.Struct('<8sdd')
+
+
+def save_map(cov_map: Map, path: str):
+    """
+    Writes the size, tile types and user points (START / END) of the map to path
+    """
+    if cov_map.chunked:
+        # already a file, the whole grid would have to be read in memory
+        raise RuntimeError('Chunked maps are stored in their own file')
+    points = cov_map.user_points()
+    with open(path, 'wb') as map_file:
+        map_file.write(HEADER.pack(MAGIC, VERSION, cov_map.num_rows, cov_map.num_columns, len(points)))
+        for name, (x, y) in points:
+            map_file.write(POINT.pack(name.encode('ascii'), x, y))
+        map_file.write(np.ascontiguousarray(cov_map.type_codes, dtype=np.uint8).tobytes())
+
+
+def load_map(path: str, compact: bool = True, mmap: bool = True) -> Map:
+    """
+    Reads a map written by save_map, with its user points added back
+
+    compact -- build a compact map (no per tile / per node objects until they are used)
+    mmap    -- memory map the tile types (copy on write, the file never changes), or read them into memory
+    """
+    with open(path, 'rb') as map_file:
+        magic, version, num_rows, num_cols, num_points = HEADER.unpack(map_file.read(HEADER.size))
+        if magic != MAGIC:
+            raise RuntimeError(f'{path} is not a map file')
+        if version != VERSION:
+            raise RuntimeError(f'Map file version {version} is not supported')
+        points = []
+        for _ in range(num_points):
+            name, x, y = POINT.unpack(map_file.read(POINT.size))
+            points.append((name.rstrip(b'\0').decode('ascii'), (x, y)))
+    offset = HEADER.size + num_points * POINT.size
+    shape = (num_rows, num_cols)
+    if mmap and num_rows * num_cols > 0:
+        type_codes = np.memmap(path, dtype=np.uint8, mode='c', offset=offset, shape=shape)
+    else:
+        type_codes = np.fromfile(path, dtype=np.uint8, count=num_rows * num_cols, offset=offset).reshape(shape)
+    cov_map = Map(num_columns=num_cols, num_rows=num_rows, compact=compact)
+    cov_map.load_type_codes(type_codes)
+    for name, (x, y) in points:
+        cov_map.add_point(x, y, name)
+    return cov_map
+
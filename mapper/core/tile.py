@@ -126,6 +126,15 @@ class TileTypeFactory:
         else:
             return False
 
+    @staticmethod
+    def code(tile_type: str) -> int:
+        """
+        Code of the tile type in the uint8 type grid of the map (0 for unassigned)
+        """
+        if not TileTypeFactory.validate(tile_type):
+            raise RuntimeError('Invalid TileType')
+        return TILE_CODES[tile_type.upper()]
+
     @staticmethod
     def create_type(tile_type: str) -> TileType:
         if tile_type.upper() == 'V':
@@ -142,19 +151,35 @@ class TileTypeFactory:
 
 
 class TileType:
-    pass
+    # code of the type in the uint8 type grid of the map
+    code: int = 0
 
 
 class Vaccine(TileType):
+    code = 1
+
     def __str__(self):
         return 'V'
 
 
 class PlayGround(TileType):
+    code = 2
+
     def __str__(self):
         return 'P'
 
 
 class Quarantine(TileType):
+    code = 3
+
     def __str__(self):
         return 'Q'
+
+
+# type character --> code in the type grid of the map, U (unassigned) is 0
+TILE_CODES = {
+    'U': 0,
+    'V': Vaccine.code,
+    'P': PlayGround.code,
+    'Q': Quarantine.code,
+}
@@ -7,20 +7,39 @@
 # For COMP 472 Section AA – Summer 2021
 # --------------------------------------------------------
 
+import argparse
+import os
+from contextlib import nullcontext
+from typing import ContextManager, Optional
+
 from mapper.core.map import Map
 from mapper.core.tile import TileTypeFactory
 from mapper.algos.base import HeuristicAStar
 from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.stats import SearchStats
+from mapper.algos.incremental import IncrementalSearch
+from mapper.algos.bidirectional import BidirectionalSearch
+from mapper.bench.session import OPTIONS, SessionProfiler
 
 
 class Driver:
+    # after a tile edit, only this many tiles a side around it are displayed (the whole map when it's smaller)
+    DISPLAY_WINDOW: int = 12
 
-    def __init__(self):
+    def __init__(self, profiler: Optional[SessionProfiler] = None):
+        # times every menu action when set (see mapper.bench.session)
+        self.profiler: Optional[SessionProfiler] = profiler
         self.require_break: bool = False
         self.role_factory: RoleAlgoFactory = None
         self.map: Map = None
         self.role: HeuristicAStar = None
-        self.__create_map(True)
+        self.incremental: IncrementalSearch = None
+        self.role_char: str = None
+        with self.__phase('create_map'):
+            self.__create_map(True)
+
+    def __phase(self, name: str) -> ContextManager:
+        return nullcontext() if self.profiler is None else self.profiler.phase(name)
 
     def __create_map(self, first_prompt: bool = False):
         if first_prompt:
@@ -48,6 +67,8 @@ class Driver:
         self.map.str_display()
         self.role_factory = RoleAlgoFactory(self.map)
         self.role = None
+        self.incremental = None
+        self.role_char = None
 
     def __print_types(self):
         v, p, q, u = self.map.get_counts()
@@ -63,13 +84,15 @@ class Driver:
         print('   2 - Edit tiles')
         print('   3 - Choose role')
         print('   4 - Run search')
-        print('   5 - Set START/END')
-        print('   6 - Remove user points')
-        print('   7 - Quit\n')
+        print('   5 - Run incremental search (keeps its state between runs)')
+        print('   6 - Set START/END')
+        print('   7 - Remove user points')
+        print('   8 - Run START --> END search')
+        print('   9 - Quit\n')
         
         while True:
             choice = input(' Your choice: ')
-            if choice.isnumeric() and 0 < int(choice) < 8:
+            if choice.isnumeric() and 0 < int(choice) < 10:
                 return int(choice)
             else:
                 print(' Invalid choice!')
@@ -108,10 +131,21 @@ class Driver:
                 break
             self.map.update_tile(tile_num, tile_choice)
             print('\n\n MAP UPDATED \n\n')
-            self.map.str_display()
+            self.__display_around(tile_num)
             print('\n\n')
         self.require_break = False
     
+    def __display_around(self, tile_num: int):
+        row_idx, col_idx = divmod(tile_num - 1, self.map.num_columns)
+        row_start = min(max(row_idx - self.DISPLAY_WINDOW // 2, 0), max(self.map.num_rows - self.DISPLAY_WINDOW, 0))
+        col_start = min(max(col_idx - self.DISPLAY_WINDOW // 2, 0), max(self.map.num_columns - self.DISPLAY_WINDOW, 0))
+        self.map.str_display(
+            row_start,
+            min(row_start + self.DISPLAY_WINDOW, self.map.num_rows),
+            col_start,
+            min(col_start + self.DISPLAY_WINDOW, self.map.num_columns)
+        )
+    
     def __choose_role(self):
         if self.map.has_start():
             role, first = '', True
@@ -125,6 +159,9 @@ class Driver:
                     break
             if role.lower() in ['c', 'v', 'p']:
                 self.role = self.role_factory.create(role.upper())
+                self.role.stats = SearchStats()
+                self.incremental = IncrementalSearch.for_map(self.map, role.upper())
+                self.role_char = role.upper()
         else:
             print(' Map must have start node!')
         
@@ -137,6 +174,26 @@ class Driver:
             print(' The map does not have a valid start point!')
         else:
             self.role.search()
+
+    def __run_incremental_search(self):
+        if self.incremental is None:
+            print(' Bad choice, role was not set!')
+        elif not self.map.valid_map_for_role(self.role.accepted_tile_type()):
+            print(f' The map is missing a tile of type {self.role.accepted_tile_type().__class__.__name__}')
+        elif not self.map.has_start():
+            print(' The map does not have a valid start point!')
+        else:
+            self.incremental.search()
+
+    def __run_search_to_end(self):
+        if self.role is None:
+            print(' Bad choice, role was not set!')
+        elif not self.map.has_start() or not self.map.has_end():
+            print(' The map does not have a START and an END point!')
+        else:
+            search = BidirectionalSearch(self.map, self.role_char)
+            search.stats = SearchStats()
+            search.search()
     
     def __add_points(self):
         if self.map.has_start():
@@ -189,33 +246,51 @@ class Driver:
         self.map.str_display()
 
     def run(self):
+        # menu choice --> phase name, action
+        actions = {
+            1: ('create_map', self.__create_map),
+            2: ('edit_tiles', self.__fill_spots),
+            3: ('choose_role', self.__choose_role),
+            4: ('search', self.__run_search),
+            5: ('incremental_search', self.__run_incremental_search),
+            6: ('add_points', self.__add_points),
+            7: ('remove_points', self.__remove_points),
+            8: ('search_to_end', self.__run_search_to_end),
+        }
         while True:
             choice = self.__main_menu()
-            if choice == 7:
+            if choice == 9:
                 print('\nThank you for playing. Stay safe!')
                 break
-            elif choice == 1:
-                self.__create_map()
-            elif choice == 2:
-                self.__fill_spots()
-            elif choice == 3:
-                self.__choose_role()
-            elif choice == 4:
-                self.__run_search()
-            elif choice == 5:
-                self.__add_points()
-            elif choice == 6:
-                self.__remove_points()
+            elif choice in actions:
+                name, action = actions[choice]
+                with self.__phase(name):
+                    action()
             else:
                 print('Invalid choice')
-            
+
 
 def main():
+    parser = argparse.ArgumentParser(description='COVID Mapper')
+    parser.add_argument('--profile', default=os.environ.get('MAPPER_PROFILE'),
+                        help='file to write a profile of the session to (or MAPPER_PROFILE)')
+    parser.add_argument('--profile-with', default=os.environ.get('MAPPER_PROFILE_WITH', ''),
+                        help=f'comma separated, from {OPTIONS} (or MAPPER_PROFILE_WITH)')
+    args = parser.parse_args()
+    profiler = None
+    if args.profile:
+        profiler = SessionProfiler.from_options(args.profile_with)
 
     print('\n Welcome to the COVID Mapper')
     print('\n Enter ## to break out of a loop at any time')
-    driver = Driver()
-    driver.run()
+    try:
+        driver = Driver(profiler)
+        driver.run()
+    finally:
+        if profiler is not None:
+            # also when the session ends on an error or ctrl-c
+            profiler.write_report(args.profile)
+            print(f'\n Profile of the session written to {args.profile}')
 
 
 if __name__ == '__main__':
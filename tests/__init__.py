@@ -0,0 +1,7 @@
+"""
+
+Checks of the searches on small seeded maps, against a flat Dijkstra search or a map built again from scratch
+
+    python -m pytest tests      (or python -m unittest, from the root of the repository)
+
+"""
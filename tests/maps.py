@@ -0,0 +1,100 @@
+"""
+
+Seeded maps and a flat Dijkstra search to check the searches against
+
+"""
+import contextlib
+import io
+import random
+from heapq import heappush, heappop
+from itertools import count
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.algos.base import HeuristicAStar, InfoContainer
+
+INF = float('inf')
+TYPES = 'UVPQ'
+
+
+def random_map(rnd: random.Random, max_size: int = 8, compact: bool = False, density: float = 0.4) -> Map:
+    """
+    Map of 1 to max_size rows and columns, with about density of its tiles set to V, P or Q
+    """
+    num_rows, num_columns = rnd.randint(1, max_size), rnd.randint(1, max_size)
+    cov_map = Map(num_columns, num_rows, compact=compact)
+    for tile_index in range(1, num_rows * num_columns + 1):
+        if rnd.random() < density:
+            cov_map.update_tile(tile_index, rnd.choice('VPQ'))
+    return cov_map
+
+
+def random_point(rnd: random.Random, cov_map: Map) -> Tuple[float, float]:
+    """
+    A node of the grid, the middle of an edge or the middle of a tile
+    """
+    x = rnd.randint(0, cov_map.num_columns * 2) / 2
+    y = rnd.randint(0, cov_map.num_rows * 2) / 2
+    return float(min(x, cov_map.num_columns)), float(min(y, cov_map.num_rows))
+
+
+def add_start(rnd: random.Random, cov_map: Map):
+    cov_map.add_point(*random_point(rnd, cov_map), 'START')
+
+
+def rebuilt(cov_map: Map) -> Map:
+    """
+    New map with the same tile types, set one tile at a time
+    """
+    fresh = Map(cov_map.num_columns, cov_map.num_rows, compact=cov_map.compact)
+    codes = np.asarray(cov_map.type_codes[0:cov_map.num_rows, 0:cov_map.num_columns])
+    for row_idx in range(cov_map.num_rows):
+        for col_idx in range(cov_map.num_columns):
+            if codes[row_idx, col_idx] != 0:
+                fresh.update_tile(row_idx * cov_map.num_columns + col_idx + 1, TYPES[codes[row_idx, col_idx]])
+    return fresh
+
+
+def quietly(function, *args):
+    """
+    Calls the function without the warnings the roles print
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def cost_of(goal_info: Optional[InfoContainer]) -> Optional[float]:
+    return None if goal_info is None else goal_info.cost
+
+
+def dijkstra_costs(role: HeuristicAStar) -> Dict[Node, float]:
+    """
+    Cheapest cost from the start node of the role to every node it can reach, with the moves of the role
+    """
+    quietly(role.before_search)
+    start = role.start_node
+    costs, infos, closed, seq = {start: 0.0}, {start: InfoContainer(start)}, set(), count()
+    heap = [(0.0, next(seq), start)]
+    while heap:
+        cost, _, node = heappop(heap)
+        if node in closed:
+            continue
+        closed.add(node)
+        for other_node, step_cost, label in quietly(lambda: list(role.successors(infos[node]))):
+            other_cost = cost + step_cost
+            if other_cost < costs.get(other_node, INF):
+                costs[other_node] = other_cost
+                infos[other_node] = InfoContainer(other_node, infos[node], other_cost, label)
+                heappush(heap, (other_cost, next(seq), other_node))
+    return {node: cost for node, cost in costs.items() if node in closed}
+
+
+def dijkstra_goal_cost(role: HeuristicAStar) -> Optional[float]:
+    """
+    Cost of the cheapest path from the start node of the role to a goal node (None if there is none)
+    """
+    goal_costs = [cost for node, cost in dijkstra_costs(role).items() if role.is_goal(node) and cost < INF]
+    return min(goal_costs, default=None)
@@ -0,0 +1,68 @@
+import random
+import unittest
+
+from mapper.algos.anytime import AnytimeSearch
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.field import CostToGo
+from tests.maps import add_start, dijkstra_goal_cost, quietly, random_map
+
+EPSILONS = [(1.0, 1.0), (2.0, 2.0), (3.0, 1.0), (5.0, 1.5)]
+
+
+class AnytimeSearchTest(unittest.TestCase):
+    """
+    Bounds of the weighted A* / ARA* searches, and the lower bounds of the roles they are proven with
+    """
+    def test_bound_holds(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=10, compact=seed % 2 == 0)
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                cheapest = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char))
+                for epsilon, final_epsilon in EPSILONS:
+                    search = AnytimeSearch(RoleAlgoFactory(cov_map).create(role_char), epsilon, final_epsilon)
+                    found = quietly(search.find_path)
+                    with self.subTest(seed=seed, role=role_char, epsilon=epsilon, final_epsilon=final_epsilon):
+                        if cheapest is None:
+                            self.assertIsNone(found)
+                            continue
+                        self.assertGreaterEqual(found.cost, cheapest - 1e-9)
+                        self.assertLessEqual(found.cost, search.bound * cheapest + 1e-9)
+                        # every run improves the path of the one before
+                        costs = [solution.cost for solution in search.solutions]
+                        self.assertEqual(costs, sorted(costs, reverse=True))
+
+    def test_bound_holds_out_of_budget(self):
+        for seed in range(30):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=12)
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                cheapest = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char))
+                role = RoleAlgoFactory(cov_map).create(role_char)
+                search = AnytimeSearch(role, 5.0, max_expansions=rnd.randint(1, 30))
+                found = quietly(search.find_path)
+                if found is None:
+                    continue
+                with self.subTest(seed=seed, role=role_char):
+                    self.assertLessEqual(found.cost, search.bound * cheapest + 1e-9)
+
+    def test_lower_bound_never_overestimates(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=10, compact=seed % 2 == 0)
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                role = RoleAlgoFactory(cov_map).create(role_char)
+                quietly(role.before_search)
+                costs = CostToGo(cov_map, role_char).costs()
+                with self.subTest(seed=seed, role=role_char):
+                    for row_idx in range(cov_map.num_rows + 1):
+                        for col_idx in range(cov_map.num_columns + 1):
+                            node = cov_map.get_node(row_idx, col_idx)
+                            self.assertLessEqual(role.lower_bound(node), costs[row_idx, col_idx] + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
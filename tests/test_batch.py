@@ -0,0 +1,95 @@
+import json
+import random
+import unittest
+
+from mapper.algos.stats import SearchStats
+from mapper.batch import run_batch
+
+
+def scenario_lines(seed: int, num: int):
+    """
+    Scenarios on seeded maps of very different sizes, so the processes don't finish them in order
+    """
+    rnd = random.Random(seed)
+    lines = []
+    for idx in range(num):
+        size = rnd.choice([2, 5, 40])
+        tiles = {str(rnd.randint(1, size * size)): rnd.choice('VPQ') for _ in range(size)}
+        lines.append(json.dumps({
+            'id': f's{idx}',
+            'rows': size,
+            'columns': size,
+            'tiles': tiles,
+            'start': [rnd.randint(0, size * 2) / 2, rnd.randint(0, size * 2) / 2],
+            'role': rnd.choice('CPV'),
+        }))
+    return lines
+
+
+def without_timings(result: str):
+    result = json.loads(result)
+    result.pop('seconds', None)
+    return result
+
+
+class BatchTest(unittest.TestCase):
+    """
+    Batch runner, the results of the scenarios of a JSONL input
+    """
+    def test_input_order_with_workers(self):
+        lines = scenario_lines(0, 24)
+        expected = [without_timings(result) for result in run_batch(lines, workers=1)]
+        self.assertEqual([result['id'] for result in expected], [f's{idx}' for idx in range(24)])
+        for workers, chunksize in [(3, 1), (2, 5)]:
+            with self.subTest(workers=workers, chunksize=chunksize):
+                results = [without_timings(result) for result in run_batch(lines, workers, chunksize)]
+                self.assertEqual(results, expected)
+
+    def test_error_lines(self):
+        good = '{"rows": 3, "columns": 4, "tiles": {"6": "Q"}, "start": [0.5, 1], "role": "C"}'
+        lines = [
+            good,
+            '{"rows": 3, "columns": 4, "start": [0.5, 1], "role": "C"',
+            '{"rows": 3, "columns": 4, "tiles": {"13": "Q"}, "start": [0.5, 1], "role": "C"}',
+            '{"id": "far", "rows": 3, "columns": 4, "tiles": {"6": "Q"}, "start": [9, 1], "role": "C"}',
+            '{"rows": 3, "columns": 4, "tiles": {"6": "Q"}, "start": [0.5, 1], "role": "X"}',
+            '{"rows": 3, "columns": 4, "tiles": {"6": "Q"}, "start": [0.5, 1], "role": "C", "to_end": true}',
+            '{"rows": 3, "columns": 4, "tiles": {"6": "Q"}, "role": "C"}',
+            '',
+            good,
+        ]
+        results = [json.loads(result) for result in run_batch(lines, workers=1)]
+        # blank lines are skipped, the ids default to the line number
+        self.assertEqual([result['id'] for result in results], [1, 2, 3, 'far', 5, 6, 7, 9])
+        self.assertEqual(results[0]['cost'], 1.0)
+        self.assertEqual(results[-1], dict(results[0], id=9, seconds=results[-1]['seconds']))
+        for result in results[1:-1]:
+            with self.subTest(id=result['id']):
+                self.assertEqual(set(result), {'id', 'error'})
+        self.assertTrue(results[1]['error'].startswith('JSONDecodeError'))
+        self.assertEqual(results[2]['error'], 'RuntimeError: Tile 13 is not in the map')
+        self.assertTrue(results[6]['error'].startswith('KeyError'))
+
+    def test_stats_and_anytime_fields(self):
+        base = {'rows': 6, 'columns': 6, 'tiles': {'36': 'Q', '20': 'P'}, 'start': [0.5, 0.5], 'role': 'C'}
+        lines = [
+            json.dumps(dict(base, stats=True)),
+            json.dumps(dict(base, anytime={'epsilon': 3, 'final_epsilon': 1})),
+            json.dumps(dict(base, stats=True, anytime={'epsilon': 2, 'max_expansions': 1})),
+        ]
+        stats, anytime, budget = [json.loads(result) for result in run_batch(lines, workers=1)]
+        self.assertEqual(set(stats['stats']), set(SearchStats().to_dict()))
+        self.assertGreater(stats['stats']['expanded'], 0)
+        self.assertIsNotNone(stats['stats']['path_seconds'])
+        self.assertNotIn('bound', stats)
+        # the anytime search goes down to the cheapest path
+        self.assertEqual(anytime['cost'], stats['cost'])
+        self.assertEqual(anytime['bound'], 1.0)
+        self.assertFalse(anytime['out_of_budget'])
+        self.assertNotIn('stats', anytime)
+        self.assertTrue(budget['out_of_budget'])
+        self.assertIn('stats', budget)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.algos.bidirectional import _EndAsStart
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.stats import SearchStats
+from tests.maps import dijkstra_costs, quietly, random_map, random_point
+
+
+class BidirectionalSearchTest(unittest.TestCase):
+    """
+    Routes from START to END (Map.route(..., to_end=True)), against flat Dijkstra searches from START and from END
+    """
+    def test_same_costs_as_dijkstra(self):
+        checked = 0
+        for seed in range(80):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=10, compact=seed % 2 == 0, density=rnd.choice([0.0, 0.3, 0.6]))
+            start, end = random_point(rnd, cov_map), random_point(rnd, cov_map)
+            for role_char in 'CPV':
+                goal_info, graph = quietly(cov_map.route, role_char, start, end, None, True)
+                forward = RoleAlgoFactory(cov_map).create(role_char, graph=graph)
+                backward = RoleAlgoFactory(cov_map).create(role_char, graph=_EndAsStart(graph))
+                target = backward.start_node
+                # both ends leave their point with the first moves of the role (i.e. out of the middle of a tile)
+                forward_costs, backward_costs = dijkstra_costs(forward), dijkstra_costs(backward)
+                expected = min(
+                    (cost + backward_costs[node] for node, cost in forward_costs.items() if node in backward_costs),
+                    default=None
+                )
+                with self.subTest(seed=seed, role=role_char):
+                    if expected is None:
+                        self.assertIsNone(goal_info)
+                        continue
+                    self.assertAlmostEqual(goal_info.cost, expected, places=9)
+                    nodes = [elem for elem in goal_info.path() if isinstance(elem, Node)]
+                    self.assertIs(nodes[0], forward.start_node)
+                    self.assertIs(nodes[-1], target)
+                    # every move of the path is along an edge of the graph
+                    for node, next_node in zip(nodes, nodes[1:]):
+                        self.assertTrue(any(edge.get_other_node(node) is next_node for edge in graph.edges(node)))
+                checked += 1
+        self.assertGreater(checked, 100)
+
+    def test_start_and_end_in_the_same_tile_or_edge(self):
+        cov_map = Map(4, 3)
+        cov_map.update_tile(6, 'P')
+        for start, end in [((0.5, 0.5), (0.75, 0.25)), ((0.5, 0.0), (0.75, 0.0)), ((2.0, 1.5), (2.0, 1.25))]:
+            for role_char in 'CPV':
+                goal_info, graph = quietly(cov_map.route, role_char, start, end, None, True)
+                with self.subTest(start=start, end=end, role=role_char):
+                    self.assertIsNotNone(goal_info)
+                    nodes = [elem for elem in goal_info.path() if isinstance(elem, Node)]
+                    backward = RoleAlgoFactory(cov_map).create(role_char, graph=_EndAsStart(graph))
+                    self.assertIs(nodes[-1], backward.start_node)
+
+    def test_stats_and_options(self):
+        rnd = random.Random(3)
+        cov_map = random_map(rnd, max_size=10, density=0.3)
+        stats = SearchStats()
+        goal_info, _ = quietly(cov_map.route, 'V', (0.0, 0.0), (float(cov_map.num_columns), 1.5), None, True, stats)
+        self.assertIsNotNone(goal_info)
+        self.assertGreater(stats.expanded, 0)
+        self.assertEqual(stats.duplicates + stats.queued, stats.generated)
+        self.assertGreater(stats.peak_queue, 0)
+        for name in ['stale_pops', 'peak_bytes', 'd_map_seconds', 'search_seconds']:
+            self.assertIsNotNone(getattr(stats, name))
+        self.assertIsNone(stats.path_seconds)
+        # the search keeps its own queue
+        with self.assertRaises(RuntimeError):
+            cov_map.route('V', (0.0, 0.0), (1.0, 1.0), 'bucket', True)
+
+
+if __name__ == '__main__':
+    unittest.main()
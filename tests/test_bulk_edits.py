@@ -0,0 +1,63 @@
+import random
+import unittest
+
+import numpy as np
+
+from mapper.algos.cost import CostTables
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import TYPES, cost_of, quietly, random_map, rebuilt
+
+TABLES = ['tiles', 'horizontal', 'vertical', 'diagonal_down', 'diagonal_up']
+
+
+class BulkEditTest(unittest.TestCase):
+    """
+    Map.fill_tiles, mask_tiles and assign_tiles, against a map rebuilt one update_tile at a time
+    """
+    def test_same_map_as_rebuilt(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            np_rnd = np.random.RandomState(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0)
+            num_rows, num_columns = cov_map.num_rows, cov_map.num_columns
+            start = (float(rnd.randint(0, num_columns)), float(rnd.randint(0, num_rows)))
+            cov_map.add_point(*start, 'START')
+            # the tables and the searches cached on the map hear about the edits
+            for role_char in 'CPV':
+                CostTables.for_map(cov_map, RoleAlgoFactory.role_class(role_char).cost_model)
+                quietly(RoleAlgoFactory(cov_map).create(role_char).find_path)
+            for _ in range(3):
+                edit = rnd.randint(0, 2)
+                if edit == 0:
+                    row_end, col_end = rnd.randint(1, num_rows), rnd.randint(1, num_columns)
+                    cov_map.fill_tiles(rnd.randint(0, row_end - 1), row_end, rnd.randint(0, col_end - 1), col_end,
+                                       rnd.choice(TYPES))
+                elif edit == 1:
+                    cov_map.mask_tiles(np_rnd.rand(num_rows, num_columns) < 0.3, rnd.choice(TYPES))
+                else:
+                    height, width = rnd.randint(1, num_rows), rnd.randint(1, num_columns)
+                    layout = [''.join(rnd.choice(TYPES) for _ in range(width)) for _ in range(height)]
+                    cov_map.assign_tiles(layout, rnd.randint(0, num_rows - height), rnd.randint(0, num_columns - width))
+                fresh = rebuilt(cov_map)
+                fresh.add_point(*start, 'START')
+                with self.subTest(seed=seed):
+                    self.assertEqual(cov_map.counts, fresh.counts)
+                    index, fresh_index = cov_map.tile_index(), fresh.tile_index()
+                    for code, tiles in index.tiles.items():
+                        self.assertEqual(tiles, fresh_index.tiles[code])
+                        self.assertTrue((index.corners[code] == fresh_index.corners[code]).all())
+                    for role_char in 'CPV':
+                        model = RoleAlgoFactory.role_class(role_char).cost_model
+                        tables, fresh_tables = CostTables.for_map(cov_map, model), CostTables(fresh, model)
+                        for name in TABLES:
+                            self.assertTrue(
+                                np.array_equal(getattr(tables, name), getattr(fresh_tables, name), equal_nan=True)
+                            )
+                        self.assertEqual(
+                            cost_of(quietly(RoleAlgoFactory(cov_map).create(role_char).find_path)),
+                            cost_of(quietly(RoleAlgoFactory(fresh).create(role_char).find_path))
+                        )
+
+
+if __name__ == '__main__':
+    unittest.main()
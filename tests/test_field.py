@@ -0,0 +1,47 @@
+import random
+import unittest
+
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.field import CostToGo
+from tests.maps import TYPES, add_start, cost_of, dijkstra_goal_cost, quietly, random_map
+
+INF = float('inf')
+
+
+class CostToGoTest(unittest.TestCase):
+    """
+    Cost to go field of the roles, against a flat Dijkstra search from START
+    """
+    def test_path_costs_as_dijkstra(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0)
+            add_start(rnd, cov_map)
+            for _ in range(3):
+                for role_char in 'CPV':
+                    found = quietly(CostToGo(cov_map, role_char).find_path)
+                    expected = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char))
+                    with self.subTest(seed=seed, role=role_char):
+                        if expected is None:
+                            self.assertIsNone(found)
+                        else:
+                            self.assertAlmostEqual(cost_of(found), expected, places=9)
+                # the field is computed again after a tile changed
+                cov_map.update_tile(rnd.randint(1, cov_map.num_rows * cov_map.num_columns), rnd.choice(TYPES))
+
+    def test_node_costs_as_dijkstra(self):
+        for seed in range(30):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd)
+            row_idx, col_idx = rnd.randint(0, cov_map.num_rows), rnd.randint(0, cov_map.num_columns)
+            # START on the grid node, the search starts from the node itself
+            cov_map.add_point(float(col_idx), float(row_idx), 'START')
+            for role_char in 'CPV':
+                expected = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char))
+                with self.subTest(seed=seed, role=role_char):
+                    cost = CostToGo(cov_map, role_char).costs()[row_idx, col_idx]
+                    self.assertAlmostEqual(cost, INF if expected is None else expected, places=9)
+
+
+if __name__ == '__main__':
+    unittest.main()
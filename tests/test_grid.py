@@ -0,0 +1,112 @@
+import gc
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.tile import PlayGround, Quarantine, Vaccine
+from mapper.algos.distance import EUCLIDEAN, MANHATTAN, goal_distance_field
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import quietly, random_point
+
+TYPES = 'UVPQ'
+FIELDS = [(Quarantine, MANHATTAN), (PlayGround, MANHATTAN), (Vaccine, EUCLIDEAN)]
+
+
+def random_codes(rnd: random.Random, num_rows: int, num_columns: int) -> np.ndarray:
+    return np.array(
+        [[rnd.choice([1, 2, 3]) if rnd.random() < 0.3 else 0 for _ in range(num_columns)] for _ in range(num_rows)],
+        dtype=np.uint8
+    )
+
+
+def set_tiles(cov_map: Map, codes: np.ndarray):
+    for (row_idx, col_idx), code in np.ndenumerate(codes):
+        if code != 0:
+            cov_map.update_tile(row_idx * cov_map.num_columns + col_idx + 1, TYPES[code])
+
+
+def described(goal_info) -> tuple:
+    if goal_info is None:
+        return None
+    return [elem.get_name() if isinstance(elem, Node) else elem for elem in goal_info.path()], round(goal_info.cost, 9)
+
+
+class CompactMapTest(unittest.TestCase):
+    """
+    Compact maps (views on the type grid) against regular maps of the same tiles
+    """
+    def test_same_paths_as_regular(self):
+        for seed in range(40):
+            rnd = random.Random(seed)
+            num_rows, num_columns = rnd.randint(1, 8), rnd.randint(1, 8)
+            codes = random_codes(rnd, num_rows, num_columns)
+            maps = [Map(num_columns, num_rows), Map(num_columns, num_rows, compact=True)]
+            start = random_point(rnd, maps[0])
+            for cov_map in maps:
+                set_tiles(cov_map, codes)
+                cov_map.add_point(*start, 'START')
+            for role_char in 'CPV':
+                with self.subTest(seed=seed, role=role_char):
+                    regular, compact = (
+                        described(quietly(RoleAlgoFactory(cov_map).create(role_char).find_path)) for cov_map in maps
+                    )
+                    self.assertEqual(regular, compact)
+
+    def test_search_nodes_not_kept(self):
+        cov_map = Map(30, 30, compact=True)
+        set_tiles(cov_map, random_codes(random.Random(0), 30, 30))
+        cov_map.update_tile(30 * 30, 'P')
+        cov_map.add_point(0.5, 0.5, 'START')
+        cov_map.add_point(15.0, 15.5, 'END')
+        quietly(RoleAlgoFactory(cov_map).create('P').find_path)
+        gc.collect()
+        # only the nodes START and END changed the edges of, and their neighbours (out of 961)
+        self.assertLess(len(cov_map.get_node_grid().nodes), 50)
+        cov_map.remove_user_points()
+        gc.collect()
+        self.assertEqual(len(cov_map.get_node_grid().pinned), 0)
+
+
+class ChunkedMapTest(unittest.TestCase):
+    """
+    Chunked maps (type grid in a file, a few chunks in memory) against compact maps of the same tiles
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_fields_and_routes_as_compact(self):
+        for seed in range(30):
+            rnd = random.Random(seed)
+            num_rows, num_columns = rnd.randint(1, 30), rnd.randint(1, 30)
+            codes = random_codes(rnd, num_rows, num_columns)
+            compact = Map(num_columns, num_rows, compact=True)
+            set_tiles(compact, codes)
+            chunked = Map.create_chunked(
+                num_columns, num_rows, os.path.join(self.directory, f'{seed}.bin'),
+                chunk_size=rnd.choice([1, 2, 3, 8]), max_resident_chunks=2
+            )
+            set_tiles(chunked, codes)
+            with self.subTest(seed=seed):
+                for tile_type, metric in FIELDS:
+                    self.assertTrue(np.array_equal(
+                        goal_distance_field(compact, tile_type, metric), goal_distance_field(chunked, tile_type, metric)
+                    ))
+                start = random_point(rnd, compact)
+                for role_char in 'CPV':
+                    self.assertEqual(
+                        described(quietly(compact.route, role_char, start)[0]),
+                        described(quietly(chunked.route, role_char, start)[0])
+                    )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import random
+import unittest
+
+from mapper.algos.field import CostToGo
+from mapper.algos.hierarchical import HierarchicalSearch
+from tests.maps import add_start, cost_of, quietly, random_map
+
+
+class HierarchicalSearchTest(unittest.TestCase):
+    """
+    Hierarchical search of the roles, against the exact cost to go of START (CostToGo)
+    """
+    def test_never_cheaper_than_the_exact_cost(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=14, compact=seed % 2 == 0, density=rnd.choice([0.1, 0.4]))
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                search = HierarchicalSearch(cov_map, role_char, cluster_size=rnd.randint(2, 5))
+                comparison = quietly(search.compare)
+                exact = cost_of(quietly(CostToGo(cov_map, role_char).find_path))
+                with self.subTest(seed=seed, role=role_char):
+                    self.assertEqual(comparison['exact_cost'], exact)
+                    if exact is None:
+                        self.assertIsNone(comparison['cost'])
+                        continue
+                    self.assertGreaterEqual(comparison['cost'], exact - 1e-9)
+                    self.assertGreaterEqual(comparison['suboptimality'], -1e-9)
+                    self.assertGreaterEqual(comparison['flat_cost'], exact - 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.incremental import IncrementalSearch
+from tests.maps import TYPES, add_start, cost_of, dijkstra_goal_cost, quietly, random_map, rebuilt
+
+
+class IncrementalSearchTest(unittest.TestCase):
+    """
+    LPA* kept on the map through tile edits, against a flat Dijkstra search and a new search on a rebuilt map
+    """
+    def test_same_costs_as_dijkstra_after_edits(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0)
+            add_start(rnd, cov_map)
+            for _ in range(4):
+                for role_char in 'CPV':
+                    found = quietly(IncrementalSearch.for_map(cov_map, role_char).find_path)
+                    expected = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char))
+                    with self.subTest(seed=seed, role=role_char):
+                        if expected is None:
+                            self.assertIsNone(found)
+                        else:
+                            self.assertAlmostEqual(cost_of(found), expected, places=9)
+                tile_index = rnd.randint(1, cov_map.num_rows * cov_map.num_columns)
+                cov_map.update_tile(tile_index, rnd.choice(TYPES))
+
+    def test_same_costs_as_rebuilt_map(self):
+        for seed in range(40):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd)
+            start = (rnd.randint(0, cov_map.num_columns), rnd.randint(0, cov_map.num_rows))
+            cov_map.add_point(float(start[0]), float(start[1]), 'START')
+            searches = {role_char: IncrementalSearch.for_map(cov_map, role_char) for role_char in 'CPV'}
+            for role_char in 'CPV':
+                quietly(searches[role_char].find_path)
+            row_end, col_end = rnd.randint(1, cov_map.num_rows), rnd.randint(1, cov_map.num_columns)
+            cov_map.fill_tiles(rnd.randint(0, row_end - 1), row_end, rnd.randint(0, col_end - 1), col_end,
+                               rnd.choice(TYPES))
+            fresh = rebuilt(cov_map)
+            fresh.add_point(float(start[0]), float(start[1]), 'START')
+            for role_char in 'CPV':
+                with self.subTest(seed=seed, role=role_char):
+                    self.assertEqual(
+                        cost_of(quietly(searches[role_char].find_path)),
+                        cost_of(quietly(IncrementalSearch(fresh, role_char).find_path))
+                    )
+
+
+if __name__ == '__main__':
+    unittest.main()
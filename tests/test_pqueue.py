@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from mapper.core.pqueue import QUEUE_TYPES, create_queue
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import add_start, quietly, random_map
+
+INF = float('inf')
+
+
+def dequeue_order(queue_type, operations):
+    """
+    Items in the order they come out of the queue, operations: (priority, item) to queue, or None to dequeue one
+    """
+    queue = create_queue(queue_type)
+    order = []
+    for operation in operations:
+        if operation is None:
+            order.append(queue.dequeue())
+        else:
+            queue.queue(*operation)
+    while not queue.empty():
+        order.append(queue.dequeue())
+    return order
+
+
+class PriorityQueueTest(unittest.TestCase):
+    """
+    The queue backends, all of them dequeue in the same order
+    """
+    def assertSameOrder(self, operations, expected=None):
+        orders = {queue_type: dequeue_order(queue_type, operations) for queue_type in QUEUE_TYPES}
+        if expected is None:
+            expected = orders['heap']
+        for queue_type, order in orders.items():
+            with self.subTest(queue=queue_type):
+                self.assertEqual(order, expected)
+
+    def test_ties_first_in_first_out(self):
+        self.assertSameOrder([(1, 'a'), (0.5, 'b'), (1, 'c'), (0.5, 'd'), (1.25, 'e'), (1.25, 'f')],
+                             ['b', 'd', 'a', 'c', 'e', 'f'])
+
+    def test_inf_priorities_last(self):
+        self.assertSameOrder([(INF, 'a'), (2, 'b'), (INF, 'c'), None, (0, 'd'), (INF, 'e')],
+                             ['b', 'd', 'a', 'c', 'e'])
+        # only infinite priorities left in the queue
+        self.assertSameOrder([(INF, 'a'), None, (INF, 'b'), (3, 'c')], ['a', 'c', 'b'])
+
+    def test_backwards_priorities(self):
+        # lower priorities than the last one dequeued, as queued by an inconsistent heuristic
+        self.assertSameOrder([(3, 'a'), (4, 'b'), None, (1, 'c'), (3.3, 'd'), None, (-1.5, 'e'), (2.5, 'f')],
+                             ['a', 'c', 'e', 'f', 'd', 'b'])
+
+    def test_random_operations(self):
+        for seed in range(200):
+            rnd = random.Random(seed)
+            operations = []
+            for _ in range(rnd.randint(1, 60)):
+                if rnd.random() < 0.3:
+                    operations.append(None)
+                else:
+                    priority = rnd.choice([rnd.randint(-4, 20) / 2, rnd.uniform(-2, 10), INF])
+                    operations.append((priority, len(operations)))
+            with self.subTest(seed=seed):
+                self.assertSameOrder(operations)
+
+    def test_same_paths_with_every_queue(self):
+        for seed in range(40):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd)
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                paths = {}
+                for queue_type in QUEUE_TYPES:
+                    goal_info = quietly(RoleAlgoFactory(cov_map).create(role_char, queue_type).find_path)
+                    paths[queue_type] = None if goal_info is None else (goal_info.path(), goal_info.cost)
+                with self.subTest(seed=seed, role=role_char):
+                    self.assertEqual(paths['bucket'], paths['heap'])
+                    self.assertEqual(paths['dict'], paths['heap'])
+
+
+if __name__ == '__main__':
+    unittest.main()
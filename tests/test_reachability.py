@@ -0,0 +1,47 @@
+import random
+import unittest
+
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.reachability import Reachability
+from tests.maps import TYPES, add_start, cost_of, dijkstra_goal_cost, quietly, random_map
+
+
+class ReachabilityTest(unittest.TestCase):
+    """
+    Components of the roles kept on the map through tile edits, against a flat Dijkstra search and new components
+    """
+    def test_no_goal_reachable_as_dijkstra(self):
+        for seed in range(80):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0, density=0.6)
+            add_start(rnd, cov_map)
+            for _ in range(3):
+                for role_char in 'CPV':
+                    role = RoleAlgoFactory(cov_map).create(role_char)
+                    reachability = Reachability.for_map(cov_map, role.cost_model, role.accepted_tile_type())
+                    with self.subTest(seed=seed, role=role_char):
+                        # a user point is only said to reach the components of the grid nodes it is between
+                        if not reachability.goal_reachable(role.start_node, role.graph, role.is_goal):
+                            self.assertIsNone(dijkstra_goal_cost(role))
+                        # and the searches it cuts short answer the same
+                        pruned = cost_of(quietly(role.find_path))
+                        role.reachability = lambda: None
+                        self.assertEqual(pruned, cost_of(quietly(role.find_path)))
+                        fresh = Reachability(cov_map, role.cost_model, role.accepted_tile_type())
+                        for row_idx in range(cov_map.num_rows + 1):
+                            for col_idx in range(cov_map.num_columns + 1):
+                                self.assertEqual(
+                                    reachability.component_has_goal(row_idx, col_idx),
+                                    fresh.component_has_goal(row_idx, col_idx)
+                                )
+                num_rows, num_columns = cov_map.num_rows, cov_map.num_columns
+                if rnd.random() < 0.3:
+                    row_end, col_end = rnd.randint(1, num_rows), rnd.randint(1, num_columns)
+                    cov_map.fill_tiles(rnd.randint(0, row_end - 1), row_end, rnd.randint(0, col_end - 1), col_end,
+                                       rnd.choice(TYPES))
+                else:
+                    cov_map.update_tile(rnd.randint(1, num_rows * num_columns), rnd.choice(TYPES))
+
+
+if __name__ == '__main__':
+    unittest.main()
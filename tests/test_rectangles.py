@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from mapper.core.map import Map
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.stats import SearchStats
+from tests.maps import add_start, cost_of, quietly, random_map
+
+
+class RectangleSearchTest(unittest.TestCase):
+    """
+    Role C with the inside of the uniform regions skipped (RoleCRectangleAlgo), against the regular search
+    """
+    def test_same_costs_as_role_c(self):
+        for seed in range(120):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=16, compact=seed % 2 == 0, density=rnd.choice([0.05, 0.2, 0.4]))
+            add_start(rnd, cov_map)
+            regular = cost_of(quietly(RoleAlgoFactory(cov_map).create('C').find_path))
+            rectangles = cost_of(quietly(RoleAlgoFactory(cov_map).create('C', rectangles=True).find_path))
+            with self.subTest(seed=seed):
+                self.assertEqual(rectangles, regular)
+
+    def test_fewer_expansions_on_uniform_regions(self):
+        cov_map = Map(30, 30)
+        cov_map.update_tile(1, 'P')
+        cov_map.update_tile(900, 'Q')
+        stats = SearchStats()
+        goal_info, _ = quietly(cov_map.route, 'C', (0.5, 0.5), None, None, False, stats, True)
+        cov_map.add_point(0.5, 0.5, 'START')
+        regular = RoleAlgoFactory(cov_map).create('C')
+        self.assertEqual(goal_info.cost, cost_of(quietly(regular.find_path)))
+        self.assertLess(stats.expanded * 10, regular.num_expanded)
+
+
+if __name__ == '__main__':
+    unittest.main()
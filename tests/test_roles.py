@@ -0,0 +1,35 @@
+import json
+import random
+import unittest
+from pathlib import Path
+
+from mapper.core.node import Node
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import random_map, add_start, quietly
+
+# paths and costs of roles C and P on the maps below, found by the searches each role had before the shared engine
+BASELINE_PATHS = Path(__file__).parent / 'data' / 'baseline_paths.json'
+
+
+class SameAsBaselineTest(unittest.TestCase):
+
+    def test_same_paths_and_costs_for_roles_c_and_p(self):
+        with open(BASELINE_PATHS) as baseline_file:
+            baseline = json.load(baseline_file)
+        for key, expected in baseline.items():
+            seed, role_char = key.split()
+            rnd = random.Random(int(seed))
+            cov_map = random_map(rnd, 7)
+            add_start(rnd, cov_map)
+            goal_info = quietly(RoleAlgoFactory(cov_map).create(role_char).find_path)
+            with self.subTest(seed=seed, role=role_char):
+                if expected is None:
+                    self.assertIsNone(goal_info)
+                    continue
+                self.assertIsNotNone(goal_info)
+                path = ' --> '.join(elem.get_name() if isinstance(elem, Node) else elem for elem in goal_info.path())
+                self.assertEqual(expected, [path, goal_info.cost])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import random
+import unittest
+from math import floor
+
+from mapper.core.map import Map
+from mapper.core.node import Node
+from mapper.core.points import VirtualPoints
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import dijkstra_goal_cost, quietly, random_map, random_point
+
+
+def nearby(rnd: random.Random, point):
+    """
+    Another point on the same grid node, edge or tile as the point
+    """
+    return tuple(
+        coord if coord.is_integer() else floor(coord) + rnd.choice([0.25, 0.5, 0.75])
+        for coord in point
+    )
+
+
+def grid_edges(cov_map: Map):
+    """
+    The other end of every edge of every grid node, to check the map is left as it was
+    """
+    return [
+        [sorted((other.row_idx, other.col_idx) for other in [edge.get_other_node(node) for edge in node.edges])
+         for node in row]
+        for row in cov_map.get_node_grid()
+    ]
+
+
+class VirtualPointsTest(unittest.TestCase):
+    """
+    START / END laid over a map by Map.route, without changing the map
+    """
+    def test_node_ids_only_from_the_map(self):
+        cov_map = Map(4, 3)
+        cov_map.add_point(0.5, 0.5, 'START')
+        graph = VirtualPoints(cov_map, [('START', (2.5, 1.5)), ('END', (3.0, 0.5))])
+        cov_map.add_point(1.5, 2.5, 'END')
+        # the points of the view are not part of the map, the ids of the map stay unique
+        for name in ['START', 'END']:
+            self.assertIsNone(graph.lookup_node(name).node_id)
+        map_ids = [node.node_id for node in cov_map.user_nodes()]
+        self.assertEqual(sorted(map_ids), [20, 21])
+
+    def test_points_on_the_same_edge_or_tile(self):
+        for seed in range(120):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0)
+            start = random_point(rnd, cov_map)
+            if seed % 3 == 0:
+                # a point of the map where the view puts its points
+                cov_map.add_point(*nearby(rnd, start), 'START')
+            before = grid_edges(cov_map)
+            end = nearby(rnd, start)
+            graph = VirtualPoints(cov_map, [('START', start), ('END', end)])
+            self.assertEqual(grid_edges(cov_map), before)
+            # every edge of the view is on both of its nodes
+            for node in [graph.lookup_node('START'), graph.lookup_node('END')]:
+                for edge in graph.edges(node):
+                    other_node = edge.get_other_node(node)
+                    self.assertTrue(any(other_edge is edge for other_edge in graph.edges(other_node)))
+                    self.assertEqual(sum(other_edge is edge for other_edge in graph.edges(node)), 1)
+            for role_char in 'CPV':
+                goal_info, route_graph = quietly(cov_map.route, role_char, start, end)
+                expected = dijkstra_goal_cost(RoleAlgoFactory(cov_map).create(role_char, graph=route_graph))
+                with self.subTest(seed=seed, role=role_char):
+                    if expected is None:
+                        self.assertIsNone(goal_info)
+                        continue
+                    # the heuristics of roles C and P can overestimate, the path is not always the cheapest
+                    self.assertGreaterEqual(goal_info.cost, expected - 1e-9)
+                    nodes = [elem for elem in goal_info.path() if isinstance(elem, Node)]
+                    for node, next_node in zip(nodes, nodes[1:]):
+                        self.assertTrue(
+                            any(edge.get_other_node(node) is next_node for edge in route_graph.edges(node))
+                        )
+
+    def test_point_on_a_point_of_the_map(self):
+        cov_map = Map(4, 3)
+        cov_map.add_point(0.5, 0.5, 'START')
+        cov_map.add_point(2.0, 1.5, 'END')
+        graph = VirtualPoints(cov_map, [('START', (2.0, 1.5)), ('END', (0.5, 0.5))])
+        # the point of the map is the point of the view, under the name of the view
+        self.assertIs(graph.lookup_node('START'), cov_map.lookup_node('END'))
+        self.assertIs(graph.lookup_node('END'), cov_map.lookup_node('START'))
+        self.assertEqual(graph.node_name(cov_map.lookup_node('END')), 'START')
+        self.assertEqual(len(graph.user_nodes()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import random
+import unittest
+
+from mapper.core.map import Map
+from mapper.algos.factory import RoleAlgoFactory
+from mapper.algos.stepwise import SteppedSearch, run_interleaved
+from tests.maps import add_start, quietly, random_map
+
+
+def far_goal_map() -> Map:
+    """
+    A map where the search expands many nodes before it gets to the goal
+    """
+    cov_map = Map(30, 30)
+    for tile_index, tile_type in [(1, 'V'), (2, 'P'), (900, 'Q')]:
+        cov_map.update_tile(tile_index, tile_type)
+    cov_map.add_point(0.5, 0.5, 'START')
+    return cov_map
+
+
+def path_and_cost(goal_info):
+    return None if goal_info is None else (goal_info.path(), goal_info.cost)
+
+
+class SteppedSearchTest(unittest.TestCase):
+    """
+    Searches run a chunk of expansions at a time (SteppedSearch), against HeuristicAStar.find_path
+    """
+    def test_same_result_as_find_path(self):
+        for seed in range(40):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, compact=seed % 2 == 0)
+            add_start(rnd, cov_map)
+            for role_char in 'CPV':
+                role = RoleAlgoFactory(cov_map).create(role_char)
+                expected = path_and_cost(quietly(role.find_path))
+                for every in [1, 3, 1000]:
+                    search = SteppedSearch(RoleAlgoFactory(cov_map).create(role_char), every)
+                    progress = quietly(lambda: list(search))
+                    result = search.result()
+                    with self.subTest(seed=seed, role=role_char, every=every):
+                        self.assertTrue(search.done)
+                        self.assertFalse(search.cancelled)
+                        self.assertEqual(path_and_cost(result.goal_info), expected)
+                        self.assertEqual(result.cost, None if expected is None else expected[1])
+                        self.assertEqual([step.expanded for step in progress],
+                                         [every * (idx + 1) for idx in range(len(progress))])
+                        self.assertEqual(search.role.num_expanded, role.num_expanded)
+
+    def test_cancel(self):
+        cov_map = far_goal_map()
+        search = SteppedSearch(RoleAlgoFactory(cov_map).create('C'), every=10)
+        for _ in range(3):
+            progress = search.step()
+        self.assertIsNone(search.result())
+        search.cancel()
+        self.assertTrue(search.done)
+        self.assertTrue(search.cancelled)
+        self.assertIsNone(search.result())
+        self.assertIsNone(search.goal_info)
+        # stepping a cancelled search does nothing
+        self.assertIs(search.step(), progress)
+        self.assertEqual(progress.expanded, 30)
+        # the role can still run a whole search
+        self.assertIsNotNone(quietly(search.role.find_path))
+
+    def test_run_async(self):
+        cov_map = far_goal_map()
+        expected = path_and_cost(quietly(RoleAlgoFactory(cov_map).create('C').find_path))
+        completed = SteppedSearch(RoleAlgoFactory(cov_map).create('C'), every=50)
+        cancelled = SteppedSearch(RoleAlgoFactory(cov_map).create('C'), every=5)
+
+        async def main():
+            task = asyncio.ensure_future(cancelled.run_async())
+            result = await completed.run_async()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return result
+
+        result = quietly(asyncio.run, main())
+        self.assertEqual(path_and_cost(result.goal_info), expected)
+        # the other search got control back between its steps, and stopped where it was when its task was cancelled
+        self.assertTrue(cancelled.cancelled)
+        self.assertIsNone(cancelled.result())
+        self.assertGreater(cancelled.progress.expanded, 0)
+        self.assertLess(cancelled.progress.expanded, completed.role.num_expanded)
+
+    def test_run_interleaved(self):
+        cov_map = far_goal_map()
+        searches = [SteppedSearch(RoleAlgoFactory(cov_map).create(role_char), every=7) for role_char in 'CPV']
+        done = quietly(lambda: list(run_interleaved(searches)))
+        self.assertEqual(sorted(map(id, done)), sorted(map(id, searches)))
+        for role_char, search in zip('CPV', searches):
+            expected = path_and_cost(quietly(RoleAlgoFactory(cov_map).create(role_char).find_path))
+            self.assertEqual(path_and_cost(search.result().goal_info), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
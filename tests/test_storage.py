@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from mapper.core.storage import load_map, save_map
+from mapper.algos.factory import RoleAlgoFactory
+from tests.maps import TYPES, cost_of, quietly, random_map, random_point
+
+
+def codes(cov_map):
+    return np.asarray(cov_map.type_codes[0:cov_map.num_rows, 0:cov_map.num_columns]).copy()
+
+
+class StorageTest(unittest.TestCase):
+    """
+    Maps written by save_map and read back by load_map
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'map.covmap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        for seed in range(40):
+            rnd = random.Random(seed)
+            cov_map = random_map(rnd, max_size=12, compact=seed % 2 == 0)
+            cov_map.add_point(*random_point(rnd, cov_map), 'START')
+            if seed % 3 != 0:
+                cov_map.add_point(float(cov_map.num_columns), rnd.randint(0, cov_map.num_rows * 4) / 4, 'END')
+            save_map(cov_map, self.path)
+            for compact in [True, False]:
+                for mmap in [True, False]:
+                    loaded = load_map(self.path, compact=compact, mmap=mmap)
+                    with self.subTest(seed=seed, compact=compact, mmap=mmap):
+                        self.assertEqual((loaded.num_rows, loaded.num_columns), (cov_map.num_rows, cov_map.num_columns))
+                        np.testing.assert_array_equal(codes(loaded), codes(cov_map))
+                        self.assertEqual(loaded.counts, cov_map.counts)
+                        self.assertEqual(loaded.user_points(), cov_map.user_points())
+                        for role_char in 'CPV':
+                            self.assertEqual(
+                                cost_of(quietly(RoleAlgoFactory(loaded).create(role_char).find_path)),
+                                cost_of(quietly(RoleAlgoFactory(cov_map).create(role_char).find_path))
+                            )
+                    del loaded
+
+    def test_loaded_map_is_editable(self):
+        rnd = random.Random(1)
+        cov_map = random_map(rnd, max_size=10)
+        cov_map.add_point(0.5, 0.5, 'START')
+        cov_map.add_point(0.0, 0.0, 'END')
+        save_map(cov_map, self.path)
+        with open(self.path, 'rb') as map_file:
+            saved = map_file.read()
+        for mmap in [True, False]:
+            loaded = load_map(self.path, mmap=mmap)
+            expected = codes(cov_map)
+            for _ in range(20):
+                tile_index = rnd.randint(1, loaded.num_rows * loaded.num_columns)
+                tile_type = rnd.choice(TYPES)
+                loaded.update_tile(tile_index, tile_type)
+                expected[divmod(tile_index - 1, loaded.num_columns)] = TYPES.index(tile_type)
+            loaded.remove_user_points()
+            loaded.add_point(float(loaded.num_columns), 0.5, 'START')
+            loaded.add_point(0.5, float(loaded.num_rows), 'END')
+            with self.subTest(mmap=mmap):
+                np.testing.assert_array_equal(codes(loaded), expected)
+                self.assertEqual(sum(loaded.counts.values()), loaded.num_rows * loaded.num_columns)
+                self.assertEqual(
+                    loaded.user_points(),
+                    [('START', (float(loaded.num_columns), 0.5)), ('END', (0.5, float(loaded.num_rows)))]
+                )
+                self.assertEqual(loaded.lookup_node('START').col_idx, loaded.num_columns)
+            del loaded
+        # the edits stay in memory, the file is left as it was
+        with open(self.path, 'rb') as map_file:
+            self.assertEqual(map_file.read(), saved)
+
+    def test_not_a_map_file(self):
+        with open(self.path, 'wb') as map_file:
+            map_file.write(b'\0' * 64)
+        with self.assertRaises(RuntimeError):
+            load_map(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()